@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import AITutorSession, AITutorQuestion, CodeSnippet
+from .models import AITutorSession, AITutorQuestion, AITutorCacheEntry, AITutorCacheStat, CodeSnippet
 
 class AITutorQuestionInline(admin.StackedInline):
     model = AITutorQuestion
@@ -17,3 +17,18 @@ class CodeSnippetAdmin(admin.ModelAdmin):
     list_display = ('user', 'title', 'language', 'is_public', 'created_at')
     list_filter = ('language', 'is_public', 'created_at')
     search_fields = ('user__email', 'title', 'code')
+
+@admin.register(AITutorCacheEntry)
+class AITutorCacheEntryAdmin(admin.ModelAdmin):
+    list_display = ('question', 'subject', 'level', 'style', 'hits', 'last_hit_at', 'expires_at')
+    list_filter = ('style', 'model_used')
+    search_fields = ('question', 'subject')
+    ordering = ('-hits',)
+
+@admin.register(AITutorCacheStat)
+class AITutorCacheStatAdmin(admin.ModelAdmin):
+    list_display = ('date', 'hits', 'misses', 'ratio')
+    
+    @admin.display(description='Taux de succès')
+    def ratio(self, obj):
+        return f"{obj.hit_ratio:.0%}" if obj.hit_ratio is not None else '-'
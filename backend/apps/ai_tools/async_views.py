@@ -0,0 +1,144 @@
+# ============================================
+# apps/ai_tools/async_views.py - Vues asynchrones (ASGI)
+# ============================================
+"""
+Variantes asynchrones des endpoints du tuteur IA. Sous daphne, une
+requête en attente du fournisseur LLM n'occupe pas de thread : l'appel
+est attendu sur la boucle d'événements et seuls les accès ORM passent
+par sync_to_async.
+
+DRF ne gère pas les vues asynchrones : authentification JWT, validation
+et format d'erreur sont reproduits ici.
+"""
+import functools
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework import exceptions
+
+from apps.ai_tools.serializers import AITutorRequestSerializer, AITutorResponseSerializer
+from apps.ai_tools.views import SettledEventStream, prepare_turn, sse_chunk, sse_event, with_quota_headers
+
+logger = logging.getLogger(__name__)
+
+
+def error_response(exc):
+    """Réponse d'erreur au format du gestionnaire d'exceptions DRF du projet"""
+    from apps.core.exceptions import custom_exception_handler
+
+    response = custom_exception_handler(exc, {})
+    return JsonResponse(response.data, status=response.status_code)
+
+
+async def authenticate(request):
+    """Utilisateur du jeton JWT (en-tête Authorization), ou None"""
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+    from rest_framework_simplejwt.exceptions import InvalidToken, AuthenticationFailed
+
+    auth = JWTAuthentication()
+    header = auth.get_header(request)
+    raw_token = auth.get_raw_token(header) if header else None
+    if raw_token is None:
+        return None
+    try:
+        validated_token = auth.get_validated_token(raw_token)
+        return await sync_to_async(auth.get_user)(validated_token)
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
+
+def async_api_view(view):
+    """POST authentifié par JWT, corps JSON validé par AITutorRequestSerializer"""
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != 'POST':
+            return error_response(exceptions.MethodNotAllowed(request.method))
+
+        user = await authenticate(request)
+        if user is None:
+            return error_response(exceptions.NotAuthenticated())
+        request.user = user
+
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return error_response(exceptions.ParseError())
+        serializer = AITutorRequestSerializer(data=data)
+        if not serializer.is_valid():
+            return error_response(exceptions.ValidationError(serializer.errors))
+
+        return await view(request, serializer.validated_data, *args, **kwargs)
+
+    # Authentification par en-tête, pas par cookie : pas de jeton CSRF
+    wrapper.csrf_exempt = True
+    return wrapper
+
+
+@async_api_view
+async def tutor(request, data):
+    """POST /api/ai/async/tutor/ - Même contrat que /api/ai/tutor/"""
+    from apps.ai_tools.models import AITutorSession
+    from apps.ai_tools.providers import ProviderError, ProviderNotConfigured, ProviderUnavailable, ProviderTimeout
+    from apps.ai_tools.quotas import QuotaExceeded
+    from apps.ai_tools.services import TutorService
+
+    try:
+        turn = await sync_to_async(prepare_turn)(request.user, data)
+        entry = await TutorService.aask(request.user, turn)
+    except AITutorSession.DoesNotExist:
+        return JsonResponse({'error': 'Session introuvable'}, status=404)
+    except QuotaExceeded as e:
+        return with_quota_headers(JsonResponse({'error': str(e)}, status=429), e.reservation)
+    except (ProviderNotConfigured, ProviderUnavailable) as e:
+        return JsonResponse({'error': str(e)}, status=503)
+    except ProviderTimeout as e:
+        return JsonResponse({'error': str(e)}, status=504)
+    except ProviderError as e:
+        return JsonResponse({'error': str(e)}, status=502)
+
+    return with_quota_headers(JsonResponse(AITutorResponseSerializer({
+        'answer': entry.answer,
+        'session_id': entry.session_id,
+        'tokens_used': entry.tokens_used,
+        'cache_hit': entry.cache_hit
+    }).data), turn.reservation)
+
+
+@async_api_view
+async def tutor_stream(request, data):
+    """POST /api/ai/async/tutor/stream/ - Même contrat que /api/ai/tutor/stream/"""
+    from apps.ai_tools.models import AITutorSession
+    from apps.ai_tools.quotas import QuotaExceeded
+    from apps.ai_tools.services import TutorService
+
+    try:
+        turn = await sync_to_async(prepare_turn)(request.user, data)
+    except AITutorSession.DoesNotExist:
+        return JsonResponse({'error': 'Session introuvable'}, status=404)
+    except QuotaExceeded as e:
+        return with_quota_headers(JsonResponse({'error': str(e)}, status=429), e.reservation)
+    chunks = TutorService.astream(request.user, turn)
+
+    response = StreamingHttpResponse(
+        SettledEventStream(sse_events(chunks), turn.reservation), content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return with_quota_headers(response, turn.reservation)
+
+
+async def sse_events(chunks):
+    from apps.ai_tools.providers import ProviderError
+
+    try:
+        async for chunk in chunks:
+            yield sse_chunk(chunk)
+    except ProviderError as e:
+        yield sse_event('error', {'error': str(e)})
+    except Exception:
+        logger.exception("Erreur pendant le streaming du tuteur IA")
+        yield sse_event('error', {'error': 'Erreur interne du tuteur IA'})
+    finally:
+        await chunks.aclose()
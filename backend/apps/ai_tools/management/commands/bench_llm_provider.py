@@ -0,0 +1,74 @@
+"""
+Benchmark : appels concurrents au fournisseur LLM (backend local simulé)
+"""
+import statistics
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.ai_tools.providers import FakeBackend, LLMProvider, ProviderError
+
+
+class Command(BaseCommand):
+    help = 'Mesure débit, latences et refus du fournisseur LLM (bulkhead, reprises, disjoncteur)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--calls', type=int, default=200)
+        parser.add_argument('--threads', type=int, default=32)
+        parser.add_argument('--latency', type=float, default=0.05, help='Latence simulée (s)')
+        parser.add_argument('--failure-rate', type=float, default=0.1, help='Taux d\'erreurs transitoires')
+        parser.add_argument('--max-concurrency', type=int, default=None)
+
+    def handle(self, *args, **options):
+        provider_options = dict(settings.AI_PROVIDER_OPTIONS, BACKOFF_BASE=0.01, BACKOFF_MAX=0.1)
+        if options['max_concurrency']:
+            provider_options['MAX_CONCURRENCY'] = options['max_concurrency']
+
+        backend = FakeBackend(provider_options)
+        backend.latency = options['latency']
+        backend.failure_rate = options['failure_rate']
+        calls = Counter()
+        backend.handler = lambda prompt, model: calls.update(['backend']) or 'ok'
+        provider = LLMProvider(backend, provider_options)
+
+        latencies, outcomes = [], Counter()
+        lock = threading.Lock()
+        remaining = iter(range(options['calls']))
+
+        def worker():
+            while True:
+                with lock:
+                    if next(remaining, None) is None:
+                        return
+                started = time.perf_counter()
+                try:
+                    provider.generate('Bonjour')
+                    outcome = 'ok'
+                except ProviderError as e:
+                    outcome = type(e).__name__
+                with lock:
+                    latencies.append(time.perf_counter() - started)
+                    outcomes[outcome] += 1
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker) for _ in range(options['threads'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0
+        self.stdout.write(
+            f"{options['calls']} appels en {elapsed:.2f}s ({options['calls'] / elapsed:.0f}/s), "
+            f"concurrence max {provider_options['MAX_CONCURRENCY']}"
+        )
+        self.stdout.write(
+            f"latence p50 {statistics.median(latencies) * 1000:.0f} ms, p95 {p95 * 1000:.0f} ms"
+        )
+        self.stdout.write(f"résultats : {dict(outcomes)}, appels backend réussis : {calls['backend']}")
+        self.stdout.write(f"disjoncteur : {provider.breaker.state}")
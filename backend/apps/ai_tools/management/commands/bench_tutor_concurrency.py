@@ -0,0 +1,175 @@
+"""
+Benchmark : requêtes simultanées au tuteur IA, vue synchrone (DRF) vs asynchrone
+
+Les requêtes passent par l'application ASGI de Django, comme sous daphne
+(un contexte par requête pour le code synchrone). Django 4.2 attribue un
+thread à chaque contexte de requête, même pour une vue async : le
+nombre de threads du processus reste donc proche du nombre de requêtes,
+mais seule la vue synchrone bloque ces threads pendant l'appel au
+fournisseur.
+"""
+import asyncio
+import json
+import statistics
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from apps.ai_tools.models import AITutorSession
+from apps.ai_tools.providers import FakeBackend, get_provider, reset_providers
+from apps.users.models import User
+
+
+class CountingBackend(FakeBackend):
+    """
+    Backend local qui compte les appels simultanément en attente de réponse
+    et les threads bloqués par ces appels
+    """
+
+    def __init__(self, options):
+        super().__init__(options)
+        self.in_flight = 0
+        self.peak = 0
+        self.threads = set()
+        self._lock = threading.Lock()
+
+    def _enter(self):
+        with self._lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+            self.threads.add(threading.get_ident())
+
+    def _leave(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def generate(self, prompt, model):
+        self._enter()
+        try:
+            return super().generate(prompt, model)
+        finally:
+            self._leave()
+
+    async def agenerate(self, prompt, model):
+        self._enter()
+        try:
+            return await super().agenerate(prompt, model)
+        finally:
+            self._leave()
+
+
+async def asgi_post(application, path, payload, token):
+    """POST JSON via l'application ASGI ; retourne le code de statut"""
+    body = json.dumps(payload).encode()
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': 'POST', 'scheme': 'https', 'path': path, 'raw_path': path.encode(),
+        'query_string': b'', 'root_path': '',
+        'client': ('127.0.0.1', 0), 'server': ('localhost', 443),
+        'headers': [
+            (b'host', b'localhost'),
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode()),
+            (b'authorization', f'Bearer {token}'.encode()),
+        ],
+    }
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    status = None
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        await asyncio.Event().wait()  # pas de déconnexion du client
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+
+    await application(scope, receive, send)
+    return status
+
+
+class Command(BaseCommand):
+    help = 'Compare le nombre de requêtes au tuteur maintenues en vol par la vue synchrone et la vue asynchrone'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--latency', type=float, default=1.0, help='Latence simulée du fournisseur (s)')
+        parser.add_argument(
+            '--unbounded', action='store_true',
+            help='Lever les cloisons du fournisseur (MAX_CONCURRENCY / ASYNC_MAX_CONCURRENCY)'
+        )
+
+    def handle(self, *args, **options):
+        from django.core.asgi import get_asgi_application
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        user, _ = User.objects.get_or_create(email='bench-tutor@edulab.bench')
+        token = str(AccessToken.for_user(user))
+        count = options['requests']
+        provider_options = dict(settings.AI_PROVIDER_OPTIONS)
+        if options['unbounded']:
+            provider_options.update(MAX_CONCURRENCY=count, ASYNC_MAX_CONCURRENCY=count, ACQUIRE_TIMEOUT=60.0)
+        self.stdout.write(
+            f"{count} requêtes simultanées, latence fournisseur {options['latency']}s, cloisons "
+            f"sync {provider_options['MAX_CONCURRENCY']} / async {provider_options['ASYNC_MAX_CONCURRENCY']}"
+        )
+
+        try:
+            with override_settings(
+                AI_PROVIDER='fake',
+                AI_PROVIDER_OPTIONS=provider_options,
+                AI_TUTOR_CACHE=dict(settings.AI_TUTOR_CACHE, ENABLED=False)
+            ):
+                application = get_asgi_application()
+                for label, path in (('synchrone', '/api/ai/tutor/'), ('asynchrone', '/api/ai/async/tutor/')):
+                    reset_providers()
+                    provider = get_provider()
+                    provider.backend = backend = CountingBackend(provider_options)
+                    backend.latency = options['latency']
+
+                    # Boucle dédiée, comme daphne : le code synchrone de chaque requête
+                    # s'exécute dans le thread de son contexte (pas d'async_to_sync englobant)
+                    elapsed, latencies, statuses, threads = asyncio.run(
+                        self._round(application, path, token, count)
+                    )
+                    self.stdout.write(
+                        f"{label:>10} : {elapsed:.2f}s, en vol max {backend.peak}, "
+                        f"threads bloqués par le fournisseur {len(backend.threads)}, "
+                        f"threads du processus max {threads}, p50 {statistics.median(latencies):.2f}s, "
+                        f"statuts {dict(sorted(statuses.items()))}"
+                    )
+        finally:
+            reset_providers()
+            AITutorSession.objects.filter(user=user).delete()
+
+    async def _round(self, application, path, token, count):
+        from collections import Counter
+
+        latencies, statuses = [], Counter()
+        peak_threads = threading.active_count()
+        done = asyncio.Event()
+
+        async def sample_threads():
+            nonlocal peak_threads
+            while not done.is_set():
+                peak_threads = max(peak_threads, threading.active_count())
+                await asyncio.sleep(0.01)
+
+        async def call(i):
+            started = time.perf_counter()
+            status = await asgi_post(application, path, {'question': f'Question de charge {i} ({path})'}, token)
+            latencies.append(time.perf_counter() - started)
+            statuses[status] += 1
+
+        sampler = asyncio.create_task(sample_threads())
+        started = time.perf_counter()
+        await asyncio.gather(*(call(i) for i in range(count)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await sampler
+        return elapsed, latencies, statuses, peak_threads
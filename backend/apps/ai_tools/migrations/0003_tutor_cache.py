@@ -0,0 +1,57 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_tools', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AITutorCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('fingerprint', models.CharField(max_length=64, unique=True)),
+                ('question', models.TextField()),
+                ('subject', models.CharField(blank=True, max_length=100)),
+                ('level', models.CharField(blank=True, max_length=50)),
+                ('style', models.CharField(blank=True, max_length=20)),
+                ('answer', models.TextField()),
+                ('model_used', models.CharField(max_length=50)),
+                ('tokens_used', models.IntegerField(blank=True, null=True)),
+                ('hits', models.IntegerField(default=0)),
+                ('last_hit_at', models.DateTimeField(db_index=True)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Réponse en cache (tuteur IA)',
+                'verbose_name_plural': 'Réponses en cache (tuteur IA)',
+                'db_table': 'ai_tutor_cache_entries',
+            },
+        ),
+        migrations.CreateModel(
+            name='AITutorCacheStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('hits', models.IntegerField(default=0)),
+                ('misses', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Statistique du cache (tuteur IA)',
+                'verbose_name_plural': 'Statistiques du cache (tuteur IA)',
+                'db_table': 'ai_tutor_cache_stats',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.AddField(
+            model_name='aitutorquestion',
+            name='cache_hit',
+            field=models.BooleanField(default=False),
+        ),
+    ]
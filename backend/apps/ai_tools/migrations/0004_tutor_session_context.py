@@ -0,0 +1,27 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_tools', '0003_tutor_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aitutorsession',
+            name='summarized_turns',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='aitutorsession',
+            name='summary',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddIndex(
+            model_name='aitutorquestion',
+            index=models.Index(fields=['session', 'created_at'], name='ai_tutor_qu_session_2164fc_idx'),
+        ),
+    ]
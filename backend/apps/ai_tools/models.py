@@ -11,6 +11,9 @@ class AITutorSession(TimestampMixin, SoftDeleteMixin):
     subject = models.CharField(max_length=100, null=True, blank=True)
     level = models.CharField(max_length=50, null=True, blank=True)
     total_questions = models.IntegerField(default=0)
+    # Résumé des premiers échanges, sortis de la fenêtre de contexte
+    summary = models.TextField(blank=True)
+    summarized_turns = models.IntegerField(default=0)  # nombre d'échanges couverts par le résumé
     
     class Meta:
         db_table = 'ai_tutor_sessions'
@@ -26,10 +29,51 @@ class AITutorQuestion(TimestampMixin):
     model_used = models.CharField(max_length=50)  # gemini, gpt-4, etc.
     tokens_used = models.IntegerField(null=True, blank=True)
     response_time = models.FloatField(null=True, blank=True)  # en secondes
+    cache_hit = models.BooleanField(default=False)  # réponse servie par le cache
     
     class Meta:
         db_table = 'ai_tutor_questions'
         ordering = ['created_at']
+        indexes = [
+            # Fenêtre de contexte et pagination des échanges d'une session
+            models.Index(fields=['session', 'created_at']),
+        ]
+
+class AITutorCacheEntry(TimestampMixin):
+    """Réponse du tuteur en cache, par empreinte de la question normalisée"""
+    fingerprint = models.CharField(max_length=64, unique=True)
+    question = models.TextField()  # question normalisée
+    subject = models.CharField(max_length=100, blank=True)
+    level = models.CharField(max_length=50, blank=True)
+    style = models.CharField(max_length=20, blank=True)
+    answer = models.TextField()
+    model_used = models.CharField(max_length=50)
+    tokens_used = models.IntegerField(null=True, blank=True)
+    hits = models.IntegerField(default=0)
+    last_hit_at = models.DateTimeField(db_index=True)  # éviction LRU
+    expires_at = models.DateTimeField(db_index=True)
+    
+    class Meta:
+        db_table = 'ai_tutor_cache_entries'
+        verbose_name = 'Réponse en cache (tuteur IA)'
+        verbose_name_plural = 'Réponses en cache (tuteur IA)'
+
+class AITutorCacheStat(models.Model):
+    """Succès / échecs quotidiens du cache du tuteur"""
+    date = models.DateField(unique=True)
+    hits = models.IntegerField(default=0)
+    misses = models.IntegerField(default=0)
+    
+    class Meta:
+        db_table = 'ai_tutor_cache_stats'
+        verbose_name = 'Statistique du cache (tuteur IA)'
+        verbose_name_plural = 'Statistiques du cache (tuteur IA)'
+        ordering = ['-date']
+    
+    @property
+    def hit_ratio(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else None
 
 class CodeSnippet(TimestampMixin, SoftDeleteMixin):
     """Sauvegardes du sandbox de code"""
@@ -0,0 +1,502 @@
+# ============================================
+# apps/ai_tools/providers.py - Fournisseurs LLM
+# ============================================
+import asyncio
+import logging
+import random
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderError(Exception):
+    """Erreur d'un fournisseur LLM"""
+
+    def __init__(self, message, retryable=False):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class ProviderTimeout(ProviderError):
+    """Délai de l'appel dépassé"""
+
+    def __init__(self, message='Délai de réponse du fournisseur IA dépassé'):
+        super().__init__(message, retryable=True)
+
+
+class ProviderUnavailable(ProviderError):
+    """Appel refusé sans contacter le fournisseur (circuit ouvert, capacité saturée)"""
+
+
+class ProviderNotConfigured(ProviderError):
+    """Aucun fournisseur utilisable : nom inconnu ou clé d'API absente"""
+
+    def __init__(self, message='Aucune API IA configurée'):
+        super().__init__(message)
+
+
+@dataclass
+class LLMResult:
+    """Réponse d'un fournisseur LLM"""
+    text: str
+    tokens: int = 0
+    model: str = ''
+
+
+def estimate_tokens(text):
+    """
+    Estimation (~4 caractères par token) quand le fournisseur ne renvoie
+    pas l'usage réel : plus proche du tokenizer qu'un décompte de mots
+    """
+    return len(text or '') // 4 + 1
+
+
+# ============================================
+# Backends
+# ============================================
+
+class GeminiBackend:
+    """
+    API Gemini (google-genai). Un seul client par processus : le pool
+    de connexions HTTP (keep-alive, TLS) est réutilisé d'un appel à l'autre.
+    """
+    name = 'gemini'
+    default_model = 'gemini-2.5-flash'
+
+    def __init__(self, options):
+        self.options = options
+        self._client = None
+        self._lock = threading.Lock()
+
+    def is_configured(self):
+        return bool(settings.GEMINI_API_KEY)
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._build_client()
+        return self._client
+
+    def _build_client(self):
+        import httpx
+        from google import genai
+        from google.genai import types
+
+        pool = self.options['POOL_SIZE']
+        timeout = self.options['TIMEOUT']
+        return genai.Client(
+            api_key=settings.GEMINI_API_KEY,
+            http_options=types.HttpOptions(
+                timeout=int(timeout * 1000),
+                # Les reprises sont gérées par LLMProvider (budget global, disjoncteur)
+                retry_options=types.HttpRetryOptions(attempts=1),
+                httpx_client=httpx.Client(
+                    timeout=timeout,
+                    limits=httpx.Limits(max_connections=pool, max_keepalive_connections=pool),
+                ),
+            ),
+        )
+
+    @contextmanager
+    def _translate_errors(self):
+        import httpx
+        from google.genai import errors
+
+        try:
+            yield
+        except httpx.TimeoutException:
+            raise ProviderTimeout()
+        except httpx.TransportError as e:
+            raise ProviderError(f"Connexion au fournisseur IA impossible : {e}", retryable=True)
+        except errors.APIError as e:
+            # 429 et 5xx sont transitoires ; les autres erreurs client ne le sont pas
+            raise ProviderError(str(e), retryable=e.code == 429 or (e.code or 0) >= 500)
+
+    def generate(self, prompt, model):
+        with self._translate_errors():
+            response = self.client.models.generate_content(model=model, contents=prompt)
+
+        text = response.text or ''
+        usage = response.usage_metadata
+        tokens = (usage.total_token_count if usage else None) or estimate_tokens(prompt) + estimate_tokens(text)
+        return LLMResult(text=text, tokens=tokens, model=model)
+
+    def stream(self, prompt, model):
+        """Fragments de la réponse au fil de la génération"""
+        with self._translate_errors():
+            for chunk in self.client.models.generate_content_stream(model=model, contents=prompt):
+                yield self._chunk(chunk, model)
+
+    async def agenerate(self, prompt, model):
+        with self._translate_errors():
+            response = await self.client.aio.models.generate_content(model=model, contents=prompt)
+
+        text = response.text or ''
+        usage = response.usage_metadata
+        tokens = (usage.total_token_count if usage else None) or estimate_tokens(prompt) + estimate_tokens(text)
+        return LLMResult(text=text, tokens=tokens, model=model)
+
+    async def astream(self, prompt, model):
+        with self._translate_errors():
+            async for chunk in await self.client.aio.models.generate_content_stream(model=model, contents=prompt):
+                yield self._chunk(chunk, model)
+
+    @staticmethod
+    def _chunk(chunk, model):
+        usage = chunk.usage_metadata
+        return LLMResult(
+            text=chunk.text or '',
+            tokens=(usage.total_token_count if usage else None) or 0,
+            model=model
+        )
+
+
+class FakeBackend:
+    """
+    Backend local pour les tests et benchmarks (aucun appel réseau).
+    Le handler (prompt, model) -> texte peut être remplacé ; latency simule
+    le temps de réponse (jusqu'au premier fragment en streaming),
+    chunk_delay l'intervalle entre fragments et failure_rate des erreurs
+    transitoires.
+    """
+    name = 'fake'
+    default_model = 'fake'
+    handler = None
+    latency = 0.0
+    chunk_delay = 0.0
+    chunk_words = 5
+    failure_rate = 0.0
+
+    def __init__(self, options):
+        self.options = options
+
+    def is_configured(self):
+        return True
+
+    def _text(self, prompt, model):
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise ProviderError('Erreur simulée', retryable=True)
+        return self.handler(prompt, model) if self.handler else f'[fake] {prompt[:200]}'
+
+    def _chunks(self, prompt, model, text):
+        words = text.split(' ')
+        for start in range(0, len(words), self.chunk_words):
+            last = start + self.chunk_words >= len(words)
+            yield LLMResult(
+                text=' '.join(words[start:start + self.chunk_words]) + ('' if last else ' '),
+                tokens=estimate_tokens(prompt) + estimate_tokens(text) if last else 0,
+                model=model
+            )
+
+    def _wait(self):
+        """Latence simulée, bornée par le délai d'appel"""
+        return min(self.latency, self.options['TIMEOUT'])
+
+    def generate(self, prompt, model):
+        if self.latency:
+            time.sleep(self._wait())
+            if self.latency > self.options['TIMEOUT']:
+                raise ProviderTimeout()
+        text = self._text(prompt, model)
+        return LLMResult(text=text, tokens=estimate_tokens(prompt) + estimate_tokens(text), model=model)
+
+    def stream(self, prompt, model):
+        if self.latency:
+            time.sleep(self._wait())
+            if self.latency > self.options['TIMEOUT']:
+                raise ProviderTimeout()
+        for index, chunk in enumerate(self._chunks(prompt, model, self._text(prompt, model))):
+            if index and self.chunk_delay:
+                time.sleep(self.chunk_delay)
+            yield chunk
+
+    async def agenerate(self, prompt, model):
+        if self.latency:
+            await asyncio.sleep(self._wait())
+            if self.latency > self.options['TIMEOUT']:
+                raise ProviderTimeout()
+        text = self._text(prompt, model)
+        return LLMResult(text=text, tokens=estimate_tokens(prompt) + estimate_tokens(text), model=model)
+
+    async def astream(self, prompt, model):
+        if self.latency:
+            await asyncio.sleep(self._wait())
+            if self.latency > self.options['TIMEOUT']:
+                raise ProviderTimeout()
+        for index, chunk in enumerate(self._chunks(prompt, model, self._text(prompt, model))):
+            if index and self.chunk_delay:
+                await asyncio.sleep(self.chunk_delay)
+            yield chunk
+
+
+BACKENDS = {
+    'gemini': GeminiBackend,
+    'fake': FakeBackend,
+}
+
+
+# ============================================
+# Protections : disjoncteur et cloisonnement
+# ============================================
+
+class CircuitBreaker:
+    """
+    Disjoncteur : après `threshold` échecs consécutifs, les appels échouent
+    immédiatement pendant `reset_timeout` secondes, puis un seul appel
+    d'essai décide de la refermeture.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+    TRIAL = 'trial'  # valeur de allow() pour l'appel d'essai
+
+    def __init__(self, threshold, reset_timeout):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return self.TRIAL
+            return False
+
+    def end_trial(self):
+        """
+        Fin de l'appel d'essai. S'il n'a conclu ni succès ni échec (erreur
+        non transitoire, cloison pleine, client parti...), le circuit repasse
+        ouvert avec le même horodatage : l'appel suivant sera un nouvel essai.
+        """
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.OPEN
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"Disjoncteur IA ouvert après {self.failures} échecs")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class LLMProvider:
+    """
+    Point d'accès unique aux LLM : client partagé, délai par appel,
+    concurrence bornée, reprises avec gigue et disjoncteur.
+    Les variantes agenerate / astream servent les vues asynchrones : elles
+    partagent le disjoncteur mais ont leur propre cloison (asyncio), un
+    appel en attente n'occupant pas de thread.
+    """
+
+    def __init__(self, backend, options):
+        self.backend = backend
+        self.options = options
+        self.breaker = CircuitBreaker(options['BREAKER_THRESHOLD'], options['BREAKER_RESET'])
+        self.bulkhead = threading.BoundedSemaphore(options['MAX_CONCURRENCY'])
+        self._async_bulkhead = None  # (boucle, asyncio.Semaphore)
+
+    @property
+    def name(self):
+        return self.backend.name
+
+    def is_configured(self):
+        return self.backend.is_configured()
+
+    @contextmanager
+    def _slot(self):
+        """
+        Disjoncteur puis place dans la cloison, pour la durée d'un essai.
+        Un appel d'essai rend toujours la main au disjoncteur en sortant
+        (succès et échecs transitoires sont enregistrés ensuite par l'appelant).
+        """
+        allowed = self.breaker.allow()
+        if not allowed:
+            raise ProviderUnavailable('Fournisseur IA temporairement indisponible')
+        try:
+            if not self.bulkhead.acquire(timeout=self.options['ACQUIRE_TIMEOUT']):
+                raise ProviderUnavailable('Fournisseur IA saturé, réessayez plus tard')
+            try:
+                yield
+            finally:
+                self.bulkhead.release()
+        finally:
+            if allowed == CircuitBreaker.TRIAL:
+                self.breaker.end_trial()
+
+    @asynccontextmanager
+    async def _aslot(self):
+        allowed = self.breaker.allow()
+        if not allowed:
+            raise ProviderUnavailable('Fournisseur IA temporairement indisponible')
+        try:
+            loop = asyncio.get_running_loop()
+            if self._async_bulkhead is None or self._async_bulkhead[0] is not loop:
+                self._async_bulkhead = (loop, asyncio.Semaphore(self.options['ASYNC_MAX_CONCURRENCY']))
+            bulkhead = self._async_bulkhead[1]
+            try:
+                await asyncio.wait_for(bulkhead.acquire(), self.options['ACQUIRE_TIMEOUT'])
+            except asyncio.TimeoutError:
+                raise ProviderUnavailable('Fournisseur IA saturé, réessayez plus tard')
+            try:
+                yield
+            finally:
+                bulkhead.release()
+        finally:
+            if allowed == CircuitBreaker.TRIAL:
+                self.breaker.end_trial()
+
+    def _backoff(self, error, attempt, deadline):
+        """Enregistre l'échec et retourne l'attente avant le prochain essai, ou relève l'erreur"""
+        if not error.retryable:
+            raise error
+        self.breaker.record_failure()
+
+        # Backoff exponentiel à gigue complète, dans le budget de l'appel
+        delay = random.uniform(0, min(self.options['BACKOFF_MAX'], self.options['BACKOFF_BASE'] * 2 ** attempt))
+        if attempt > self.options['RETRIES'] or time.monotonic() + delay >= deadline:
+            raise error
+        logger.info(f"Appel IA en échec ({error}), nouvel essai {attempt} dans {delay:.2f}s")
+        return delay
+
+    def generate(self, prompt, model=None):
+        model = model or self.backend.default_model
+        deadline = time.monotonic() + self.options['DEADLINE']
+        attempt = 0
+
+        while True:
+            try:
+                with self._slot():
+                    result = self.backend.generate(prompt, model)
+            except ProviderUnavailable:
+                raise
+            except ProviderError as e:
+                attempt += 1
+                time.sleep(self._backoff(e, attempt, deadline))
+            else:
+                self.breaker.record_success()
+                return result
+
+    async def agenerate(self, prompt, model=None):
+        model = model or self.backend.default_model
+        deadline = time.monotonic() + self.options['DEADLINE']
+        attempt = 0
+
+        while True:
+            try:
+                async with self._aslot():
+                    try:
+                        result = await asyncio.wait_for(
+                            self.backend.agenerate(prompt, model), self.options['TIMEOUT']
+                        )
+                    except asyncio.TimeoutError:
+                        raise ProviderTimeout()
+            except ProviderUnavailable:
+                raise
+            except ProviderError as e:
+                attempt += 1
+                await asyncio.sleep(self._backoff(e, attempt, deadline))
+            else:
+                self.breaker.record_success()
+                return result
+
+    def stream(self, prompt, model=None):
+        """
+        Itère sur les fragments (LLMResult) de la réponse. Les reprises ne
+        sont possibles qu'avant le premier fragment ; la place dans la
+        cloison est tenue jusqu'à la fin du flux.
+        """
+        model = model or self.backend.default_model
+        deadline = time.monotonic() + self.options['DEADLINE']
+        attempt = 0
+
+        while True:
+            started = False
+            try:
+                with self._slot():
+                    for chunk in self.backend.stream(prompt, model):
+                        started = True
+                        yield chunk
+            except ProviderUnavailable:
+                raise
+            except ProviderError as e:
+                if started:
+                    if e.retryable:
+                        self.breaker.record_failure()
+                    raise
+                attempt += 1
+                time.sleep(self._backoff(e, attempt, deadline))
+            else:
+                self.breaker.record_success()
+                return
+
+    async def astream(self, prompt, model=None):
+        """Variante asynchrone de stream()"""
+        model = model or self.backend.default_model
+        deadline = time.monotonic() + self.options['DEADLINE']
+        attempt = 0
+
+        while True:
+            started = False
+            try:
+                async with self._aslot():
+                    async for chunk in self.backend.astream(prompt, model):
+                        started = True
+                        yield chunk
+            except ProviderUnavailable:
+                raise
+            except ProviderError as e:
+                if started:
+                    if e.retryable:
+                        self.breaker.record_failure()
+                    raise
+                attempt += 1
+                await asyncio.sleep(self._backoff(e, attempt, deadline))
+            else:
+                self.breaker.record_success()
+                return
+
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+def get_provider(name=None):
+    """Fournisseur (singleton par processus) configuré par settings.AI_PROVIDER"""
+    name = name or settings.AI_PROVIDER
+    provider = _providers.get(name)
+    if provider is None:
+        with _providers_lock:
+            provider = _providers.get(name)
+            if provider is None:
+                try:
+                    backend_class = BACKENDS[name]
+                except KeyError:
+                    raise ProviderNotConfigured(f"Fournisseur IA inconnu : {name}")
+                options = settings.AI_PROVIDER_OPTIONS
+                provider = _providers[name] = LLMProvider(backend_class(options), options)
+    return provider
+
+
+def reset_providers():
+    """Oublie les fournisseurs construits (changement de configuration, tests)"""
+    with _providers_lock:
+        _providers.clear()
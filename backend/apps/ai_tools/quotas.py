@@ -0,0 +1,224 @@
+# ============================================
+# apps/ai_tools/quotas.py - Quotas IA (seaux à jetons)
+# ============================================
+"""
+Quotas de tokens LLM par utilisateur et global, en seaux à jetons :
+chaque seau contient au plus CAPACITY tokens et se remplit à raison de
+CAPACITY / PERIOD par seconde.
+
+Avant l'appel au fournisseur, le coût estimé du prompt est réservé sur
+les deux seaux (refus 429 si l'un d'eux ne le couvre pas) ; une fois
+la réponse reçue, la réservation est régularisée avec les tokens
+réellement consommés (tokens_used de AITutorQuestion, 0 pour une
+réponse servie par le cache). Un seau peut alors passer en négatif :
+la dette est remboursée par le remplissage.
+
+Les seaux sont dans Redis (script Lua atomique, partagé entre
+processus) ou en mémoire (un seau par processus). Si Redis est
+indisponible, le stockage en mémoire prend le relais.
+"""
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass, field
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class QuotaExceeded(Exception):
+    """Quota de tokens IA épuisé"""
+
+    def __init__(self, reservation):
+        super().__init__('Quota IA atteint, réessayez plus tard')
+        self.reservation = reservation
+
+
+@dataclass
+class Bucket:
+    key: str
+    capacity: int
+    rate: float  # tokens par seconde
+
+
+@dataclass
+class Reservation:
+    """Résultat d'une réservation sur les seaux d'un utilisateur"""
+    buckets: list
+    cost: int
+    granted: bool
+    levels: list = field(default_factory=list)  # niveau de chaque seau après réservation
+    settled: bool = False
+
+    @property
+    def retry_after(self):
+        """Secondes avant que tous les seaux couvrent le coût"""
+        waits = [
+            (min(self.cost, bucket.capacity) - level) / bucket.rate
+            for bucket, level in zip(self.buckets, self.levels)
+        ]
+        return max(math.ceil(max(waits, default=0)), 1)
+
+    def headers(self):
+        """En-têtes X-RateLimit-* du seau de l'utilisateur (le premier)"""
+        bucket, level = self.buckets[0], self.levels[0]
+        headers = {
+            'X-RateLimit-Limit': str(bucket.capacity),
+            'X-RateLimit-Remaining': str(max(int(level), 0)),
+            'X-RateLimit-Reset': str(math.ceil(max(bucket.capacity - level, 0) / bucket.rate)),
+        }
+        if not self.granted:
+            headers['Retry-After'] = str(self.retry_after)
+        return headers
+
+
+# ============================================
+# Stockage des seaux
+# ============================================
+
+class MemoryBucketStore:
+    """Seaux du processus courant"""
+
+    def __init__(self):
+        self._buckets = {}  # clé -> (niveau, horodatage)
+        self._lock = threading.Lock()
+
+    def take(self, buckets, cost, force=False):
+        """
+        Remplit puis débite cost de chaque seau, tous ou aucun.
+        force : débit sans contrôle (régularisation). Retourne (accordé, niveaux).
+        """
+        now = time.time()
+        with self._lock:
+            levels = []
+            for bucket in buckets:
+                level, updated = self._buckets.get(bucket.key, (bucket.capacity, now))
+                levels.append(min(bucket.capacity, level + max(now - updated, 0) * bucket.rate))
+
+            granted = force or all(level >= min(cost, bucket.capacity) for bucket, level in zip(buckets, levels))
+            if granted:
+                levels = [min(bucket.capacity, level - cost) for bucket, level in zip(buckets, levels)]
+            for bucket, level in zip(buckets, levels):
+                self._buckets[bucket.key] = (level, now)
+            return granted, levels
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class RedisBucketStore:
+    """Seaux partagés dans Redis, mis à jour par un script Lua atomique"""
+
+    # KEYS : seaux ; ARGV : maintenant, coût, force, puis (capacité, débit) par seau
+    SCRIPT = """
+local now, cost, force = tonumber(ARGV[1]), tonumber(ARGV[2]), ARGV[3] == '1'
+local levels, granted = {}, true
+for i, key in ipairs(KEYS) do
+    local capacity, rate = tonumber(ARGV[2 + 2 * i]), tonumber(ARGV[3 + 2 * i])
+    local state = redis.call('HMGET', key, 'level', 'ts')
+    local level = tonumber(state[1]) or capacity
+    local elapsed = math.max(now - (tonumber(state[2]) or now), 0)
+    levels[i] = math.min(capacity, level + elapsed * rate)
+    if levels[i] < math.min(cost, capacity) then
+        granted = false
+    end
+end
+granted = granted or force
+local result = {granted and 1 or 0}
+for i, key in ipairs(KEYS) do
+    local capacity, rate = tonumber(ARGV[2 + 2 * i]), tonumber(ARGV[3 + 2 * i])
+    if granted then
+        levels[i] = math.min(capacity, levels[i] - cost)
+    end
+    redis.call('HSET', key, 'level', tostring(levels[i]), 'ts', tostring(now))
+    -- Un seau plein est équivalent à un seau absent
+    redis.call('EXPIRE', key, math.ceil((capacity - levels[i]) / rate) + 1)
+    result[i + 1] = tostring(levels[i])
+end
+return result
+"""
+
+    def __init__(self, client):
+        self.script = client.register_script(self.SCRIPT)
+
+    def take(self, buckets, cost, force=False):
+        args = [time.time(), cost, 1 if force else 0]
+        for bucket in buckets:
+            args += [bucket.capacity, bucket.rate]
+        granted, *levels = self.script(keys=[bucket.key for bucket in buckets], args=args)
+        return bool(int(granted)), [float(level) for level in levels]
+
+
+# ============================================
+# Quotas du tuteur
+# ============================================
+
+class AIQuota:
+    """Réservation et régularisation des tokens IA d'un utilisateur"""
+
+    KEY_PREFIX = 'ai:quota'
+    REDIS_RETRY = 30.0  # secondes en mémoire après une erreur Redis
+
+    _memory = MemoryBucketStore()
+    _redis = None
+    _redis_retry_at = 0.0
+
+    @staticmethod
+    def config():
+        return settings.AI_QUOTA
+
+    @classmethod
+    def buckets(cls, user_id):
+        config = cls.config()
+        return [
+            Bucket(f'{cls.KEY_PREFIX}:user:{user_id}', config['USER_TOKENS'],
+                   config['USER_TOKENS'] / config['USER_PERIOD']),
+            Bucket(f'{cls.KEY_PREFIX}:global', config['GLOBAL_TOKENS'],
+                   config['GLOBAL_TOKENS'] / config['GLOBAL_PERIOD']),
+        ]
+
+    @classmethod
+    def _take(cls, buckets, cost, force=False):
+        if cls.config()['STORE'] == 'redis' and time.monotonic() >= cls._redis_retry_at:
+            try:
+                if cls._redis is None:
+                    from apps.core.redis_client import get_redis_client
+                    cls._redis = RedisBucketStore(get_redis_client())
+                return cls._redis.take(buckets, cost, force)
+            except Exception as e:
+                cls._redis_retry_at = time.monotonic() + cls.REDIS_RETRY
+                logger.warning(f"Quotas IA : Redis indisponible, seaux en mémoire ({e})")
+        return cls._memory.take(buckets, cost, force)
+
+    @classmethod
+    def reserve(cls, user_id, cost):
+        """
+        Réserve cost tokens sur les seaux de l'utilisateur et le seau global.
+        Retourne la Reservation (None si les quotas sont désactivés) ;
+        lève QuotaExceeded si l'un des seaux ne couvre pas le coût.
+        """
+        if not cls.config()['ENABLED']:
+            return None
+        buckets = cls.buckets(user_id)
+        granted, levels = cls._take(buckets, cost)
+        reservation = Reservation(buckets=buckets, cost=cost, granted=granted, levels=levels)
+        if not granted:
+            raise QuotaExceeded(reservation)
+        return reservation
+
+    @classmethod
+    def settle(cls, reservation, used):
+        """Régularise une réservation avec les tokens réellement consommés (une seule fois)"""
+        if reservation is None or reservation.settled:
+            return
+        reservation.settled = True
+        if used != reservation.cost:
+            _, reservation.levels = cls._take(reservation.buckets, used - reservation.cost, force=True)
+
+    @classmethod
+    def reset(cls):
+        """Vide les seaux en mémoire (tests)"""
+        cls._memory.reset()
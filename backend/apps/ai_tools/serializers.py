@@ -8,6 +8,7 @@ class AITutorRequestSerializer(serializers.Serializer):
     subject = serializers.CharField(max_length=100, required=False)
     level = serializers.CharField(max_length=50, required=False)
     style = serializers.CharField(max_length=100, required=False)
+    session_id = serializers.IntegerField(required=False)  # poursuivre une session existante
     conversation_history = serializers.ListField(
         child=serializers.DictField(),
         required=False,
@@ -18,4 +19,21 @@ class AITutorResponseSerializer(serializers.Serializer):
     answer = serializers.CharField()
     session_id = serializers.IntegerField()
     tokens_used = serializers.IntegerField(required=False)
+    cache_hit = serializers.BooleanField(required=False)
 
+
+class AITutorSessionSerializer(serializers.Serializer):
+    """Résumé léger d'une session (sans les échanges)"""
+    id = serializers.IntegerField()
+    subject = serializers.CharField(allow_null=True)
+    level = serializers.CharField(allow_null=True)
+    total_questions = serializers.IntegerField()
+    created_at = serializers.DateTimeField()
+    updated_at = serializers.DateTimeField()
+    first_question = serializers.CharField(allow_null=True)
+
+class AITutorTurnSerializer(serializers.Serializer):
+    question = serializers.CharField()
+    answer = serializers.CharField()
+    cache_hit = serializers.BooleanField()
+    created_at = serializers.DateTimeField()
@@ -0,0 +1,522 @@
+# ============================================
+# apps/ai_tools/services.py - Tuteur IA
+# ============================================
+import hashlib
+import logging
+import re
+import time
+import unicodedata
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from apps.ai_tools.models import (
+    AITutorSession, AITutorQuestion, AITutorCacheEntry, AITutorCacheStat
+)
+from apps.ai_tools.providers import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Styles de réponse : (mots-clés reconnus dans le libellé, consigne)
+STYLES = {
+    'simple': (('Simple', 'Concis'), "Sois concis et va droit au but. Utilise un langage simple."),
+    'detailed': (('Détaillé', 'Académique'), "Fournis une explication détaillée et académique avec des références théoriques."),
+    'eli5': (('5 ans', 'ELI5'), "Explique comme si tu parlais à un enfant de 5 ans. Utilise des analogies simples et amusantes."),
+    'practical': (('Pratique', 'Exemples'), "Concentre-toi sur des exemples pratiques et concrets. Montre comment appliquer les concepts."),
+    'socratic': (('Socratique',), "Utilise la méthode socratique : pose des questions pour guider l'étudiant vers la réponse."),
+}
+
+TUTOR_MODEL = 'gemini-flash-latest'
+
+
+def style_key(style):
+    """Style canonique ('' si non reconnu) : les libellés équivalents partagent le cache"""
+    for key, (keywords, _) in STYLES.items():
+        if style and any(keyword in style for keyword in keywords):
+            return key
+    return ''
+
+
+def normalize(text):
+    """Minuscules, sans accents, espaces et ponctuation finale normalisés"""
+    text = unicodedata.normalize('NFKD', (text or '').lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text.rstrip(' ?!.;:')
+
+
+def build_prompt(question, subject, level, style='', context=''):
+    """Prompt du tuteur pédagogique (context : échanges précédents de la session)"""
+    key = style_key(style)
+    style_instruction = STYLES[key][1] if key else ''
+    history = f"\nÉchanges précédents de la session :\n{context}\n" if context else ''
+
+    return f"""Tu es un tuteur pédagogique bienveillant et patient pour EduLab Africa.
+L'étudiant est basé en Afrique.
+
+Contexte:
+Matière: {subject if subject else 'Général'}
+Niveau: {level if level else 'Adapté'}
+{f'Style: {style_instruction}' if style_instruction else ''}
+{history}
+Question de l'étudiant: {question}
+
+Réponds de manière claire, structurée et pédagogique. Utilise des exemples culturellement pertinents pour un étudiant africain si possible.
+
+IMPORTANT - Formatage des formules :
+- Pour les formules mathématiques inline (dans le texte), utilise la syntaxe : $formule$
+  Exemple: La formule $E = mc^2$ est célèbre
+- Pour les formules mathématiques en bloc (centrées), utilise : $$formule$$
+  Exemple: $$\\int_{{a}}^{{b}} x^2 dx = \\frac{{b^3 - a^3}}{{3}}$$
+- Pour les formules chimiques, utilise aussi $ : $H_2O$, $CO_2$, $C_6H_{{12}}O_6$
+- Pour les équations chimiques : $$CH_4 + 2O_2 \\rightarrow CO_2 + 2H_2O$$
+- Utilise TOUJOURS cette syntaxe LaTeX pour TOUTES les formules mathématiques et chimiques
+"""
+
+
+class TutorAnswerCache:
+    """
+    Cache des réponses du tuteur, en base, par empreinte de
+    (question, matière, niveau, style) normalisés.
+    Expiration par TTL ; au-delà de MAX_ENTRIES, les entrées les moins
+    récemment servies sont évincées (tâche ai_tools.evict_tutor_cache).
+    """
+
+    @staticmethod
+    def config():
+        return settings.AI_TUTOR_CACHE
+
+    @staticmethod
+    def fingerprint(question, subject, level, style):
+        key = '\x1f'.join([normalize(question), normalize(subject), normalize(level), style_key(style)])
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def get(cls, fingerprint):
+        """Entrée valide pour l'empreinte (et comptabilise le succès / l'échec)"""
+        if not cls.config()['ENABLED']:
+            return None
+
+        now = timezone.now()
+        entry = AITutorCacheEntry.objects.filter(fingerprint=fingerprint, expires_at__gt=now).first()
+        if entry is not None:
+            AITutorCacheEntry.objects.filter(pk=entry.pk).update(hits=F('hits') + 1, last_hit_at=now)
+        cls.record(hit=entry is not None)
+        return entry
+
+    @classmethod
+    def set(cls, fingerprint, question, subject, level, style, answer, model_used, tokens):
+        if not cls.config()['ENABLED']:
+            return
+        now = timezone.now()
+        # hits n'est pas réinitialisé : une entrée rafraîchie garde son historique de succès
+        AITutorCacheEntry.objects.update_or_create(
+            fingerprint=fingerprint,
+            defaults={
+                'question': normalize(question),
+                'subject': normalize(subject)[:100],
+                'level': normalize(level)[:50],
+                'style': style_key(style),
+                'answer': answer,
+                'model_used': model_used,
+                'tokens_used': tokens,
+                'last_hit_at': now,
+                'expires_at': now + timedelta(seconds=cls.config()['TTL']),
+            }
+        )
+
+    @staticmethod
+    def record(hit):
+        """Compteurs quotidiens (succès / échecs) pour le ratio affiché dans l'admin"""
+        field = 'hits' if hit else 'misses'
+        today = timezone.localdate()
+        if AITutorCacheStat.objects.filter(date=today).update(**{field: F(field) + 1}):
+            return
+        try:
+            with transaction.atomic():
+                AITutorCacheStat.objects.create(date=today, **{field: 1})
+        except IntegrityError:
+            AITutorCacheStat.objects.filter(date=today).update(**{field: F(field) + 1})
+
+    @classmethod
+    def evict(cls):
+        """Supprime les entrées expirées puis les moins récemment servies. Retourne le nombre supprimé."""
+        deleted, _ = AITutorCacheEntry.objects.filter(expires_at__lte=timezone.now()).delete()
+
+        overflow = AITutorCacheEntry.objects.count() - cls.config()['MAX_ENTRIES']
+        if overflow > 0:
+            lru = list(AITutorCacheEntry.objects.order_by('last_hit_at').values_list('pk', flat=True)[:overflow])
+            deleted += AITutorCacheEntry.objects.filter(pk__in=lru).delete()[0]
+        return deleted
+
+
+def clip(text, limit):
+    return text if len(text) <= limit else text[:limit].rstrip() + '…'
+
+
+@dataclass
+class TutorTurn:
+    """Question préparée : session poursuivie (None : nouvelle session), prompt et empreinte de cache"""
+    session: object
+    question: str
+    subject: str
+    level: str
+    style: str
+    prompt: str
+    fingerprint: str = None  # None quand la question a un contexte : pas de cache
+    reservation: object = None  # réservation sur les quotas IA (TutorService.admit)
+
+
+class TutorContext:
+    """
+    Contexte d'une session multi-tours : le résumé des premiers échanges
+    puis les échanges les plus récents, repris tels quels dans la limite
+    de MAX_TOKENS. Les échanges sortis de la fenêtre sont intégrés au
+    résumé en tâche de fond (ai_tools.summarize_tutor_session), dès qu'ils
+    sont au moins SUMMARY_MIN_TURNS.
+    """
+
+    @staticmethod
+    def config():
+        return settings.AI_TUTOR_CONTEXT
+
+    @classmethod
+    def window(cls, session):
+        """Échanges récents non résumés qui tiennent dans le budget, du plus ancien au plus récent"""
+        config = cls.config()
+        budget = config['MAX_TOKENS']
+        unsummarized = max(session.total_questions - session.summarized_turns, 0)
+        recent = (
+            session.questions.order_by('-created_at', '-id')
+            .only('question', 'answer')[:min(config['MAX_TURNS'], unsummarized)]
+        )
+
+        turns = []
+        for turn in recent:
+            budget -= estimate_tokens(turn.question) + estimate_tokens(turn.answer)
+            if budget < 0:
+                break
+            turns.append(turn)
+        return turns[::-1]
+
+    @classmethod
+    def build(cls, session):
+        """Texte de contexte pour le prompt ; planifie le résumé des échanges sortis de la fenêtre"""
+        turns = cls.window(session)
+        pending = session.total_questions - session.summarized_turns - len(turns)
+        if pending >= cls.config()['SUMMARY_MIN_TURNS']:
+            transaction.on_commit(lambda: cls.schedule_summary(session.pk))
+
+        parts = [f"Résumé des échanges précédents : {session.summary}"] if session.summary else []
+        parts += [f"Étudiant : {turn.question}\nTuteur : {turn.answer}" for turn in turns]
+        return '\n\n'.join(parts)
+
+    @staticmethod
+    def schedule_summary(session_id):
+        from apps.ai_tools.tasks import summarize_tutor_session
+        try:
+            summarize_tutor_session.delay(session_id)
+        except Exception as e:
+            # Le résumé sera replanifié à la prochaine question de la session
+            logger.warning(f"Planification du résumé de la session {session_id} impossible : {e}")
+
+    @classmethod
+    def summarize(cls, session_id):
+        """
+        Intègre au résumé les plus anciens échanges sortis de la fenêtre
+        (au plus MAX_TURNS par appel). Retourne le nombre d'échanges résumés.
+        """
+        from apps.ai_tools.providers import get_provider
+
+        session = AITutorSession.objects.filter(pk=session_id).first()
+        if session is None:
+            return 0
+
+        config = cls.config()
+        start = session.summarized_turns
+        end = min(session.total_questions - len(cls.window(session)), start + config['MAX_TURNS'])
+        if end <= start:
+            return 0
+
+        # Prompt borné : chaque texte est tronqué à sa part du budget
+        limit = config['MAX_TOKENS'] * 4 // config['MAX_TURNS']
+        turns = session.questions.order_by('created_at', 'id').only('question', 'answer')[start:end]
+        exchanges = '\n\n'.join(
+            f"Étudiant : {clip(turn.question, limit)}\nTuteur : {clip(turn.answer, limit)}" for turn in turns
+        )
+        prompt = f"""Tu résumes une conversation entre un étudiant et son tuteur pédagogique.
+Mets à jour le résumé ci-dessous avec les nouveaux échanges, en quelques phrases :
+notions abordées, difficultés de l'étudiant, points restés en suspens.
+
+Résumé actuel : {session.summary or '(aucun)'}
+
+Nouveaux échanges :
+{exchanges}
+
+Réponds uniquement par le résumé mis à jour."""
+
+        result = get_provider().generate(prompt, model=TUTOR_MODEL)
+
+        # Ne s'applique que si aucun autre résumé n'est passé entre-temps
+        updated = AITutorSession.objects.filter(pk=session.pk, summarized_turns=start).update(
+            summary=result.text.strip(), summarized_turns=end
+        )
+        return end - start if updated else 0
+
+
+class TutorService:
+    """Questions au tuteur IA : contexte de session, cache, appel au fournisseur, historique"""
+
+    @staticmethod
+    def prepare(user, question, subject='', level='', style='', session_id=None):
+        """
+        Prépare une question, dans une nouvelle session ou à la suite de
+        session_id (AITutorSession.DoesNotExist si elle n'appartient pas à
+        l'utilisateur). Le cache n'est utilisé que sans contexte : la
+        réponse dépend sinon des échanges précédents.
+        """
+        session, context = None, ''
+        if session_id is not None:
+            session = AITutorSession.objects.get(pk=session_id, user=user, is_active=True)
+            subject = subject or session.subject or ''
+            level = level or session.level or ''
+            context = TutorContext.build(session)
+
+        return TutorTurn(
+            session=session,
+            question=question,
+            subject=subject,
+            level=level,
+            style=style,
+            prompt=build_prompt(question, subject, level, style, context),
+            fingerprint=None if context else TutorAnswerCache.fingerprint(question, subject, level, style)
+        )
+
+    @staticmethod
+    def lookup(turn):
+        return TutorAnswerCache.get(turn.fingerprint) if turn.fingerprint else None
+
+    @staticmethod
+    def store(turn, answer, model_used, tokens):
+        if turn.fingerprint:
+            TutorAnswerCache.set(
+                turn.fingerprint, turn.question, turn.subject, turn.level, turn.style, answer, model_used, tokens
+            )
+
+    @staticmethod
+    def admit(user, turn):
+        """
+        Réserve le coût estimé du prompt sur les quotas IA, avant tout appel
+        au fournisseur (QuotaExceeded si épuisés). La réservation est
+        régularisée par ask() / stream() avec les tokens réellement consommés.
+        """
+        from apps.ai_tools.quotas import AIQuota
+
+        turn.reservation = AIQuota.reserve(user.pk, estimate_tokens(turn.prompt))
+        return turn.reservation
+
+    @classmethod
+    def ask(cls, user, turn):
+        """
+        Répond à une question préparée et l'enregistre dans l'historique.
+        Retourne l'AITutorQuestion créée. Lève ProviderError si le
+        fournisseur échoue (ProviderNotConfigured si aucun n'est configuré).
+        """
+        from apps.ai_tools.providers import ProviderNotConfigured, get_provider
+        from apps.ai_tools.quotas import AIQuota
+
+        started = time.perf_counter()
+        used = 0  # tokens facturés sur les quotas : 0 rembourse la réservation
+        try:
+            entry = cls.lookup(turn)
+
+            if entry is not None:
+                answer, tokens, model_used = entry.answer, entry.tokens_used, entry.model_used
+            else:
+                provider = get_provider()
+                if provider.is_configured():
+                    result = provider.generate(turn.prompt, model=TUTOR_MODEL)
+                    answer, tokens, model_used = result.text, result.tokens, provider.name
+                elif settings.OPENAI_API_KEY:
+                    answer, tokens = cls._call_openai(turn.prompt)
+                    model_used = 'openai'
+                else:
+                    raise ProviderNotConfigured()
+                used = tokens or 0
+                cls.store(turn, answer, model_used, tokens)
+
+            return cls.record(
+                user, turn, answer, model_used, tokens,
+                response_time=time.perf_counter() - started,
+                cache_hit=entry is not None
+            )
+        finally:
+            AIQuota.settle(turn.reservation, used)
+
+    @classmethod
+    def stream(cls, user, turn):
+        """
+        Variante en streaming de ask() : itère sur les fragments de texte
+        (str) puis se termine par l'AITutorQuestion enregistrée. L'historique
+        et le cache ne sont écrits qu'une fois le flux complet.
+        """
+        from apps.ai_tools.providers import ProviderNotConfigured, get_provider
+        from apps.ai_tools.quotas import AIQuota
+
+        started = time.perf_counter()
+        used = 0
+        try:
+            entry = cls.lookup(turn)
+
+            if entry is not None:
+                yield entry.answer
+                answer, tokens, model_used = entry.answer, entry.tokens_used, entry.model_used
+            else:
+                provider = get_provider()
+                if not provider.is_configured():
+                    raise ProviderNotConfigured()
+
+                parts, tokens = [], 0
+                for chunk in provider.stream(turn.prompt, model=TUTOR_MODEL):
+                    if chunk.text:
+                        parts.append(chunk.text)
+                        yield chunk.text
+                    tokens = max(tokens, chunk.tokens)
+
+                answer, model_used = ''.join(parts), provider.name
+                tokens = tokens or estimate_tokens(turn.prompt) + estimate_tokens(answer)
+                used = tokens
+                cls.store(turn, answer, model_used, tokens)
+
+            yield cls.record(
+                user, turn, answer, model_used, tokens,
+                response_time=time.perf_counter() - started,
+                cache_hit=entry is not None
+            )
+        finally:
+            AIQuota.settle(turn.reservation, used)
+
+    @classmethod
+    async def aask(cls, user, turn):
+        """
+        Variante asynchrone de ask() pour les vues ASGI : l'appel au
+        fournisseur est attendu sans occuper de thread, les accès ORM
+        passent par sync_to_async.
+        """
+        from asgiref.sync import sync_to_async
+        from apps.ai_tools.providers import ProviderNotConfigured, get_provider
+        from apps.ai_tools.quotas import AIQuota
+
+        started = time.perf_counter()
+        used = 0
+        try:
+            entry = await sync_to_async(cls.lookup)(turn)
+
+            if entry is not None:
+                answer, tokens, model_used = entry.answer, entry.tokens_used, entry.model_used
+            else:
+                provider = get_provider()
+                if not provider.is_configured():
+                    raise ProviderNotConfigured()
+                result = await provider.agenerate(turn.prompt, model=TUTOR_MODEL)
+                answer, tokens, model_used = result.text, result.tokens, provider.name
+                used = tokens
+                await sync_to_async(cls.store)(turn, answer, model_used, tokens)
+
+            return await sync_to_async(cls.record)(
+                user, turn, answer, model_used, tokens,
+                response_time=time.perf_counter() - started,
+                cache_hit=entry is not None
+            )
+        finally:
+            await sync_to_async(AIQuota.settle)(turn.reservation, used)
+
+    @classmethod
+    async def astream(cls, user, turn):
+        """Variante asynchrone de stream()"""
+        from asgiref.sync import sync_to_async
+        from apps.ai_tools.providers import ProviderNotConfigured, get_provider
+        from apps.ai_tools.quotas import AIQuota
+
+        started = time.perf_counter()
+        used = 0
+        try:
+            entry = await sync_to_async(cls.lookup)(turn)
+
+            if entry is not None:
+                yield entry.answer
+                answer, tokens, model_used = entry.answer, entry.tokens_used, entry.model_used
+            else:
+                provider = get_provider()
+                if not provider.is_configured():
+                    raise ProviderNotConfigured()
+
+                parts, tokens = [], 0
+                async for chunk in provider.astream(turn.prompt, model=TUTOR_MODEL):
+                    if chunk.text:
+                        parts.append(chunk.text)
+                        yield chunk.text
+                    tokens = max(tokens, chunk.tokens)
+
+                answer, model_used = ''.join(parts), provider.name
+                tokens = tokens or estimate_tokens(turn.prompt) + estimate_tokens(answer)
+                used = tokens
+                await sync_to_async(cls.store)(turn, answer, model_used, tokens)
+
+            yield await sync_to_async(cls.record)(
+                user, turn, answer, model_used, tokens,
+                response_time=time.perf_counter() - started,
+                cache_hit=entry is not None
+            )
+        finally:
+            await sync_to_async(AIQuota.settle)(turn.reservation, used)
+
+    @staticmethod
+    def record(user, turn, answer, model_used, tokens, response_time, cache_hit=False):
+        """Enregistre l'échange dans sa session (créée au premier échange)"""
+        with transaction.atomic():
+            session = turn.session
+            if session is None:
+                session = AITutorSession.objects.create(
+                    user=user,
+                    subject=turn.subject,
+                    level=turn.level,
+                    total_questions=1
+                )
+            else:
+                AITutorSession.objects.filter(pk=session.pk).update(
+                    total_questions=F('total_questions') + 1,
+                    updated_at=timezone.now()
+                )
+            return AITutorQuestion.objects.create(
+                session=session,
+                question=turn.question,
+                answer=answer,
+                model_used=model_used,
+                tokens_used=tokens,
+                response_time=response_time,
+                cache_hit=cache_hit
+            )
+
+    @staticmethod
+    def _call_openai(prompt):
+        """Appel à l'API OpenAI avec le prompt complet du tour (consignes, style, contexte de session)"""
+        import openai
+
+        openai.api_key = settings.OPENAI_API_KEY
+
+        response = openai.ChatCompletion.create(
+            model="gpt-3.5-turbo",
+            messages=[
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ]
+        )
+
+        return response.choices[0].message.content, response.usage.total_tokens
@@ -0,0 +1,31 @@
+# ============================================
+# apps/ai_tools/tasks.py - Tâches Celery des outils IA
+# ============================================
+from celery import shared_task
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(name='ai_tools.evict_tutor_cache')
+def evict_tutor_cache():
+    """Évince les réponses du tuteur expirées ou les moins récemment servies"""
+    from apps.ai_tools.services import TutorAnswerCache
+    
+    deleted = TutorAnswerCache.evict()
+    return f"{deleted} réponses du tuteur évincées du cache"
+
+
+@shared_task(name='ai_tools.summarize_tutor_session')
+def summarize_tutor_session(session_id):
+    """Intègre au résumé d'une session les échanges sortis de la fenêtre de contexte"""
+    from apps.ai_tools.providers import ProviderError
+    from apps.ai_tools.services import TutorContext
+    
+    try:
+        summarized = TutorContext.summarize(session_id)
+    except ProviderError as e:
+        # Replanifié à la prochaine question de la session
+        logger.warning(f"Résumé de la session {session_id} impossible : {e}")
+        return f"Session {session_id} : résumé reporté"
+    return f"Session {session_id} : {summarized} échanges résumés"
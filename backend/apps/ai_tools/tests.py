@@ -1,3 +1,563 @@
-from django.test import TestCase
+import json
+import threading
+import time
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from apps.ai_tools.providers import (
+    CircuitBreaker, FakeBackend, LLMProvider, ProviderError, ProviderTimeout,
+    ProviderUnavailable, get_provider, reset_providers
+)
+from apps.ai_tools.models import AITutorCacheEntry, AITutorQuestion, AITutorSession
+from apps.ai_tools.quotas import AIQuota, Bucket, MemoryBucketStore, RedisBucketStore
+from apps.ai_tools.services import TutorAnswerCache, TutorContext, TutorService
+from apps.users.models import User
+
+OPTIONS = dict(
+    settings.AI_PROVIDER_OPTIONS,
+    RETRIES=2, BACKOFF_BASE=0.001, BACKOFF_MAX=0.001, DEADLINE=5.0,
+    MAX_CONCURRENCY=2, ACQUIRE_TIMEOUT=0.05, BREAKER_THRESHOLD=3, BREAKER_RESET=60.0,
+)
+
+
+class ScriptedBackend(FakeBackend):
+    """Backend local qui rejoue une suite de réponses ou d'erreurs"""
+
+    def __init__(self, script):
+        super().__init__(OPTIONS)
+        self.script = list(script)
+        self.calls = 0
+
+    def generate(self, prompt, model):
+        self.calls += 1
+        step = self.script.pop(0) if self.script else 'ok'
+        if isinstance(step, Exception):
+            raise step
+        return super().generate(prompt, model)
+
+
+class LLMProviderTests(SimpleTestCase):
+    """Reprises, disjoncteur et cloisonnement du fournisseur LLM"""
+
+    def test_retries_transient_errors(self):
+        backend = ScriptedBackend([ProviderError('503', retryable=True), ProviderTimeout()])
+        provider = LLMProvider(backend, OPTIONS)
+
+        result = provider.generate('Bonjour')
+
+        self.assertEqual(backend.calls, 3)
+        self.assertTrue(result.text.startswith('[fake]'))
+        self.assertEqual(provider.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_does_not_retry_client_errors(self):
+        backend = ScriptedBackend([ProviderError('400', retryable=False)])
+        provider = LLMProvider(backend, OPTIONS)
+
+        with self.assertRaises(ProviderError):
+            provider.generate('Bonjour')
+        self.assertEqual(backend.calls, 1)
+        self.assertEqual(provider.breaker.failures, 0)
+
+    def test_gives_up_after_retries(self):
+        backend = ScriptedBackend([ProviderTimeout()] * 5)
+        provider = LLMProvider(backend, OPTIONS)
+
+        with self.assertRaises(ProviderTimeout):
+            provider.generate('Bonjour')
+        self.assertEqual(backend.calls, OPTIONS['RETRIES'] + 1)
+
+    def test_breaker_opens_and_fails_fast(self):
+        backend = ScriptedBackend([ProviderError('503', retryable=True)] * 3)
+        provider = LLMProvider(backend, OPTIONS)
+
+        with self.assertRaises(ProviderError):
+            provider.generate('Bonjour')
+        self.assertEqual(provider.breaker.state, CircuitBreaker.OPEN)
+
+        # Circuit ouvert : échec immédiat sans appeler le backend
+        with self.assertRaises(ProviderUnavailable):
+            provider.generate('Bonjour')
+        self.assertEqual(backend.calls, 3)
+
+        # Après le délai, un appel d'essai réussi referme le circuit
+        provider.breaker.opened_at -= OPTIONS['BREAKER_RESET']
+        provider.generate('Bonjour')
+        self.assertEqual(provider.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_breaker_trial_is_released_without_verdict(self):
+        options = dict(OPTIONS, BREAKER_THRESHOLD=1, BREAKER_RESET=0.0)
+        backend = ScriptedBackend([
+            ProviderError('503', retryable=True), ProviderError('400', retryable=False), RuntimeError('bug'),
+        ])
+        provider = LLMProvider(backend, options)
+
+        # 503 : circuit ouvert ; la reprise est l'appel d'essai, qui reçoit un 400
+        with self.assertRaises(ProviderError):
+            provider.generate('Bonjour')
+        self.assertEqual(provider.breaker.state, CircuitBreaker.OPEN)
+        # Nouvel essai, interrompu par une exception quelconque
+        with self.assertRaises(RuntimeError):
+            provider.generate('Bonjour')
+        self.assertEqual(provider.breaker.state, CircuitBreaker.OPEN)
+
+        # Flux d'essai abandonné par le client après le premier fragment
+        backend.chunk_words = 1
+        stream = provider.stream('Bonjour')
+        next(stream)
+        stream.close()
+        self.assertEqual(provider.breaker.state, CircuitBreaker.OPEN)
+
+        provider.generate('Bonjour')
+        self.assertEqual(provider.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_breaker_trial_is_released_when_bulkhead_is_full(self):
+        provider = LLMProvider(ScriptedBackend([]), dict(OPTIONS, BREAKER_RESET=0.0))
+        provider.breaker.state = CircuitBreaker.OPEN
+        for _ in range(OPTIONS['MAX_CONCURRENCY']):
+            provider.bulkhead.acquire()
+        with self.assertRaises(ProviderUnavailable):
+            provider.generate('Bonjour')
+        self.assertEqual(provider.breaker.state, CircuitBreaker.OPEN)
+
+        for _ in range(OPTIONS['MAX_CONCURRENCY']):
+            provider.bulkhead.release()
+        provider.generate('Bonjour')
+        self.assertEqual(provider.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_bulkhead_rejects_when_saturated(self):
+        release = threading.Event()
+        started = threading.Barrier(OPTIONS['MAX_CONCURRENCY'] + 1)
+
+        def slow(prompt, model):
+            started.wait()
+            release.wait()
+            return 'ok'
+
+        backend = FakeBackend(OPTIONS)
+        backend.handler = slow
+        provider = LLMProvider(backend, OPTIONS)
+        threads = [
+            threading.Thread(target=provider.generate, args=('Bonjour',))
+            for _ in range(OPTIONS['MAX_CONCURRENCY'])
+        ]
+        for thread in threads:
+            thread.start()
+        started.wait()
+        try:
+            with self.assertRaises(ProviderUnavailable):
+                provider.generate('Bonjour')
+        finally:
+            release.set()
+            for thread in threads:
+                thread.join()
+
+    @override_settings(AI_PROVIDER='fake')
+    def test_provider_is_shared(self):
+        reset_providers()
+        self.addCleanup(reset_providers)
+        self.assertIs(get_provider(), get_provider())
+        self.assertEqual(get_provider().name, 'fake')
+
+    def test_fake_backend_latency_beyond_timeout(self):
+        backend = FakeBackend(dict(OPTIONS, TIMEOUT=0.01))
+        backend.latency = 1.0
+        with mock.patch('apps.ai_tools.providers.time.sleep'):
+            with self.assertRaises(ProviderTimeout):
+                backend.generate('Bonjour', 'fake')
+
+
+@override_settings(AI_PROVIDER='fake')
+class TutorStreamTests(TestCase):
+    """Réponses du tuteur en Server-Sent Events avec un fournisseur local"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='student@edulab.test', password='x')
+
+    def setUp(self):
+        reset_providers()
+        self.addCleanup(reset_providers)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        answer = ' '.join(f'mot{i}' for i in range(20))
+        for attribute, value in (('handler', staticmethod(lambda prompt, model: answer)),
+                                 ('chunk_words', 5), ('chunk_delay', 0.05)):
+            patcher = mock.patch.object(FakeBackend, attribute, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.answer = answer
+
+    def stream(self, question='Qu\'est-ce que la photosynthèse ?'):
+        response = self.client.post(
+            '/api/ai/tutor/stream/', {'question': question, 'subject': 'SVT'},
+            format='json', secure=True, SERVER_NAME='localhost'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        return response
+
+    def read_events(self, response):
+        """(secondes depuis le début, événement, données) de chaque événement SSE"""
+        async def collect():
+            started = time.perf_counter()
+            events = []
+            async for part in response.streaming_content:
+                for block in part.decode().strip().split('\n\n'):
+                    event, data = block.split('\n')
+                    events.append((
+                        time.perf_counter() - started,
+                        event[len('event: '):],
+                        json.loads(data[len('data: '):])
+                    ))
+            return events
+        return async_to_sync(collect)()
+
+    def test_streams_chunks_then_persists_history(self):
+        events = self.read_events(self.stream())
+
+        deltas = [data['text'] for _, event, data in events if event == 'delta']
+        self.assertEqual(len(deltas), 4)
+        self.assertEqual(''.join(deltas), self.answer)
+
+        # Le premier fragment arrive sans attendre la fin de la génération
+        first, total = events[0][0], events[-1][0]
+        self.assertLess(first, total / 2)
+
+        elapsed, event, data = events[-1]
+        self.assertEqual(event, 'done')
+        entry = AITutorQuestion.objects.get()
+        self.assertEqual(data['session_id'], entry.session_id)
+        self.assertEqual(entry.answer, self.answer)
+        self.assertFalse(entry.cache_hit)
+
+    def test_second_stream_served_from_cache(self):
+        self.read_events(self.stream())
+        events = self.read_events(self.stream('qu\'est-ce que la photosynthese'))
+
+        self.assertEqual([event for _, event, _ in events], ['delta', 'done'])
+        self.assertTrue(events[-1][2]['cache_hit'])
+        self.assertEqual(AITutorQuestion.objects.filter(cache_hit=True).count(), 1)
+
+    def test_refreshed_entry_keeps_hits(self):
+        self.read_events(self.stream())
+        self.read_events(self.stream())
+        entry = AITutorCacheEntry.objects.get()
+        self.assertEqual(entry.hits, 1)
+
+        TutorAnswerCache.set(entry.fingerprint, entry.question, 'SVT', '', '', 'Nouvelle réponse', 'fake', 10)
+
+        entry.refresh_from_db()
+        self.assertEqual((entry.answer, entry.hits), ('Nouvelle réponse', 1))
+
+    def test_provider_failure_ends_with_error_event(self):
+        with mock.patch.object(FakeBackend, 'handler', side_effect=ProviderError('400')):
+            events = self.read_events(self.stream())
+
+        self.assertEqual(events[-1][1], 'error')
+        self.assertFalse(AITutorQuestion.objects.exists())
+
+
+@override_settings(
+    AI_PROVIDER='fake',
+    AI_TUTOR_CONTEXT={'MAX_TOKENS': 200, 'MAX_TURNS': 10, 'SUMMARY_MIN_TURNS': 2}
+)
+class TutorSessionTests(TestCase):
+    """Sessions multi-tours : fenêtre de contexte bornée, résumé, historique paginé"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='student@edulab.test', password='x')
+
+    def setUp(self):
+        reset_providers()
+        self.addCleanup(reset_providers)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.prompts = []
+
+        def handler(prompt, model):
+            self.prompts.append(prompt)
+            return 'Résumé' if prompt.startswith('Tu résumes') else f'Réponse {len(self.prompts)} ' + 'x' * 300
+
+        patcher = mock.patch.object(FakeBackend, 'handler', staticmethod(handler))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(TutorContext, 'schedule_summary')
+        self.schedule_summary = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def ask(self, question, session_id=None, **extra):
+        data = {'question': question, 'subject': 'Maths', **extra}
+        if session_id is not None:
+            data['session_id'] = session_id
+        return self.client.post('/api/ai/tutor/', data, format='json', secure=True, SERVER_NAME='localhost')
+
+    def test_follow_up_includes_previous_turns_without_cache(self):
+        session_id = self.ask('Qu\'est-ce qu\'une fraction ?').data['session_id']
+        response = self.ask('Et une fraction irréductible ?', session_id)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['session_id'], session_id)
+        self.assertFalse(response.data['cache_hit'])
+        self.assertIn('Étudiant : Qu\'est-ce qu\'une fraction ?', self.prompts[-1])
+        self.assertEqual(AITutorSession.objects.get().total_questions, 2)
+
+        # Même question hors session : servie par le cache
+        self.assertTrue(self.ask('Qu\'est-ce qu\'une fraction ?').data['cache_hit'])
+
+    def test_window_is_bounded_and_old_turns_are_summarized(self):
+        session_id = self.ask('Question 1').data['session_id']
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(2, 6):
+                self.ask(f'Question {i}', session_id)
+
+        # Budget de 200 tokens : seuls les deux derniers échanges sont repris
+        self.assertNotIn('Question 2\n', self.prompts[-1])
+        self.assertIn('Étudiant : Question 3\n', self.prompts[-1])
+        self.schedule_summary.assert_called_with(session_id)
+
+        self.assertEqual(TutorContext.summarize(session_id), 3)
+        session = AITutorSession.objects.get()
+        self.assertEqual((session.summary, session.summarized_turns), ('Résumé', 3))
+
+        self.ask('Question 6', session_id)
+        self.assertIn('Résumé des échanges précédents : Résumé', self.prompts[-1])
+
+    @override_settings(OPENAI_API_KEY='sk-test')
+    def test_openai_fallback_keeps_session_context(self):
+        session_id = self.ask('Qu\'est-ce qu\'une fraction ?').data['session_id']
+
+        with mock.patch.object(LLMProvider, 'is_configured', return_value=False), \
+                mock.patch.object(TutorService, '_call_openai', return_value=('Réponse OpenAI', 42)) as call_openai:
+            response = self.ask('Et une fraction irréductible ?', session_id, style='Simple')
+
+        self.assertEqual(response.status_code, 200)
+        prompt = call_openai.call_args.args[0]
+        self.assertIn('Étudiant : Qu\'est-ce qu\'une fraction ?', prompt)
+        self.assertIn('Question de l\'étudiant: Et une fraction irréductible ?', prompt)
+        self.assertIn('Style: Sois concis', prompt)
+        self.assertEqual(AITutorQuestion.objects.latest('id').model_used, 'openai')
+
+    def test_missing_provider_is_service_unavailable(self):
+        with mock.patch.object(LLMProvider, 'is_configured', return_value=False):
+            response = self.ask('Bonjour')
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.data['error'], 'Aucune API IA configurée')
+
+    def test_other_value_errors_are_not_reported_as_unconfigured(self):
+        with mock.patch.object(FakeBackend, 'handler', side_effect=ValueError('réponse illisible')):
+            response = self.ask('Bonjour')
+
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.data['type'], 'ValueError')
+
+    def test_unknown_session_is_rejected(self):
+        other = User.objects.create_user(email='other@edulab.test', password='x')
+        session = AITutorSession.objects.create(user=other, total_questions=0)
+
+        response = self.ask('Bonjour', session.id)
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.prompts, [])
+
+    def test_history_lists_sessions_and_paginates_turns(self):
+        session_id = self.ask('Question 1').data['session_id']
+        for i in range(2, 24):
+            self.ask(f'Question {i}', session_id)
+
+        with self.assertNumQueries(1):
+            history = self.client.get('/api/ai/history/', secure=True, SERVER_NAME='localhost').data
+        self.assertEqual(len(history), 1)
+        self.assertEqual(history[0]['first_question'], 'Question 1')
+        self.assertEqual(history[0]['total_questions'], 23)
+        self.assertNotIn('questions', history[0])
+
+        page = self.client.get(f'/api/ai/history/{session_id}/', secure=True, SERVER_NAME='localhost').data
+        self.assertEqual([turn['question'] for turn in page['results'][:2]], ['Question 1', 'Question 2'])
+        self.assertEqual(len(page['results']), 20)
+        page = self.client.get(page['next'], secure=True, SERVER_NAME='localhost').data
+        self.assertEqual(len(page['results']), 3)
+        self.assertIsNone(page['next'])
+
+
+@override_settings(
+    AI_PROVIDER='fake',
+    AI_QUOTA={
+        'ENABLED': True, 'STORE': 'memory', 'USER_TOKENS': 1000, 'USER_PERIOD': 3600,
+        'GLOBAL_TOKENS': 1500, 'GLOBAL_PERIOD': 3600,
+    }
+)
+class TutorQuotaTests(TestCase):
+    """Quotas de tokens IA : réservation avant l'appel, régularisation sur l'usage réel"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='student@edulab.test', password='x')
+        cls.other = User.objects.create_user(email='other@edulab.test', password='x')
+
+    def setUp(self):
+        reset_providers()
+        AIQuota.reset()
+        self.addCleanup(reset_providers)
+        self.addCleanup(AIQuota.reset)
+        self.calls = 0
+        self.answer = 'Réponse'
+
+        def handler(prompt, model):
+            self.calls += 1
+            return self.answer
+
+        patcher = mock.patch.object(FakeBackend, 'handler', staticmethod(handler))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def ask(self, question, user=None):
+        client = APIClient()
+        client.force_authenticate(user or self.user)
+        return client.post(
+            '/api/ai/tutor/', {'question': question}, format='json', secure=True, SERVER_NAME='localhost'
+        )
+
+    def test_charges_real_token_usage(self):
+        response = self.ask('Qu\'est-ce qu\'un vecteur ?')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-RateLimit-Limit'], '1000')
+        self.assertEqual(int(response['X-RateLimit-Remaining']), 1000 - response.data['tokens_used'])
+
+        # Réponse servie par le cache : réservation remboursée
+        cached = self.ask('qu\'est-ce qu\'un vecteur')
+        self.assertTrue(cached.data['cache_hit'])
+        self.assertEqual(cached['X-RateLimit-Remaining'], response['X-RateLimit-Remaining'])
+
+    def test_rejects_before_calling_provider_when_exhausted(self):
+        self.answer = 'x' * 3000  # ~750 tokens de réponse, en plus du prompt
+        first = self.ask('Question 1')
+        self.assertEqual(first.status_code, 200)
+
+        response = self.ask('Question 2')
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(int(response['X-RateLimit-Remaining']), 1000 - first.data['tokens_used'])
+        self.assertGreater(int(response['Retry-After']), 0)
+        self.assertEqual(AITutorQuestion.objects.count(), 1)
+
+    def test_global_bucket_is_shared_between_users(self):
+        self.answer = 'x' * 3000
+        self.assertEqual(self.ask('Question 1').status_code, 200)
+        self.assertEqual(self.ask('Question 2', self.other).status_code, 200)
+
+        # Seau de l'utilisateur plein, seau global épuisé
+        response = self.ask('Question 3', User.objects.create_user(email='third@edulab.test', password='x'))
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['X-RateLimit-Remaining'], '1000')
+        self.assertEqual(self.calls, 2)
+
+    def test_failed_call_refunds_reservation(self):
+        with mock.patch.object(FakeBackend, 'handler', side_effect=ProviderError('400')):
+            self.assertEqual(self.ask('Question').status_code, 502)
+
+        level = AIQuota._memory.take(AIQuota.buckets(self.user.pk), 0)[1][0]
+        self.assertAlmostEqual(level, 1000, delta=1)
+
+    def stream(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post(
+            '/api/ai/tutor/stream/', {'question': 'Question'}, format='json', secure=True, SERVER_NAME='localhost'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertLess(int(response['X-RateLimit-Remaining']), 1000)
+        return response
+
+    def user_level(self):
+        return AIQuota._memory.take(AIQuota.buckets(self.user.pk), 0)[1][0]
+
+    def test_stream_closed_before_start_refunds_reservation(self):
+        # Client déconnecté avant le premier octet : le serveur ferme la réponse sans l'itérer
+        self.stream().close()
+
+        self.assertEqual(self.calls, 0)
+        self.assertAlmostEqual(self.user_level(), 1000, delta=1)
+
+    def test_consumed_stream_is_charged_once(self):
+        response = self.stream()
+
+        async def consume():
+            return [part async for part in response.streaming_content]
+        async_to_sync(consume)()
+        response.close()
+
+        entry = AITutorQuestion.objects.get()
+        self.assertAlmostEqual(self.user_level(), 1000 - entry.tokens_used, delta=1)
+
+
+def redis_client():
+    """fakeredis (avec lupa pour EVALSHA) ou serveur Redis de REDIS_URL ; None si aucun"""
+    try:
+        import fakeredis
+        client = fakeredis.FakeRedis(decode_responses=True)
+        client.eval('return 1', 0)
+        return client
+    except Exception:
+        pass
+    try:
+        import redis
+        client = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True, socket_connect_timeout=1)
+        client.ping()
+        return client
+    except Exception:
+        return None
+
+
+class RedisBucketStoreTests(SimpleTestCase):
+    """Script Lua des seaux : mêmes décisions et niveaux que les seaux en mémoire"""
+
+    BUCKETS = [Bucket('test:ai:quota:user', 1000, 10.0), Bucket('test:ai:quota:global', 1500, 5.0)]
+
+    def setUp(self):
+        self.client = redis_client()
+        if self.client is None:
+            self.skipTest('Ni fakeredis[lua] ni serveur Redis disponible')
+        self.client.delete(*[bucket.key for bucket in self.BUCKETS])
+        self.addCleanup(self.client.delete, *[bucket.key for bucket in self.BUCKETS])
+        self.now = 1_000_000.0
+        patcher = mock.patch('apps.ai_tools.quotas.time.time', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_matches_memory_store(self):
+        redis_store, memory_store = RedisBucketStore(self.client), MemoryBucketStore()
+        # (secondes écoulées, coût, régularisation forcée)
+        steps = [(0, 600, False), (1, 300, False), (0, 400, False), (0, 200, True), (0, -150, True),
+                 (30, 500, False), (0, 2000, False), (120, 1200, False)]
+        for elapsed, cost, force in steps:
+            self.now += elapsed
+            granted, levels = redis_store.take(self.BUCKETS, cost, force)
+            expected_granted, expected_levels = memory_store.take(self.BUCKETS, cost, force)
+            self.assertEqual(granted, expected_granted, (elapsed, cost, force))
+            for level, expected in zip(levels, expected_levels):
+                self.assertAlmostEqual(level, expected, places=6)
+
+    def test_refusal_debits_no_bucket(self):
+        store = RedisBucketStore(self.client)
+        store.take(self.BUCKETS[1:], 1200)
+
+        granted, levels = store.take(self.BUCKETS, 500)
+
+        self.assertFalse(granted)
+        self.assertEqual(levels, [1000.0, 300.0])
+        self.assertEqual(float(self.client.hget(self.BUCKETS[0].key, 'level')), 1000.0)
+
+    def test_keys_expire_once_refilled(self):
+        RedisBucketStore(self.client).take(self.BUCKETS, 100)
+
+        # 100 tokens à 10/s et 5/s : pleins après 10 s et 20 s
+        self.assertEqual(self.client.ttl(self.BUCKETS[0].key), 11)
+        self.assertEqual(self.client.ttl(self.BUCKETS[1].key), 21)
@@ -4,15 +4,25 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from apps.ai_tools.views import AIToolsViewSet
+from apps.ai_tools import async_views
 
 router = DefaultRouter()
 router.register(r'', AIToolsViewSet, basename='ai_tools')
 
 urlpatterns = [
+    # Variantes asynchrones (ASGI) : l'attente du fournisseur n'occupe pas de thread
+    path('async/tutor/', async_views.tutor, name='ai_tools-async-tutor'),
+    path('async/tutor/stream/', async_views.tutor_stream, name='ai_tools-async-tutor-stream'),
     path('', include(router.urls)),
 ]
 
 """
 Endpoints disponibles:
 - POST /api/ai/tutor/
+- POST /api/ai/tutor/stream/ (Server-Sent Events)
+- POST /api/ai/async/tutor/ et /api/ai/async/tutor/stream/ (vues asynchrones)
+- GET /api/ai/history/ (sessions, sans les échanges)
+- GET /api/ai/history/{id}/?cursor= (échanges d'une session)
+
+Les POST acceptent session_id pour poursuivre une session.
 """
\ No newline at end of file
@@ -1,19 +1,131 @@
 # ============================================
 # apps/ai_tools/views.py
 # ============================================
+import json
+import logging
+
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.pagination import CursorPagination
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.conf import settings
 
 from apps.ai_tools.serializers import (
-    AITutorRequestSerializer, AITutorResponseSerializer
+    AITutorRequestSerializer, AITutorResponseSerializer,
+    AITutorSessionSerializer, AITutorTurnSerializer
 )
 
+logger = logging.getLogger(__name__)
+
+
+class TutorTurnCursorPagination(CursorPagination):
+    """Échanges d'une session, dans l'ordre de la conversation"""
+    page_size = 20
+    ordering = 'created_at'
+
+
+def prepare_turn(user, data):
+    """
+    TutorTurn d'une requête validée, coût réservé sur les quotas IA.
+    Lève AITutorSession.DoesNotExist si la session est inconnue,
+    QuotaExceeded si les quotas sont épuisés.
+    """
+    from apps.ai_tools.services import TutorService
+    
+    turn = TutorService.prepare(
+        user,
+        data['question'],
+        data.get('subject', ''),
+        data.get('level', ''),
+        data.get('style', ''),
+        data.get('session_id')
+    )
+    TutorService.admit(user, turn)
+    return turn
+
+
+def with_quota_headers(response, reservation):
+    """En-têtes X-RateLimit-* (quota restant de l'utilisateur), Retry-After en cas de refus"""
+    if reservation is not None:
+        for header, value in reservation.headers().items():
+            response[header] = value
+    return response
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def sse_chunk(chunk):
+    """Événement SSE d'un élément de TutorService.stream : fragment de texte ou question enregistrée"""
+    if isinstance(chunk, str):
+        return sse_event('delta', {'text': chunk})
+    return sse_event('done', {
+        'session_id': chunk.session_id,
+        'tokens_used': chunk.tokens_used,
+        'cache_hit': chunk.cache_hit
+    })
+
+
+async def sse_events(chunks):
+    """
+    Convertit les fragments de TutorService.stream en événements SSE.
+    Itérateur asynchrone : sous ASGI chaque fragment est envoyé dès
+    qu'il est produit ; l'itérateur synchrone (fournisseur, ORM) est
+    avancé dans un thread.
+    """
+    from asgiref.sync import sync_to_async
+    from apps.ai_tools.providers import ProviderError
+    
+    step = sync_to_async(next)
+    try:
+        while True:
+            chunk = await step(chunks, None)
+            if chunk is None:
+                break
+            yield sse_chunk(chunk)
+    except ProviderError as e:
+        yield sse_event('error', {'error': str(e)})
+    except Exception as e:
+        logger.exception("Erreur pendant le streaming du tuteur IA")
+        yield sse_event('error', {'error': 'Erreur interne du tuteur IA'})
+    finally:
+        await sync_to_async(chunks.close)()
+
+
+class SettledEventStream:
+    """
+    Contenu d'une réponse SSE du tuteur, fermé avec la réponse.
+    Si le client se déconnecte avant le premier octet, le générateur
+    n'a jamais démarré et le finally de TutorService.stream ne s'exécute
+    pas : la réservation de quota est alors rendue ici. Sinon elle est
+    déjà régularisée avec l'usage réel et settle() est sans effet.
+    """
+    
+    def __init__(self, events, reservation):
+        self.events = events
+        self.reservation = reservation
+    
+    def __aiter__(self):
+        return self.events.__aiter__()
+    
+    async def aclose(self):
+        await self.events.aclose()
+    
+    def close(self):
+        # Appelée par StreamingHttpResponse.close(), dans un thread (WSGI ou sync_to_async)
+        from asgiref.sync import async_to_sync
+        from apps.ai_tools.quotas import AIQuota
+        
+        async_to_sync(self.aclose)()
+        AIQuota.settle(self.reservation, 0)
+
+
 class AIToolsViewSet(viewsets.GenericViewSet):
     """Outils IA"""
     permission_classes = [IsAuthenticated]
+    pagination_class = TutorTurnCursorPagination
+    filter_backends = []  # l'ordre des échanges est fixé par la pagination
     
     @action(detail=False, methods=['post'])
     def tutor(self, request):
@@ -21,56 +133,25 @@ class AIToolsViewSet(viewsets.GenericViewSet):
         serializer = AITutorRequestSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
-        question = serializer.validated_data['question']
-        subject = serializer.validated_data.get('subject', '')
-        level = serializer.validated_data.get('level', '')
-        style = serializer.validated_data.get('style', '')
+        from apps.ai_tools.models import AITutorSession
+        from apps.ai_tools.providers import ProviderError, ProviderNotConfigured, ProviderUnavailable, ProviderTimeout
+        from apps.ai_tools.quotas import QuotaExceeded
+        from apps.ai_tools.services import TutorService
         
         try:
-            # Utiliser Gemini si disponible, sinon OpenAI
-            if settings.GEMINI_API_KEY:
-                answer, tokens = self._call_gemini(question, subject, level, style)
-            elif settings.OPENAI_API_KEY:
-                answer, tokens = self._call_openai(question, subject, level, style)
-            else:
-                return Response(
-                    {'error': 'Aucune API IA configurée'},
-                    status=status.HTTP_503_SERVICE_UNAVAILABLE
-                )
-            
-            # Sauvegarder dans l'historique
-            from apps.ai_tools.models import AITutorSession, AITutorQuestion
-            from django.utils import timezone
-            import time
-            
-            start_time = time.time()
-            
-            session = AITutorSession.objects.create(
-                user=request.user,
-                subject=subject,
-                level=level
-            )
-            
-            AITutorQuestion.objects.create(
-                session=session,
-                question=question,
-                answer=answer,
-                model_used='gemini' if settings.GEMINI_API_KEY else 'openai',
-                tokens_used=tokens,
-                response_time=time.time() - start_time
-            )
-            
-            session.total_questions += 1
-            session.save()
-            
-            response_serializer = AITutorResponseSerializer({
-                'answer': answer,
-                'session_id': session.id,
-                'tokens_used': tokens
-            })
-            
-            return Response(response_serializer.data)
-            
+            turn = prepare_turn(request.user, serializer.validated_data)
+            entry = TutorService.ask(request.user, turn)
+        except AITutorSession.DoesNotExist:
+            return Response({'error': 'Session introuvable'}, status=status.HTTP_404_NOT_FOUND)
+        except QuotaExceeded as e:
+            response = Response({'error': str(e)}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+            return with_quota_headers(response, e.reservation)
+        except (ProviderNotConfigured, ProviderUnavailable) as e:
+            return Response({'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        except ProviderTimeout as e:
+            return Response({'error': str(e)}, status=status.HTTP_504_GATEWAY_TIMEOUT)
+        except ProviderError as e:
+            return Response({'error': str(e)}, status=status.HTTP_502_BAD_GATEWAY)
         except Exception as e:
             import traceback
             error_details = traceback.format_exc()
@@ -84,117 +165,79 @@ class AIToolsViewSet(viewsets.GenericViewSet):
                 },
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
-    
-    @action(detail=False, methods=['get'])
-    def history(self, request):
-        """GET /api/ai/history/ - Récupérer l'historique des sessions"""
-        from apps.ai_tools.models import AITutorSession
-        
-        sessions = AITutorSession.objects.filter(
-            user=request.user,
-            is_active=True
-        ).prefetch_related('questions')[:20]  # Dernières 20 sessions
         
-        sessions_data = []
-        for session in sessions:
-            questions_list = list(session.questions.all())
-            sessions_data.append({
-                'id': session.id,
-                'subject': session.subject,
-                'level': session.level,
-                'total_questions': session.total_questions,
-                'created_at': session.created_at.isoformat(),
-                'first_question': questions_list[0].question if questions_list else '',
-                'questions': [
-                    {
-                        'question': q.question,
-                        'answer': q.answer,
-                        'created_at': q.created_at.isoformat()
-                    } for q in questions_list
-                ]
-            })
+        response_serializer = AITutorResponseSerializer({
+            'answer': entry.answer,
+            'session_id': entry.session_id,
+            'tokens_used': entry.tokens_used,
+            'cache_hit': entry.cache_hit
+        })
         
-        return Response(sessions_data)
+        return with_quota_headers(Response(response_serializer.data), turn.reservation)
     
-    def _call_gemini(self, question, subject, level, style=''):
-        """Appel à l'API Gemini"""
-        from google import genai
-        from django.conf import settings
-        
-        # Le client récupère la clé API depuis settings ou variable d'environnement
-        # Ici on passe explicitement la clé si elle est dans settings
-        client = genai.Client(api_key=settings.GEMINI_API_KEY)
+    @action(detail=False, methods=['post'], url_path='tutor/stream')
+    def tutor_stream(self, request):
+        """
+        POST /api/ai/tutor/stream/ - Réponse du tuteur en Server-Sent Events
+        Événements : "delta" {"text"} au fil de la génération, puis
+        "done" {"session_id", "tokens_used", "cache_hit"} ou "error" {"error"}
+        """
+        from django.http import StreamingHttpResponse
+        from apps.ai_tools.models import AITutorSession
+        from apps.ai_tools.quotas import QuotaExceeded
+        from apps.ai_tools.services import TutorService
         
-        # Construction du prompt avec tous les paramètres
-        style_instruction = ""
-        if style:
-            if "Simple" in style or "Concis" in style:
-                style_instruction = "Sois concis et va droit au but. Utilise un langage simple."
-            elif "Détaillé" in style or "Académique" in style:
-                style_instruction = "Fournis une explication détaillée et académique avec des références théoriques."
-            elif "5 ans" in style or "ELI5" in style:
-                style_instruction = "Explique comme si tu parlais à un enfant de 5 ans. Utilise des analogies simples et amusantes."
-            elif "Pratique" in style or "Exemples" in style:
-                style_instruction = "Concentre-toi sur des exemples pratiques et concrets. Montre comment appliquer les concepts."
-            elif "Socratique" in style:
-                style_instruction = "Utilise la méthode socratique : pose des questions pour guider l'étudiant vers la réponse."
+        serializer = AITutorRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
         
-        prompt = f"""Tu es un tuteur pédagogique bienveillant et patient pour EduLab Africa.
-L'étudiant est basé en Afrique.
-
-Contexte:
-Matière: {subject if subject else 'Général'}
-Niveau: {level if level else 'Adapté'}
-{f'Style: {style_instruction}' if style_instruction else ''}
-
-Question de l'étudiant: {question}
-
-Réponds de manière claire, structurée et pédagogique. Utilise des exemples culturellement pertinents pour un étudiant africain si possible.
-
-IMPORTANT - Formatage des formules :
-- Pour les formules mathématiques inline (dans le texte), utilise la syntaxe : $formule$
-  Exemple: La formule $E = mc^2$ est célèbre
-- Pour les formules mathématiques en bloc (centrées), utilise : $$formule$$
-  Exemple: $$\\int_{{a}}^{{b}} x^2 dx = \\frac{{b^3 - a^3}}{{3}}$$
-- Pour les formules chimiques, utilise aussi $ : $H_2O$, $CO_2$, $C_6H_{{12}}O_6$
-- Pour les équations chimiques : $$CH_4 + 2O_2 \\rightarrow CO_2 + 2H_2O$$
-- Utilise TOUJOURS cette syntaxe LaTeX pour TOUTES les formules mathématiques et chimiques
-"""
+        try:
+            turn = prepare_turn(request.user, serializer.validated_data)
+        except AITutorSession.DoesNotExist:
+            return Response({'error': 'Session introuvable'}, status=status.HTTP_404_NOT_FOUND)
+        except QuotaExceeded as e:
+            response = Response({'error': str(e)}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+            return with_quota_headers(response, e.reservation)
+        chunks = TutorService.stream(request.user, turn)
         
-        response = client.models.generate_content(
-            model="gemini-flash-latest", contents=prompt
+        response = StreamingHttpResponse(
+            SettledEventStream(sse_events(chunks), turn.reservation), content_type='text/event-stream'
         )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # Pas de mise en tampon par nginx
+        return with_quota_headers(response, turn.reservation)
+    
+    @action(detail=False, methods=['get'])
+    def history(self, request):
+        """GET /api/ai/history/ - 20 dernières sessions, sans les échanges"""
+        from django.db.models import OuterRef, Subquery
+        from django.db.models.functions import Substr
+        from apps.ai_tools.models import AITutorSession, AITutorQuestion
         
-        # Estimation des tokens (approximatif)
-        tokens = len(prompt.split()) + len(response.text.split())
+        first_question = AITutorQuestion.objects.filter(
+            session=OuterRef('pk')
+        ).order_by('created_at', 'id').values('question')[:1]
         
-        return response.text, tokens
-    
+        sessions = AITutorSession.objects.filter(
+            user=request.user,
+            is_active=True
+        ).annotate(
+            first_question=Substr(Subquery(first_question), 1, 200)
+        ).order_by('-updated_at').values(
+            'id', 'subject', 'level', 'total_questions', 'created_at', 'updated_at', 'first_question'
+        )[:20]
+        
+        return Response(AITutorSessionSerializer(sessions, many=True).data)
     
-    def _call_openai(self, question, subject, level, style=''):
-        """Appel à l'API OpenAI"""
-        import openai
-        from django.conf import settings
+    @action(detail=False, methods=['get'], url_path=r'history/(?P<session_id>\d+)')
+    def session_turns(self, request, session_id=None):
+        """GET /api/ai/history/{id}/?cursor= - Échanges d'une session, paginés"""
+        from apps.ai_tools.models import AITutorSession, AITutorQuestion
         
-        openai.api_key = settings.OPENAI_API_KEY
+        if not AITutorSession.objects.filter(pk=session_id, user=request.user, is_active=True).exists():
+            return Response({'error': 'Session introuvable'}, status=status.HTTP_404_NOT_FOUND)
         
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {
-                    "role": "system",
-                    "content": f"Tu es un tuteur pédagogique pour la matière {subject} au niveau {level}."
-                },
-                {
-                    "role": "user",
-                    "content": question
-                }
-            ]
+        turns = AITutorQuestion.objects.filter(session_id=session_id).only(
+            'question', 'answer', 'cache_hit', 'created_at'
         )
-        
-        answer = response.choices[0].message.content
-        tokens = response.usage.total_tokens
-        
-        return answer, tokens
-
-
+        page = self.paginate_queryset(turns)
+        return self.get_paginated_response(AITutorTurnSerializer(page, many=True).data)
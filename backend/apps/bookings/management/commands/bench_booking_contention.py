@@ -0,0 +1,131 @@
+"""
+Benchmark : N réservations concurrentes sur le même créneau d'un mentor
+"""
+import datetime
+import statistics
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from apps.bookings.models import Booking
+from apps.bookings.serializers import BookingCreateSerializer
+from apps.core.exceptions import SlotUnavailable
+from apps.core.utils import HashIdService
+from apps.mentors.models import MentorProfile
+from apps.users.models import User
+
+
+class _Request:
+    def __init__(self, user):
+        self.user = user
+
+
+class Command(BaseCommand):
+    help = 'Lance N réservations parallèles sur le même créneau et vérifie qu\'une seule aboutit'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=100)
+        parser.add_argument('--keep', action='store_true', help='Conserver les utilisateurs et réservations créés')
+
+    def handle(self, *args, **options):
+        # Les threads écrivent chacun sur leur connexion : pas de transaction
+        # annulable commune, les données du benchmark sont supprimées à la fin.
+        created_users = []
+        try:
+            self.run(options['threads'], options['keep'], created_users)
+        finally:
+            if not options['keep']:
+                # Supprime en cascade profils, profil mentor et réservations (lots : limite de paramètres SQLite)
+                deleted = 0
+                for i in range(0, len(created_users), 500):
+                    deleted += User.objects.filter(pk__in=created_users[i:i + 500]).delete()[0]
+                self.stdout.write(f'{deleted} lignes de benchmark supprimées')
+
+    def run(self, threads, keep, created_users):
+        def bench_user(email, role):
+            user, created = User.objects.get_or_create(email=email, defaults={'role': role})
+            if created:
+                created_users.append(user.pk)
+            return user
+
+        mentor = bench_user('bench-mentor@edulab.bench', 'MENTOR')
+        MentorProfile.objects.get_or_create(user=mentor)
+        students = [bench_user(f'bench-student-{i}@edulab.bench', 'STUDENT') for i in range(threads)]
+
+        slot_date = timezone.localdate() + datetime.timedelta(days=30)
+        slot_time = datetime.time(10, 0)
+        Booking.objects.filter(mentor=mentor, date=slot_date, time=slot_time).delete()
+
+        payload = {
+            'mentor_id': HashIdService.encode(mentor.id),
+            'date': slot_date.isoformat(),
+            'time': slot_time.isoformat(),
+            'domains': ['Benchmark'],
+            'expectations': 'Benchmark',
+            'main_questions': 'Benchmark',
+        }
+        barrier = threading.Barrier(threads)
+        results = {'created': 0, 'conflict': 0, 'error': 0}
+        latencies = []
+        errors = []
+        lock = threading.Lock()
+
+        # Validation hors chronométrage : seule l'écriture est mise en concurrence
+        serializers = []
+        for student in students:
+            serializer = BookingCreateSerializer(data=payload, context={'request': _Request(student)})
+            serializer.is_valid(raise_exception=True)
+            serializers.append(serializer)
+
+        def book(serializer):
+            barrier.wait()
+            started = time.perf_counter()
+            try:
+                serializer.save()
+                outcome = 'created'
+            except SlotUnavailable:
+                outcome = 'conflict'
+            except Exception as e:
+                outcome = 'error'
+                errors.append(repr(e))
+            finally:
+                connection.close()
+            with lock:
+                results[outcome] += 1
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        workers = [threading.Thread(target=book, args=(s,)) for s in serializers]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+
+        live = Booking.objects.filter(
+            mentor=mentor, date=slot_date, time=slot_time, is_active=True
+        ).exclude(status__in=['CANCELLED', 'REJECTED']).count()
+
+        latencies.sort()
+        self.stdout.write(f'{threads} requêtes en {elapsed:.2f}s')
+        self.stdout.write(
+            f"  créées: {results['created']}  conflits (409): {results['conflict']}  erreurs: {results['error']}"
+        )
+        self.stdout.write(
+            f'  latence p50: {statistics.median(latencies):.1f}ms  '
+            f'p95: {latencies[int(len(latencies) * 0.95) - 1]:.1f}ms  max: {latencies[-1]:.1f}ms'
+        )
+        for error in errors[:5]:
+            self.stdout.write(self.style.WARNING(f'  {error}'))
+
+        if not keep:
+            # Réservations du créneau, y compris celles d'utilisateurs antérieurs au benchmark
+            Booking.objects.filter(mentor=mentor, date=slot_date, time=slot_time).delete()
+
+        if live == 1:
+            self.stdout.write(self.style.SUCCESS('✓ Une seule réservation pour le créneau'))
+        else:
+            self.stdout.write(self.style.ERROR(f'✗ {live} réservations actives pour le créneau'))
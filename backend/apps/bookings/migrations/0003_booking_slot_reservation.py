@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:02
+
+from django.db import migrations, models
+
+
+def cancel_duplicate_bookings(apps, schema_editor):
+    """Annule les doublons existants : la première réservation du créneau est conservée"""
+    Booking = apps.get_model('bookings', 'Booking')
+    seen = set()
+    duplicates = []
+    live = Booking.objects.filter(is_active=True).exclude(
+        status__in=['CANCELLED', 'REJECTED']
+    ).order_by('created_at', 'id').values_list('id', 'mentor_id', 'date', 'time')
+    for booking_id, mentor_id, date, time in live.iterator():
+        key = (mentor_id, date, time)
+        if key in seen:
+            duplicates.append(booking_id)
+        else:
+            seen.add(key)
+    if duplicates:
+        Booking.objects.filter(id__in=duplicates).update(status='CANCELLED')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(cancel_duplicate_bookings, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='booking',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_active', True), models.Q(('status__in', ['CANCELLED', 'REJECTED']), _negated=True)), fields=('mentor', 'date', 'time'), name='unique_active_booking_slot'),
+        ),
+    ]
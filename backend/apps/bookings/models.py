@@ -30,6 +30,14 @@ class Booking(TimestampMixin, SoftDeleteMixin):
             models.Index(fields=['mentor', 'status', 'is_active']),
             models.Index(fields=['date', 'time']),
         ]
+        constraints = [
+            # Un créneau ne peut être tenu que par une réservation vivante
+            models.UniqueConstraint(
+                fields=['mentor', 'date', 'time'],
+                condition=models.Q(is_active=True) & ~models.Q(status__in=['CANCELLED', 'REJECTED']),
+                name='unique_active_booking_slot'
+            ),
+        ]
         ordering = ['-created_at']
     
     def __str__(self):
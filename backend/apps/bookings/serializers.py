@@ -29,13 +29,41 @@ class BookingSerializer(serializers.ModelSerializer):
         return [d.domain for d in obj.domains.all()]
     
     def get_expectation(self, obj):
-        exp = obj.expectations.filter(is_current=True).first()
+        if hasattr(obj, 'current_expectations'):
+            exp = obj.current_expectations[0] if obj.current_expectations else None
+        else:
+            exp = obj.expectations.filter(is_current=True).first()
         return exp.expectation if exp else None
     
     def get_main_question(self, obj):
-        q = obj.main_questions.filter(is_current=True).first()
+        if hasattr(obj, 'current_main_questions'):
+            q = obj.current_main_questions[0] if obj.current_main_questions else None
+        else:
+            q = obj.main_questions.filter(is_current=True).first()
         return q.question if q else None
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Charge une page de réservations en un nombre fixe de requêtes"""
+        from django.db.models import Prefetch
+        from apps.users.serializers import user_prefetch_lookups
+
+        return queryset.select_related('student', 'mentor').prefetch_related(
+            *user_prefetch_lookups('student__'),
+            *user_prefetch_lookups('mentor__'),
+            'domains',
+            Prefetch(
+                'expectations',
+                queryset=BookingExpectation.objects.filter(is_current=True).order_by('pk'),
+                to_attr='current_expectations'
+            ),
+            Prefetch(
+                'main_questions',
+                queryset=BookingMainQuestion.objects.filter(is_current=True).order_by('pk'),
+                to_attr='current_main_questions'
+            ),
+        )
+
 class BookingCreateSerializer(serializers.Serializer):
     """Création d'une réservation"""
     mentor_id = HashIdField()
@@ -65,7 +93,8 @@ class BookingCreateSerializer(serializers.Serializer):
         return value
     
     def create(self, validated_data):
-        from django.db import transaction
+        from django.db import transaction, IntegrityError
+        from apps.core.exceptions import SlotUnavailable, violates_constraint
         from apps.users.models import User
         
         user = self.context['request'].user
@@ -76,11 +105,19 @@ class BookingCreateSerializer(serializers.Serializer):
         validated_data.pop('mentor_id')
         
         with transaction.atomic():
-            booking = Booking.objects.create(
-                student=user,
-                mentor=mentor,
-                **validated_data
-            )
+            # Réservation du créneau : l'index unique partiel arbitre les
+            # demandes concurrentes, sans lecture préalable ni verrou
+            try:
+                with transaction.atomic():
+                    booking = Booking.objects.create(
+                        student=user,
+                        mentor=mentor,
+                        **validated_data
+                    )
+            except IntegrityError as e:
+                if not violates_constraint(e, Booking, 'unique_active_booking_slot'):
+                    raise
+                raise SlotUnavailable()
             
             # Ajouter domaines
             for domain in domains:
@@ -111,12 +148,21 @@ class BookingStatusUpdateSerializer(serializers.Serializer):
     
     def update(self, instance, validated_data):
         from apps.bookings.models import BookingStatusHistory
-        from django.db import transaction
+        from apps.core.exceptions import SlotUnavailable, violates_constraint
+        from django.db import transaction, IntegrityError
         
         with transaction.atomic():
             previous_status = instance.status
             instance.status = validated_data['status']
-            instance.save()
+            try:
+                # Réactiver une réservation annulée peut entrer en conflit avec le créneau
+                with transaction.atomic():
+                    instance.save()
+            except IntegrityError as e:
+                instance.status = previous_status
+                if not violates_constraint(e, Booking, 'unique_active_booking_slot'):
+                    raise
+                raise SlotUnavailable()
             
             # Historiser
             BookingStatusHistory.objects.create(
@@ -131,12 +177,6 @@ class BookingStatusUpdateSerializer(serializers.Serializer):
             from apps.notifications.services import NotificationService
             NotificationService.create_booking_status_notification(instance)
             
-            # Attribution de points si complété
-            if validated_data['status'] == 'COMPLETED':
-                from django.conf import settings
-                instance.student.add_points(
-                    settings.GAMIFICATION_POINTS['BOOKING_COMPLETED'],
-                    'booking_completed'
-                )
+            # Points de session complétée : signal post_save de Booking (apps/core/signals.py)
         
         return instance
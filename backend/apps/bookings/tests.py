@@ -1,3 +1,175 @@
+import datetime
+from types import SimpleNamespace
+from unittest import mock
+
+from django.db import IntegrityError
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from apps.bookings.models import Booking, BookingDomain, BookingExpectation, BookingMainQuestion
+from apps.core.exceptions import violates_constraint
+from apps.core.utils import HashIdService
+from apps.mentors.models import MentorProfile
+from apps.users.models import User
+
+
+class BookingSlotTests(TestCase):
+    """Réservation d'un créneau : seul le conflit sur unique_active_booking_slot donne 409"""
+
+    def setUp(self):
+        self.mentor = User.objects.create_user(email='mentor@edulab.test', password='x', role='MENTOR')
+        MentorProfile.objects.create(user=self.mentor, is_verified=True)
+        self.students = [User.objects.create_user(email=f'student{i}@edulab.test', password='x') for i in range(2)]
+        self.date = datetime.date.today() + datetime.timedelta(days=2)
+
+    def book(self, student):
+        client = APIClient()
+        client.force_authenticate(student)
+        return client.post('/api/bookings/', {
+            'mentor_id': HashIdService.encode(self.mentor.id), 'date': self.date.isoformat(), 'time': '10:00',
+            'domains': ['Maths'], 'expectations': 'Réviser', 'main_questions': 'Les intégrales',
+        }, format='json', secure=True, SERVER_NAME='localhost')
+
+    def test_taken_slot_is_a_conflict(self):
+        self.assertEqual(self.book(self.students[0]).status_code, 201)
+
+        response = self.book(self.students[1])
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_other_integrity_errors_are_not_conflicts(self):
+        error = IntegrityError('NOT NULL constraint failed: bookings.time')
+        with mock.patch.object(Booking.objects, 'create', side_effect=error):
+            with self.assertRaises(IntegrityError):
+                self.book(self.students[0])
+
+    def test_sqlite_message_resolves_to_constraint_name(self):
+        columns = 'bookings.time, bookings.mentor_id, bookings.date'
+        for message, expected in (
+            (f'UNIQUE constraint failed: {columns}', True),
+            ("UNIQUE constraint failed: index 'unique_active_booking_slot'", True),
+            ('UNIQUE constraint failed: bookings.mentor_id, bookings.date', False),
+            ('UNIQUE constraint failed: bookings.id', False),
+            ('NOT NULL constraint failed: bookings.time', False),
+        ):
+            with self.subTest(message=message):
+                error = IntegrityError(message)
+                self.assertIs(violates_constraint(error, Booking, 'unique_active_booking_slot'), expected)
+
+    def test_postgresql_constraint_name(self):
+        def error(constraint_name):
+            # Erreur du pilote (psycopg) enveloppée par Django dans __cause__
+            cause = Exception('duplicate key value violates unique constraint')
+            cause.diag = SimpleNamespace(constraint_name=constraint_name)
+            e = IntegrityError(*cause.args)
+            e.__cause__ = cause
+            return e
+
+        self.assertTrue(violates_constraint(error('unique_active_booking_slot'), Booking, 'unique_active_booking_slot'))
+        self.assertFalse(violates_constraint(error('bookings_pkey'), Booking, 'unique_active_booking_slot'))
+
+
+class BookingListQueryTests(TestCase):
+    """Listes de réservations en un nombre de requêtes indépendant du nombre de réservations"""
+
+    def setUp(self):
+        self.mentor = User.objects.create_user(email='busy@edulab.test', password='x', role='MENTOR')
+        self.student = User.objects.create_user(email='learner@edulab.test', password='x')
+        self.others = [User.objects.create_user(email=f'other{i}@edulab.test', password='x', role='MENTOR')
+                       for i in range(3)]
+        self.day = datetime.date.today() + datetime.timedelta(days=3)
+        self.add(3)
+
+    def add(self, count):
+        # Autant de réservations étudiant -> mentors que de demandes reçues par le mentor
+        offset = Booking.objects.count()
+        for i in range(offset, offset + count):
+            date = self.day + datetime.timedelta(days=i)
+            for student, mentor in ((self.student, self.others[i % 3]), (self.others[i % 3], self.mentor)):
+                booking = Booking.objects.create(student=student, mentor=mentor, date=date, time=datetime.time(9))
+                BookingDomain.objects.create(booking=booking, domain='Maths')
+                BookingExpectation.objects.create(booking=booking, expectation='Réviser')
+                BookingMainQuestion.objects.create(booking=booking, question='Les intégrales')
+
+    def get(self, user, url):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.get(url, secure=True, SERVER_NAME='localhost')
+
+    def test_list_queries(self):
+        # Comptage, page, 5 prefetch par utilisateur (étudiant, mentor), domaines, attentes, questions
+        for total in (3, 9):
+            with self.assertNumQueries(15):
+                response = self.get(self.student, '/api/bookings/')
+            self.assertEqual(response.data['count'], total)
+            self.add(6)
+
+        booking = response.data['results'][0]
+        self.assertEqual(booking['student']['email'], 'learner@edulab.test')
+        self.assertEqual(
+            (booking['domains'], booking['expectation'], booking['main_question']),
+            (['Maths'], 'Réviser', 'Les intégrales')
+        )
+
+    def test_mentor_requests_queries(self):
+        for total in (3, 9):
+            with self.assertNumQueries(15):
+                response = self.get(self.mentor, '/api/bookings/mentor_requests/')
+            self.assertEqual(response.data['count'], total)
+            self.add(6)
+
+        self.assertEqual({booking['mentor']['email'] for booking in response.data['results']}, {'busy@edulab.test'})
+        self.assertEqual(self.get(self.student, '/api/bookings/mentor_requests/').status_code, 403)
+
+
+class BookingCalendarTests(TestCase):
+    """GET /api/bookings/calendar/ : bornes incluses, dates invalides refusées"""
+
+    def setUp(self):
+        self.mentor = User.objects.create_user(email='planner@edulab.test', password='x', role='MENTOR')
+        self.student = User.objects.create_user(email='pupil@edulab.test', password='x')
+        self.start = datetime.date.today() + datetime.timedelta(days=5)
+        for offset, time in ((-1, 9), (0, 14), (0, 9), (7, 10), (8, 10)):
+            Booking.objects.create(
+                student=self.student, mentor=self.mentor, date=self.start + datetime.timedelta(days=offset),
+                time=datetime.time(time)
+            )
+        self.client = APIClient()
+
+    def calendar(self, user, query):
+        self.client.force_authenticate(user)
+        return self.client.get(f'/api/bookings/calendar/{query}', secure=True, SERVER_NAME='localhost')
+
+    def day(self, offset):
+        return (self.start + datetime.timedelta(days=offset)).isoformat()
+
+    def test_range_bounds_are_inclusive(self):
+        with self.assertNumQueries(1):
+            response = self.calendar(self.mentor, f'?from={self.day(0)}&to={self.day(7)}')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.data), [self.day(0), self.day(7)])
+        self.assertEqual([entry['time'] for entry in response.data[self.day(0)]], ['09:00', '14:00'])
+        entry = response.data[self.day(7)][0]
+        self.assertEqual((entry['role'], entry['with']), ('MENTOR', 'pupil'))
+
+        response = self.calendar(self.student, f'?from={self.day(8)}&to={self.day(8)}')
+        entry = response.data[self.day(8)][0]
+        self.assertEqual((entry['role'], entry['with']), ('STUDENT', 'planner'))
+
+    def test_default_range_and_limits(self):
+        # Sans paramètre : 30 jours à partir d'aujourd'hui
+        response = self.calendar(self.mentor, '')
+        self.assertEqual(len(sum(response.data.values(), [])), 5)
+
+        self.assertEqual(self.calendar(self.mentor, f'?from={self.day(0)}&to={self.day(92)}').status_code, 200)
+        self.assertEqual(self.calendar(self.mentor, f'?from={self.day(0)}&to={self.day(93)}').status_code, 400)
+        self.assertEqual(self.calendar(self.mentor, f'?from={self.day(1)}&to={self.day(0)}').status_code, 400)
 
-# Create your tests here.
+    def test_invalid_dates(self):
+        for query in ('?from=2026-13-01', '?from=demain', f'?from={self.day(0)}&to=2026-02-30', '?to=19/10/2026'):
+            with self.subTest(query=query):
+                response = self.calendar(self.mentor, query)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.data['error'], 'Format de date invalide (YYYY-MM-DD)')
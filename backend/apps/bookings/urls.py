@@ -19,5 +19,6 @@ Endpoints disponibles:
 - GET /api/bookings/{id}/
 - PATCH /api/bookings/{id}/update_status/
 - GET /api/bookings/mentor_requests/
+- GET /api/bookings/calendar/?from=YYYY-MM-DD&to=YYYY-MM-DD
 """
 
@@ -34,6 +34,9 @@ class BookingViewSet(HashIdMixin, viewsets.ModelViewSet):
         if status_filter:
             queryset = queryset.filter(status=status_filter)
         
+        if self.action in ('list', 'retrieve'):
+            queryset = BookingSerializer.setup_eager_loading(queryset)
+        
         return queryset.order_by('-created_at')
     
     def get_serializer_class(self):
@@ -87,9 +90,8 @@ class BookingViewSet(HashIdMixin, viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        bookings = Booking.objects.filter(
-            mentor=request.user,
-            is_active=True
+        bookings = BookingSerializer.setup_eager_loading(
+            Booking.objects.filter(mentor=request.user, is_active=True)
         ).order_by('date', 'time')
         
         page = self.paginate_queryset(bookings)
@@ -100,3 +102,61 @@ class BookingViewSet(HashIdMixin, viewsets.ModelViewSet):
         serializer = self.get_serializer(bookings, many=True)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
+    def calendar(self, request):
+        """
+        GET /api/bookings/calendar/?from=YYYY-MM-DD&to=YYYY-MM-DD
+        Vue compacte par jour : {'YYYY-MM-DD': [{id, time, status, with}]}
+        """
+        from datetime import datetime, timedelta
+        from django.db.models import OuterRef, Q, Subquery
+        from django.utils import timezone
+        from apps.core.utils import HashIdService
+        from apps.users.models import UserProfile
+
+        from_str = request.query_params.get('from')
+        to_str = request.query_params.get('to')
+        try:
+            start = datetime.strptime(from_str, '%Y-%m-%d').date() if from_str else timezone.localdate()
+            end = datetime.strptime(to_str, '%Y-%m-%d').date() if to_str else start + timedelta(days=30)
+        except ValueError:
+            return Response(
+                {'error': 'Format de date invalide (YYYY-MM-DD)'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if end < start or (end - start).days > 92:
+            return Response(
+                {'error': 'La plage doit être croissante et couvrir au plus 92 jours'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        user = request.user
+
+        def current_name(field):
+            return Subquery(
+                UserProfile.objects.filter(user=OuterRef(field), is_current=True)
+                .order_by('pk').values('name')[:1]
+            )
+
+        bookings = Booking.objects.filter(
+            Q(mentor=user) | Q(student=user),
+            date__range=[start, end],
+            is_active=True
+        ).annotate(
+            student_name=current_name('student_id'),
+            mentor_name=current_name('mentor_id')
+        ).order_by('date', 'time').values(
+            'id', 'date', 'time', 'status', 'mentor_id', 'student_name', 'mentor_name'
+        )
+
+        days = {}
+        for booking in bookings:
+            is_mentor = booking['mentor_id'] == user.id
+            days.setdefault(booking['date'].isoformat(), []).append({
+                'id': HashIdService.encode(booking['id']),
+                'time': booking['time'].strftime('%H:%M'),
+                'status': booking['status'],
+                'role': 'MENTOR' if is_mentor else 'STUDENT',
+                'with': booking['student_name'] if is_mentor else booking['mentor_name'],
+            })
+        return Response(days)
@@ -4,6 +4,7 @@ Développé par Marino ATOHOUN pour Hypee
 """
 
 from rest_framework.views import exception_handler
+from rest_framework.exceptions import APIException
 from rest_framework.response import Response
 from rest_framework import status
 
@@ -58,3 +59,45 @@ def custom_exception_handler(exc, context):
         response.data = custom_response_data
     
     return response
+
+
+class SlotUnavailable(APIException):
+    """Créneau déjà réservé (conflit d'écriture concurrente)"""
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "Ce créneau vient d'être réservé. Veuillez en choisir un autre."
+    default_code = 'slot_unavailable'
+
+
+def violates_constraint(error, model, name):
+    """
+    Vrai si l'IntegrityError provient de la contrainte unique name du modèle.
+    PostgreSQL nomme la contrainte (diag.constraint_name) ; SQLite ne cite
+    que les colonnes en cause, ramenées au nom des contraintes uniques du
+    modèle qui portent exactement ces colonnes.
+    """
+    diag = getattr(error.__cause__, 'diag', None)
+    if diag is not None:
+        return diag.constraint_name == name
+    return name in _sqlite_unique_constraints(error, model)
+
+
+def _sqlite_unique_constraints(error, model):
+    """Noms des contraintes uniques désignées par un message SQLite"""
+    from django.db.models import UniqueConstraint
+
+    prefix, _, target = str(error).partition(':')
+    if prefix.strip() != 'UNIQUE constraint failed':
+        return set()
+    target = target.strip()
+    if target.startswith('index '):
+        # Index sur expressions : SQLite cite le nom de l'index, celui de la contrainte
+        return {target[len('index '):].strip('\'"')}
+
+    failed = {column.strip() for column in target.split(',')}
+    table = model._meta.db_table
+    return {
+        constraint.name for constraint in model._meta.constraints
+        if isinstance(constraint, UniqueConstraint) and constraint.fields and failed == {
+            f'{table}.{model._meta.get_field(field).column}' for field in constraint.fields
+        }
+    }
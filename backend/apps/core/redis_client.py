@@ -0,0 +1,20 @@
+# ============================================
+# apps/core/redis_client.py - Connexion Redis partagée
+# ============================================
+from django.conf import settings
+
+_client = None
+
+
+def get_redis_client():
+    """Client Redis du processus (pool de connexions partagé)"""
+    global _client
+    if _client is None:
+        import redis
+        _client = redis.Redis.from_url(
+            settings.REDIS_URL,
+            decode_responses=True,
+            socket_connect_timeout=1,
+            socket_timeout=1
+        )
+    return _client
@@ -1,7 +1,7 @@
 # ============================================
 # apps/core/signals.py
 # ============================================
-from django.db.models.signals import post_save
+from django.db.models.signals import pre_save, post_save
 from django.dispatch import receiver
 from django.conf import settings
 
@@ -9,6 +9,7 @@ from apps.users.models import User, UserProfile
 from apps.forum.models import Question, Answer
 from apps.bookings.models import Booking
 from apps.mentors.models import MentorProfile
+from apps.gamification.services import PointsLedger
 
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
@@ -30,27 +31,31 @@ def create_user_profile(sender, instance, created, **kwargs):
 def handle_question_points(sender, instance, created, **kwargs):
     """Attribution de points pour nouvelle question"""
     if created:
-        instance.author.add_points(
+        PointsLedger.award(
+            instance.author,
             settings.GAMIFICATION_POINTS['QUESTION_POSTED'],
-            'question_posted'
+            'question_posted',
+            related=instance
         )
         
         # Vérifier badges
         from apps.gamification.services import BadgeService
-        BadgeService.check_and_award_badges(instance.author)
+        BadgeService.check_and_award_badges(instance.author, event='question_posted')
 
 @receiver(post_save, sender=Answer)
 def handle_answer_points(sender, instance, created, **kwargs):
     """Attribution de points pour nouvelle réponse"""
     if created:
-        instance.author.add_points(
+        PointsLedger.award(
+            instance.author,
             settings.GAMIFICATION_POINTS['ANSWER_POSTED'],
-            'answer_posted'
+            'answer_posted',
+            related=instance
         )
         
         # Vérifier badges
         from apps.gamification.services import BadgeService
-        BadgeService.check_and_award_badges(instance.author)
+        BadgeService.check_and_award_badges(instance.author, event='answer_posted')
 
 @receiver(post_save, sender=MentorProfile)
 def handle_mentor_verification(sender, instance, created, **kwargs):
@@ -64,23 +69,37 @@ def handle_mentor_verification(sender, instance, created, **kwargs):
         # 2. Attribuer les points (si pas déjà fait)
         from apps.gamification.models import UserPointsHistory
         if not UserPointsHistory.objects.filter(user=instance.user, reason='become_mentor').exists():
-            instance.user.add_points(
+            # Synchrone : l'historique sert de garde contre une double attribution
+            PointsLedger.award(
+                instance.user,
                 settings.GAMIFICATION_POINTS['BECOME_MENTOR'],
-                'become_mentor'
+                'become_mentor',
+                related=instance,
+                defer=False
             )
             
             # Badge mentor
             from apps.gamification.services import BadgeService
-            BadgeService.check_and_award_badges(instance.user)
+            BadgeService.check_and_award_badges(instance.user, event='become_mentor')
+
+@receiver(pre_save, sender=Booking)
+def remember_booking_status(sender, instance, **kwargs):
+    """Statut enregistré avant modification (None pour une nouvelle réservation)"""
+    instance._previous_status = None
+    if not instance._state.adding and instance.pk:
+        instance._previous_status = Booking.objects.filter(pk=instance.pk).values_list('status', flat=True).first()
 
 @receiver(post_save, sender=Booking)
 def handle_booking_completion(sender, instance, created, **kwargs):
-    """Attribution de points pour session complétée"""
-    if not created and instance.status == 'COMPLETED':
+    """Attribution de points pour session complétée (au passage à COMPLETED seulement)"""
+    previous_status = getattr(instance, '_previous_status', None)
+    if not created and instance.status == 'COMPLETED' and previous_status != 'COMPLETED':
         # Points pour l'étudiant
-        instance.student.add_points(
+        PointsLedger.award(
+            instance.student_id,
             settings.GAMIFICATION_POINTS['BOOKING_COMPLETED'],
-            'booking_completed'
+            'booking_completed',
+            related=instance
         )
         
         # Incrémenter sessions du mentor
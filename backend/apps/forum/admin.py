@@ -2,7 +2,7 @@ from django.contrib import admin
 from .models import (
     Question, QuestionTitle, QuestionContent, QuestionTag, 
     QuestionVote, QuestionView, QuestionStatusHistory,
-    Answer, AnswerContent, AnswerVote, AnswerAcceptance
+    Answer, AnswerContent, AnswerVote, AnswerAcceptance, AnswerEvaluation
 )
 
 class QuestionTitleInline(admin.StackedInline):
@@ -44,3 +44,8 @@ class QuestionVoteAdmin(admin.ModelAdmin):
 class AnswerVoteAdmin(admin.ModelAdmin):
     list_display = ('answer', 'user', 'vote_type', 'is_active', 'created_at')
     list_filter = ('vote_type', 'is_active')
+
+@admin.register(AnswerEvaluation)
+class AnswerEvaluationAdmin(admin.ModelAdmin):
+    list_display = ('answer', 'status', 'resolves_question', 'attempts', 'evaluated_at', 'created_at')
+    list_filter = ('status', 'resolves_question')
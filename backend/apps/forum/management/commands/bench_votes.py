@@ -0,0 +1,89 @@
+"""
+Benchmark : N votants simultanés sur la même question
+"""
+import random
+import statistics
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from apps.forum.models import Question, QuestionVote
+from apps.forum.services import VoteService
+from apps.users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Lance N votes simultanés (puis N bascules) sur une question et vérifie le compteur'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--voters', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        voters = options['voters']
+        rng = random.Random(options['seed'])
+
+        author, _ = User.objects.get_or_create(email='bench-author@edulab.bench')
+        users = []
+        for i in range(voters):
+            user, _ = User.objects.get_or_create(email=f'bench-voter-{i}@edulab.bench')
+            users.append(user)
+
+        question = Question.objects.create(author=author, profile=author.profiles.filter(is_current=True).first())
+        try:
+            # 1er tour : vote initial ; 2e tour : mêmes votes (annulation) ou vote contraire
+            first = [rng.choice([1, -1]) for _ in users]
+            second = [v if rng.random() < 0.5 else -v for v in first]
+            for label, votes in (('votes', first), ('bascules', second)):
+                elapsed, latencies, errors = self._round(question.id, users, votes)
+                latencies.sort()
+                self.stdout.write(
+                    f'{label}: {voters} en {elapsed:.2f}s  '
+                    f'p50 {statistics.median(latencies):.1f}ms  '
+                    f'p95 {latencies[int(len(latencies) * 0.95) - 1]:.1f}ms  erreurs: {len(errors)}'
+                )
+                for error in errors[:5]:
+                    self.stdout.write(self.style.WARNING(f'  {error}'))
+
+            expected = sum(
+                b for a, b in zip(first, second) if a != b
+            )
+            counter = Question.objects.values_list('votes', flat=True).get(pk=question.id)
+            actual = sum(QuestionVote.objects.filter(
+                question_id=question.id, is_active=True
+            ).values_list('vote_type', flat=True))
+
+            self.stdout.write(f'compteur: {counter}  somme des votes: {actual}  attendu: {expected}')
+            if counter == actual == expected:
+                self.stdout.write(self.style.SUCCESS('✓ Compteur cohérent'))
+            else:
+                self.stdout.write(self.style.ERROR('✗ Compteur incohérent'))
+        finally:
+            question.delete(hard=True)
+
+    def _round(self, question_id, users, votes):
+        barrier = threading.Barrier(len(users))
+        latencies, errors = [], []
+        lock = threading.Lock()
+
+        def vote(user, vote_type):
+            barrier.wait()
+            started = time.perf_counter()
+            try:
+                VoteService.vote('question', question_id, user.id, vote_type)
+            except Exception as e:
+                errors.append(repr(e))
+            finally:
+                connection.close()
+            with lock:
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        threads = [threading.Thread(target=vote, args=args) for args in zip(users, votes)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - started, latencies, errors
@@ -0,0 +1,61 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:10
+
+from django.db import migrations, models
+
+
+def dedupe_votes(apps, schema_editor):
+    """
+    Une seule ligne par (cible, utilisateur) : le vote actif s'il existe,
+    sinon le plus récent ; les autres lignes (votes annulés) sont supprimées.
+    La suppression passe par une sous-requête (une ligne mieux classée existe
+    pour le même couple) plutôt que par une liste d'ids, sans limite de
+    variables liées.
+    """
+    from django.db.models import Exists, OuterRef, Q
+
+    for model_name, target in (('QuestionVote', 'question_id'), ('AnswerVote', 'answer_id')):
+        Vote = apps.get_model('forum', model_name)
+        # Classement : (is_active, updated_at, id), le plus grand l'emporte
+        better = Vote.objects.filter(**{target: OuterRef(target)}, user_id=OuterRef('user_id')).filter(
+            Q(is_active__gt=OuterRef('is_active'))
+            | Q(is_active=OuterRef('is_active'), updated_at__gt=OuterRef('updated_at'))
+            | Q(is_active=OuterRef('is_active'), updated_at=OuterRef('updated_at'), id__gt=OuterRef('id'))
+        )
+        Vote.objects.filter(Exists(better)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='answervote',
+            unique_together=set(),
+        ),
+        migrations.AlterUniqueTogether(
+            name='questionvote',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='answervote',
+            name='last_delta',
+            field=models.SmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='questionvote',
+            name='last_delta',
+            field=models.SmallIntegerField(default=0),
+        ),
+        migrations.RunPython(dedupe_votes, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='answervote',
+            constraint=models.UniqueConstraint(fields=('answer', 'user'), name='unique_answer_vote'),
+        ),
+        migrations.AddConstraint(
+            model_name='questionvote',
+            constraint=models.UniqueConstraint(fields=('question', 'user'), name='unique_question_vote'),
+        ),
+    ]
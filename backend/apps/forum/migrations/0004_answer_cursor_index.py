@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0003_vote_upsert_constraints'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='answer',
+            index=models.Index(fields=['question', 'is_active', '-created_at'], name='answers_questio_07ac1b_idx'),
+        ),
+    ]
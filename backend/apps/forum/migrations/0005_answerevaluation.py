@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:15
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0004_answer_cursor_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnswerEvaluation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('status', models.CharField(choices=[('PENDING', 'En attente'), ('PROCESSING', 'En cours'), ('DONE', 'Évaluée'), ('FAILED', 'Échec')], default='PENDING', max_length=20)),
+                ('resolves_question', models.BooleanField(null=True)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('evaluated_at', models.DateTimeField(blank=True, null=True)),
+                ('answer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='evaluation', to='forum.answer')),
+            ],
+            options={
+                'db_table': 'answer_evaluations',
+                'indexes': [models.Index(fields=['status', 'created_at'], name='answer_eval_status_82acfd_idx')],
+            },
+        ),
+    ]
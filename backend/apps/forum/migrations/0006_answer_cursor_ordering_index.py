@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-19 14:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0005_answerevaluation'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='answer',
+            name='answers_questio_07ac1b_idx',
+        ),
+        migrations.AddIndex(
+            model_name='answer',
+            index=models.Index(fields=['question', 'is_active', '-is_accepted', '-votes', '-created_at'], name='answers_questio_ffe10d_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-19 14:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0006_answer_cursor_ordering_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='answer',
+            name='answers_questio_ffe10d_idx',
+        ),
+        migrations.AddIndex(
+            model_name='answer',
+            index=models.Index(fields=['question', 'is_active', '-created_at', '-id'], name='answers_questio_55efcb_idx'),
+        ),
+    ]
@@ -57,10 +57,14 @@ class QuestionVote(TimestampMixin, SoftDeleteMixin):
     question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='user_votes')
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='question_votes')
     vote_type = models.SmallIntegerField(choices=[(1, 'Upvote'), (-1, 'Downvote')], default=1)
+    # Effet du dernier vote sur le compteur (calculé par l'upsert, voir VoteService)
+    last_delta = models.SmallIntegerField(default=0)
     
     class Meta:
         db_table = 'question_votes'
-        unique_together = ['question', 'user', 'is_active']
+        constraints = [
+            models.UniqueConstraint(fields=['question', 'user'], name='unique_question_vote'),
+        ]
 
 class QuestionView(TimestampMixin):
     """Compteur de vues"""
@@ -95,9 +99,32 @@ class Answer(TimestampMixin, SoftDeleteMixin):
         indexes = [
             models.Index(fields=['question', '-votes']),
             models.Index(fields=['author', 'is_active']),
+            # Pagination par curseur des réponses d'une question
+            models.Index(fields=['question', 'is_active', '-created_at', '-id']),
         ]
         ordering = ['-is_accepted', '-votes', '-created_at']
 
+class AnswerEvaluation(TimestampMixin):
+    """File d'évaluation IA des réponses (résolution automatique)"""
+    STATUS_CHOICES = [
+        ('PENDING', 'En attente'),
+        ('PROCESSING', 'En cours'),
+        ('DONE', 'Évaluée'),
+        ('FAILED', 'Échec'),
+    ]
+    
+    answer = models.OneToOneField(Answer, on_delete=models.CASCADE, related_name='evaluation')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    resolves_question = models.BooleanField(null=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    evaluated_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'answer_evaluations'
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
 class AnswerContent(TimestampMixin, VersionedFieldMixin):
     answer = models.ForeignKey(Answer, on_delete=models.CASCADE, related_name='contents')
     content = models.TextField()
@@ -109,10 +136,14 @@ class AnswerVote(TimestampMixin, SoftDeleteMixin):
     answer = models.ForeignKey(Answer, on_delete=models.CASCADE, related_name='user_votes')
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='answer_votes')
     vote_type = models.SmallIntegerField(choices=[(1, 'Upvote'), (-1, 'Downvote')], default=1)
+    # Effet du dernier vote sur le compteur (calculé par l'upsert, voir VoteService)
+    last_delta = models.SmallIntegerField(default=0)
     
     class Meta:
         db_table = 'answer_votes'
-        unique_together = ['answer', 'user', 'is_active']
+        constraints = [
+            models.UniqueConstraint(fields=['answer', 'user'], name='unique_answer_vote'),
+        ]
 
 class AnswerAcceptance(TimestampMixin):
     """Historique acceptations de réponses"""
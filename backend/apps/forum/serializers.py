@@ -34,21 +34,31 @@ class QuestionSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'author', 'votes', 'views_count', 'created_at']
     
     def get_title(self, obj):
+        if hasattr(obj, 'current_title'):
+            return obj.current_title
         title = obj.titles.filter(is_current=True).first()
         return title.title if title else None
     
     def get_content(self, obj):
+        if hasattr(obj, 'current_content'):
+            return obj.current_content
         content = obj.contents.filter(is_current=True).first()
         return content.content if content else None
     
     def get_tags(self, obj):
+        if hasattr(obj, 'active_tags'):
+            return [t.tag for t in obj.active_tags]
         return [t.tag for t in obj.tags.filter(is_active=True)]
     
     def get_answers_count(self, obj):
+        if hasattr(obj, 'active_answers_count'):
+            return obj.active_answers_count
         return obj.answers.filter(is_active=True).count()
     
     def get_user_vote(self, obj):
         """Vote de l'utilisateur actuel"""
+        if hasattr(obj, 'viewer_vote'):
+            return obj.viewer_vote
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             vote = obj.user_votes.filter(
@@ -57,6 +67,43 @@ class QuestionSerializer(serializers.ModelSerializer):
             ).first()
             return vote.vote_type if vote else None
         return None
+    
+    @staticmethod
+    def setup_eager_loading(queryset, user=None):
+        """
+        Titre, contenu, nombre de réponses et vote de l'utilisateur annotés
+        dans la requête principale ; tags et auteurs préchargés.
+        """
+        from django.db.models import Count, IntegerField, OuterRef, Prefetch, Subquery, Value
+        from django.db.models.functions import Coalesce
+        from apps.users.serializers import user_prefetch_lookups
+        
+        answers = Answer.objects.filter(
+            question=OuterRef('pk'), is_active=True
+        ).order_by().values('question').annotate(total=Count('id')).values('total')
+        queryset = queryset.annotate(
+            current_title=Subquery(
+                QuestionTitle.objects.filter(question=OuterRef('pk'), is_current=True)
+                .order_by('pk').values('title')[:1]
+            ),
+            current_content=Subquery(
+                QuestionContent.objects.filter(question=OuterRef('pk'), is_current=True)
+                .order_by('pk').values('content')[:1]
+            ),
+            active_answers_count=Coalesce(Subquery(answers), 0),
+        )
+        if user is not None and user.is_authenticated:
+            queryset = queryset.annotate(viewer_vote=Subquery(
+                QuestionVote.objects.filter(question=OuterRef('pk'), user=user, is_active=True)
+                .values('vote_type')[:1]
+            ))
+        else:
+            queryset = queryset.annotate(viewer_vote=Value(None, output_field=IntegerField()))
+        
+        return queryset.select_related('author').prefetch_related(
+            Prefetch('tags', queryset=QuestionTag.objects.filter(is_active=True), to_attr='active_tags'),
+            *user_prefetch_lookups('author__'),
+        )
 
 class QuestionCreateSerializer(serializers.Serializer):
     title = serializers.CharField(max_length=255)
@@ -69,7 +116,6 @@ class QuestionCreateSerializer(serializers.Serializer):
     
     def create(self, validated_data):
         from django.db import transaction
-        from django.conf import settings
         
         user = self.context['request'].user
         tags = validated_data.pop('tags', [])
@@ -100,16 +146,8 @@ class QuestionCreateSerializer(serializers.Serializer):
             # Ajouter tags
             for tag in tags:
                 QuestionTag.objects.create(question=question, tag=tag.lower())
-            
-            # Attribution de points
-            user.add_points(
-                settings.GAMIFICATION_POINTS['QUESTION_POSTED'],
-                'question_posted'
-            )
-            
-            # Vérifier badges
-            from apps.gamification.services import BadgeService
-            BadgeService.check_and_award_badges(user)
+
+            # Points et badges : signal post_save de Question (apps/core/signals.py)
         
         return question
 
@@ -175,10 +213,14 @@ class AnswerSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'question', 'author', 'votes', 'is_accepted', 'created_at']
     
     def get_content(self, obj):
+        if hasattr(obj, 'current_content'):
+            return obj.current_content
         content = obj.contents.filter(is_current=True).first()
         return content.content if content else None
     
     def get_user_vote(self, obj):
+        if hasattr(obj, 'viewer_vote'):
+            return obj.viewer_vote
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             vote = obj.user_votes.filter(
@@ -187,13 +229,32 @@ class AnswerSerializer(serializers.ModelSerializer):
             ).first()
             return vote.vote_type if vote else None
         return None
+    
+    @staticmethod
+    def setup_eager_loading(queryset, user=None):
+        """Contenu et vote de l'utilisateur annotés, auteurs préchargés"""
+        from django.db.models import IntegerField, OuterRef, Subquery, Value
+        from apps.users.serializers import user_prefetch_lookups
+        
+        queryset = queryset.annotate(current_content=Subquery(
+            AnswerContent.objects.filter(answer=OuterRef('pk'), is_current=True)
+            .order_by('pk').values('content')[:1]
+        ))
+        if user is not None and user.is_authenticated:
+            queryset = queryset.annotate(viewer_vote=Subquery(
+                AnswerVote.objects.filter(answer=OuterRef('pk'), user=user, is_active=True)
+                .values('vote_type')[:1]
+            ))
+        else:
+            queryset = queryset.annotate(viewer_vote=Value(None, output_field=IntegerField()))
+        
+        return queryset.select_related('author').prefetch_related(*user_prefetch_lookups('author__'))
 
 class AnswerCreateSerializer(serializers.Serializer):
     content = serializers.CharField()
     
     def create(self, validated_data):
         from django.db import transaction
-        from django.conf import settings
         
         user = self.context['request'].user
         question = self.context['question']
@@ -211,12 +272,8 @@ class AnswerCreateSerializer(serializers.Serializer):
                 answer=answer,
                 content=validated_data['content']
             )
-            
-            # Attribution de points
-            user.add_points(
-                settings.GAMIFICATION_POINTS['ANSWER_POSTED'],
-                'answer_posted'
-            )
+
+            # Points : signal post_save de Answer (apps/core/signals.py)
             
             # Notification à l'auteur de la question
             from apps.notifications.services import NotificationService
@@ -0,0 +1,300 @@
+# ============================================
+# apps/forum/services.py - Votes et résolution automatique du forum
+# ============================================
+import json
+import logging
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from apps.forum.models import (
+    Question, QuestionTitle, QuestionContent, QuestionStatusHistory,
+    Answer, AnswerContent, AnswerVote, AnswerEvaluation, QuestionVote
+)
+
+logger = logging.getLogger(__name__)
+
+
+class VoteService:
+    """
+    Vote / annulation / changement de vote en une seule instruction SQL.
+
+    Une ligne unique par (cible, utilisateur) ; l'upsert calcule en SQL
+    l'effet du vote sur le compteur (last_delta) à partir de l'état
+    précédent de la ligne, sans lecture préalable ni verrou applicatif :
+      - aucun vote / vote annulé -> vote actif,     delta = v
+      - même vote actif          -> annulation,     delta = -v
+      - vote contraire actif     -> changement,     delta = 2v
+    Le compteur de la cible est ensuite mis à jour par F().
+    """
+
+    TARGETS = {
+        'question': (Question, QuestionVote, 'question_id'),
+        'answer': (Answer, AnswerVote, 'answer_id'),
+    }
+
+    @classmethod
+    def vote(cls, target, target_id, user_id, vote_type):
+        """
+        Applique un vote. Retourne (votes, delta, created) où created indique
+        le tout premier vote de l'utilisateur sur cette cible.
+        """
+        model, vote_model, target_field = cls.TARGETS[target]
+        table = connection.ops.quote_name(vote_model._meta.db_table)
+        same_active = f'{table}.is_active AND {table}.vote_type = EXCLUDED.vote_type'
+        now = timezone.now()
+
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'INSERT INTO {table} ({target_field}, user_id, vote_type, last_delta, '
+                    f'is_active, deleted_at, created_at, updated_at) '
+                    f'VALUES (%s, %s, %s, %s, %s, NULL, %s, %s) '
+                    f'ON CONFLICT ({target_field}, user_id) DO UPDATE SET '
+                    f'last_delta = CASE '
+                    f'WHEN {same_active} THEN -EXCLUDED.vote_type '
+                    f'WHEN {table}.is_active THEN EXCLUDED.vote_type - {table}.vote_type '
+                    f'ELSE EXCLUDED.vote_type END, '
+                    f'is_active = NOT ({same_active}), '
+                    f'deleted_at = CASE WHEN {same_active} THEN EXCLUDED.updated_at ELSE NULL END, '
+                    f'vote_type = EXCLUDED.vote_type, '
+                    f'updated_at = EXCLUDED.updated_at '
+                    f'RETURNING last_delta, created_at = updated_at',
+                    [target_id, user_id, vote_type, vote_type, True, now, now]
+                )
+                delta, created = cursor.fetchone()
+
+            model.objects.filter(pk=target_id).update(votes=F('votes') + delta)
+            votes = model.objects.values_list('votes', flat=True).get(pk=target_id)
+
+        return votes, delta, bool(created)
+
+    @staticmethod
+    def upvotes_delta(vote_type, delta):
+        """
+        Variation du nombre de votes pour actifs (+1, -1 ou 0) produite par
+        un vote : sert aux points de l'auteur, qui suivent les votes pour
+        (annulation ou passage contre -> points repris).
+        """
+        if vote_type == 1:
+            return 1 if delta > 0 else -1
+        return -1 if delta == -2 else 0
+
+    @classmethod
+    def reconcile(cls):
+        """
+        Recalcule les compteurs qui ont dérivé de la somme des votes actifs.
+        Retourne le nombre de cibles corrigées.
+        """
+        fixed = 0
+        for target, (model, vote_model, target_field) in cls.TARGETS.items():
+            actual = Coalesce(Subquery(
+                vote_model.objects.filter(**{target_field: OuterRef('pk')}, is_active=True)
+                .order_by().values(target_field).annotate(total=Sum('vote_type')).values('total')
+            ), 0)
+            drifted = list(
+                model.objects.annotate(actual=actual).exclude(votes=F('actual')).values_list('pk', flat=True)
+            )
+            if drifted:
+                # Recalcul dans l'UPDATE lui-même : les votes concurrents restent pris en compte
+                model.objects.filter(pk__in=drifted).update(votes=actual)
+                logger.warning(f"Compteurs de votes corrigés ({target}) : {len(drifted)}")
+                fixed += len(drifted)
+        return fixed
+
+
+class AnswerEvaluationService:
+    """
+    Résolution automatique des questions par évaluation IA des réponses.
+
+    Les nouvelles réponses sont mises en file (AnswerEvaluation PENDING) ;
+    la tâche forum.evaluate_pending_answers les évalue par lots, un seul
+    prompt listant plusieurs paires question/réponse, puis marque les
+    questions résolues et écrit leur historique.
+    """
+
+    # Une évaluation bloquée en PROCESSING (worker arrêté) est reprise après ce délai
+    STALE_AFTER = timedelta(minutes=10)
+    ANSWER_MAX_CHARS = 4000
+
+    @staticmethod
+    def config():
+        return settings.FORUM_AUTO_RESOLVE
+
+    @classmethod
+    def enqueue(cls, answer):
+        """Met une réponse en file ; déclenche un lot dès que le seuil est atteint"""
+        from apps.ai_tools.providers import get_provider
+
+        if answer.question.is_solved or not get_provider().is_configured():
+            return None
+
+        evaluation = AnswerEvaluation.objects.create(answer=answer)
+
+        def trigger():
+            pending = AnswerEvaluation.objects.filter(status='PENDING').count()
+            if pending >= cls.config()['BATCH_SIZE']:
+                from apps.forum.tasks import evaluate_pending_answers
+                try:
+                    evaluate_pending_answers.delay()
+                except Exception as e:
+                    # Le lot partira au prochain passage de Celery Beat
+                    logger.warning(f"Déclenchement de l'évaluation des réponses impossible : {e}")
+
+        transaction.on_commit(trigger)
+        return evaluation
+
+    @classmethod
+    def claim(cls, limit):
+        """Réserve un lot d'évaluations (PENDING ou PROCESSING périmées)"""
+        stale = timezone.now() - cls.STALE_AFTER
+        with transaction.atomic():
+            ids = list(
+                AnswerEvaluation.objects.select_for_update(skip_locked=True)
+                .filter(Q(status='PENDING') | Q(status='PROCESSING', updated_at__lt=stale))
+                .order_by('created_at')
+                .values_list('id', flat=True)[:limit]
+            )
+            AnswerEvaluation.objects.filter(id__in=ids).update(
+                status='PROCESSING', attempts=F('attempts') + 1, updated_at=timezone.now()
+            )
+        return ids
+
+    @staticmethod
+    def load_items(evaluation_ids):
+        """Textes des questions et réponses du lot, en une requête"""
+        def current(model, field, outer, value):
+            return Subquery(
+                model.objects.filter(**{field: OuterRef(outer)}, is_current=True)
+                .order_by('pk').values(value)[:1]
+            )
+
+        return list(
+            AnswerEvaluation.objects.filter(id__in=evaluation_ids).annotate(
+                question_id=F('answer__question_id'),
+                question_solved=F('answer__question__is_solved'),
+                author_id=F('answer__author_id'),
+                question_title=current(QuestionTitle, 'question', 'answer__question_id', 'title'),
+                question_content=current(QuestionContent, 'question', 'answer__question_id', 'content'),
+                answer_content=current(AnswerContent, 'answer', 'answer_id', 'content'),
+            ).order_by('created_at')
+        )
+
+    @classmethod
+    def build_prompt(cls, items):
+        blocks = []
+        for item in items:
+            blocks.append(
+                f"### {item.id}\n"
+                f"Question: {item.question_title or ''}\n{item.question_content or ''}\n"
+                f"Réponse proposée: {(item.answer_content or '')[:cls.ANSWER_MAX_CHARS]}"
+            )
+        return (
+            "Tu es un expert pédagogique.\n"
+            "Pour chaque paire question/réponse ci-dessous, indique si la réponse résout "
+            "COMPLÈTEMENT et CORRECTEMENT la question posée.\n"
+            'Réponds UNIQUEMENT par un tableau JSON : [{"id": <id>, "resolved": true|false}, ...]\n\n'
+            + "\n\n".join(blocks)
+        )
+
+    @staticmethod
+    def parse_verdicts(text):
+        """{evaluation_id: bool} à partir de la réponse du modèle"""
+        match = re.search(r'\[.*\]', text or '', re.DOTALL)
+        if not match:
+            raise ValueError("Réponse d'évaluation sans tableau JSON")
+        verdicts = {}
+        for entry in json.loads(match.group(0)):
+            try:
+                verdicts[int(entry['id'])] = bool(entry['resolved'])
+            except (KeyError, TypeError, ValueError):
+                continue
+        return verdicts
+
+    @classmethod
+    def evaluate_batch(cls, provider=None):
+        """
+        Évalue un lot. Retourne le nombre d'évaluations traitées
+        (0 quand la file est vide).
+        """
+        from apps.ai_tools.providers import get_provider
+
+        ids = cls.claim(cls.config()['BATCH_SIZE'])
+        if not ids:
+            return 0
+
+        items = cls.load_items(ids)
+        # Questions résolues entre-temps : inutile d'interroger le modèle
+        done = [item.id for item in items if item.question_solved]
+        items = [item for item in items if not item.question_solved]
+        AnswerEvaluation.objects.filter(id__in=done).update(status='DONE', evaluated_at=timezone.now())
+        if not items:
+            return len(ids)
+
+        provider = provider or get_provider()
+        try:
+            result = provider.generate(cls.build_prompt(items))
+            verdicts = cls.parse_verdicts(result.text)
+        except Exception as e:
+            logger.error(f"Évaluation IA du lot impossible ({len(items)} réponses) : {e}")
+            cls._release([item.id for item in items])
+            return len(ids)
+
+        cls._apply(items, verdicts)
+        return len(ids)
+
+    @classmethod
+    def _release(cls, evaluation_ids):
+        """Remet le lot en file, ou l'abandonne après MAX_ATTEMPTS"""
+        max_attempts = cls.config()['MAX_ATTEMPTS']
+        AnswerEvaluation.objects.filter(id__in=evaluation_ids, attempts__gte=max_attempts).update(
+            status='FAILED'
+        )
+        AnswerEvaluation.objects.filter(id__in=evaluation_ids, attempts__lt=max_attempts).update(
+            status='PENDING'
+        )
+
+    @classmethod
+    def _apply(cls, items, verdicts):
+        now = timezone.now()
+        missing = [item.id for item in items if item.id not in verdicts]
+        resolved = [item for item in items if verdicts.get(item.id)]
+
+        with transaction.atomic():
+            AnswerEvaluation.objects.filter(id__in=[i.id for i in items if i.id in verdicts]).update(
+                status='DONE', evaluated_at=now
+            )
+            for resolves in (True, False):
+                AnswerEvaluation.objects.filter(
+                    id__in=[i.id for i in items if verdicts.get(i.id) is resolves]
+                ).update(resolves_question=resolves)
+
+            # Première réponse du lot qui résout chaque question
+            solver_by_question = {}
+            for item in resolved:
+                solver_by_question.setdefault(item.question_id, item.author_id)
+
+            if solver_by_question:
+                # Seules les questions encore ouvertes changent de statut
+                solved_ids = list(
+                    Question.objects.select_for_update()
+                    .filter(id__in=list(solver_by_question), is_solved=False)
+                    .values_list('id', flat=True)
+                )
+                Question.objects.filter(id__in=solved_ids).update(is_solved=True, updated_at=now)
+                QuestionStatusHistory.objects.bulk_create([
+                    QuestionStatusHistory(
+                        question_id=question_id,
+                        is_solved=True,
+                        changed_by_id=solver_by_question[question_id]
+                    )
+                    for question_id in solved_ids
+                ])
+
+        if missing:
+            cls._release(missing)
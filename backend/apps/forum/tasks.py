@@ -0,0 +1,30 @@
+# ============================================
+# apps/forum/tasks.py - Tâches Celery pour le forum
+# ============================================
+from celery import shared_task
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(name='forum.reconcile_vote_counts')
+def reconcile_vote_counts():
+    """Recalcule les compteurs de votes qui ont dérivé des tables de votes"""
+    from apps.forum.services import VoteService
+    
+    fixed = VoteService.reconcile()
+    return f"{fixed} compteurs de votes corrigés"
+
+
+@shared_task(name='forum.evaluate_pending_answers')
+def evaluate_pending_answers(max_batches=50):
+    """Évalue par lots les réponses en attente de résolution automatique"""
+    from apps.forum.services import AnswerEvaluationService
+    
+    processed = 0
+    for _ in range(max_batches):
+        count = AnswerEvaluationService.evaluate_batch()
+        if not count:
+            break
+        processed += count
+    return f"{processed} réponses évaluées"
@@ -1,3 +1,296 @@
-from django.test import TestCase
+import datetime
+import json
+import re
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import AnonymousUser
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.ai_tools.providers import FakeBackend
+from apps.core.utils import HashIdService
+from apps.forum.models import (
+    Question, QuestionTitle, QuestionContent, QuestionStatusHistory, QuestionTag, QuestionVote, Answer,
+    AnswerContent, AnswerEvaluation
+)
+from apps.forum.serializers import QuestionSerializer
+from apps.forum.services import AnswerEvaluationService, VoteService
+from apps.forum.tasks import evaluate_pending_answers
+from apps.forum.views import AnswerCursorPagination
+from apps.users.models import User
+
+
+def fake_evaluator(prompt, model):
+    """Une réponse résout la question si elle contient le mot 'solution'"""
+    verdicts = []
+    for item_id, answer in re.findall(r'### (\d+)\n.*?Réponse proposée: (.*?)(?=\n\n### |\Z)', prompt, re.DOTALL):
+        verdicts.append({'id': int(item_id), 'resolved': 'solution' in answer})
+    return json.dumps(verdicts)
+
+
+@override_settings(
+    AI_PROVIDER='fake',
+    FORUM_AUTO_RESOLVE={'BATCH_SIZE': 10, 'MAX_WAIT': 30, 'MAX_ATTEMPTS': 2}
+)
+class AnswerAutoResolutionTests(TestCase):
+    """Résolution automatique : file d'évaluation traitée par lots avec un LLM local"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(email='asker@edulab.test', password='x')
+        cls.helper = User.objects.create_user(email='helper@edulab.test', password='x')
+        cls.questions = []
+        for i in range(3):
+            question = Question.objects.create(
+                author=cls.author, profile=cls.author.profiles.get(is_current=True)
+            )
+            QuestionTitle.objects.create(question=question, title=f'Question {i}')
+            QuestionContent.objects.create(question=question, content=f'Énoncé {i}')
+            cls.questions.append(question)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.helper)
+        self.calls = []
+
+        def handler(prompt, model):
+            self.calls.append(prompt)
+            return fake_evaluator(prompt, model)
+
+        patcher = mock.patch.object(FakeBackend, 'handler', staticmethod(handler))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post_answer(self, question, content):
+        return self.client.post(
+            f'/api/forum/questions/{HashIdService.encode(question.id)}/answers/',
+            {'content': content}, format='json', secure=True, SERVER_NAME='localhost'
+        )
+
+    def test_post_answer_does_not_call_llm(self):
+        response = self.post_answer(self.questions[0], 'Voici la solution')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.calls, [])
+        self.assertEqual(AnswerEvaluation.objects.filter(status='PENDING').count(), 1)
+
+    def test_batch_evaluation_resolves_questions(self):
+        self.post_answer(self.questions[0], 'Voici la solution')
+        self.post_answer(self.questions[1], 'Je ne sais pas')
+        self.post_answer(self.questions[2], 'Une autre solution')
+        self.post_answer(self.questions[2], 'Encore une solution')
+
+        evaluate_pending_answers()
+
+        # Un seul prompt pour tout le lot
+        self.assertEqual(len(self.calls), 1)
+        solved = set(Question.objects.filter(is_solved=True).values_list('id', flat=True))
+        self.assertEqual(solved, {self.questions[0].id, self.questions[2].id})
+        history = QuestionStatusHistory.objects.filter(is_solved=True)
+        self.assertEqual(history.count(), 2)
+        self.assertTrue(all(h.changed_by_id == self.helper.id for h in history))
+        self.assertFalse(AnswerEvaluation.objects.exclude(status='DONE').exists())
+
+    def test_answers_to_solved_question_are_not_queued(self):
+        Question.objects.filter(id=self.questions[0].id).update(is_solved=True)
+        self.post_answer(self.questions[0], 'Voici la solution')
+        self.assertFalse(AnswerEvaluation.objects.exists())
+
+    def test_provider_failure_requeues_then_fails(self):
+        self.post_answer(self.questions[0], 'Voici la solution')
+
+        with mock.patch.object(FakeBackend, 'handler', staticmethod(lambda prompt, model: 'pas de JSON')):
+            AnswerEvaluationService.evaluate_batch()
+            self.assertEqual(AnswerEvaluation.objects.get().status, 'PENDING')
+            AnswerEvaluationService.evaluate_batch()
+
+        evaluation = AnswerEvaluation.objects.get()
+        self.assertEqual(evaluation.status, 'FAILED')
+        self.assertEqual(evaluation.attempts, 2)
+        self.assertFalse(Question.objects.filter(is_solved=True).exists())
+
+
+class QuestionListQueryTests(TestCase):
+    """GET /api/forum/questions/ : nombre de requêtes indépendant de la taille de page et du votant"""
+
+    @classmethod
+    def setUpTestData(cls):
+        authors = [User.objects.create_user(email=f'author{i}@edulab.test', password='x') for i in range(5)]
+        cls.voter = User.objects.create_user(email='voter@edulab.test', password='x')
+        cls.questions = []
+        for i in range(25):
+            author = authors[i % 5]
+            question = Question.objects.create(author=author, profile=author.profiles.get(is_current=True))
+            QuestionTitle.objects.create(question=question, title=f'Question {i}')
+            QuestionContent.objects.create(question=question, content='Énoncé')
+            QuestionTag.objects.create(question=question, tag=f'tag{i % 3}')
+            if i % 4 == 0:
+                Answer.objects.create(question=question, author=author, profile=author.profiles.get(is_current=True))
+            cls.questions.append(question)
+        cls.votes = {}
+        for question, vote_type in zip(cls.questions[-6:], (1, -1, 1, 1, -1, 1)):
+            VoteService.vote('question', question.id, cls.voter.id, vote_type)
+            cls.votes[HashIdService.encode(question.id)] = vote_type
+
+    def test_voter_list_queries(self):
+        client = APIClient()
+        client.force_authenticate(self.voter)
+
+        # Comptage, page (titre, contenu, réponses, vote annotés), tags, profils, avatars, pays, universités, candidatures
+        with self.assertNumQueries(8):
+            response = client.get('/api/forum/questions/', secure=True, SERVER_NAME='localhost')
+
+        self.assertEqual(response.status_code, 200)
+        results = response.data['results']
+        self.assertEqual(len(results), 20)
+        self.assertEqual(
+            {question['id']: question['user_vote'] for question in results if question['user_vote']}, self.votes
+        )
+        self.assertEqual(results[0]['title'], 'Question 24')
+        self.assertEqual(results[0]['tags'], ['tag0'])
+        self.assertEqual(results[0]['answers_count'], 1)
+        self.assertIsNotNone(results[0]['author']['profile'])
+
+    def test_anonymous_list_queries(self):
+        # La vue exige un compte : l'annotation anonyme est vérifiée sur le serializer
+        queryset = QuestionSerializer.setup_eager_loading(
+            Question.objects.filter(is_active=True).order_by('-created_at'), AnonymousUser()
+        )
+
+        with self.assertNumQueries(7):
+            data = QuestionSerializer(queryset[:20], many=True).data
+
+        self.assertEqual(len(data), 20)
+        self.assertEqual({question['user_vote'] for question in data}, {None})
+        self.assertEqual(data[0]['title'], 'Question 24')
+
+
+class AnswerPaginationTests(TestCase):
+    """?include=answers puis GET /answers/?cursor= : pages par date, stables malgré les votes"""
+
+    def setUp(self):
+        self.author = User.objects.create_user(email='asker@edulab.test', password='x')
+        profile = self.author.profiles.get(is_current=True)
+        self.question = Question.objects.create(author=self.author, profile=profile)
+        QuestionTitle.objects.create(question=self.question, title='Question')
+        QuestionContent.objects.create(question=self.question, content='Énoncé')
+        base = timezone.now() - datetime.timedelta(hours=1)
+        self.answers = []
+        # Deux réponses créées au même instant : départagées par l'id
+        for minutes in (0, 1, 2, 2, 3, 4, 5):
+            answer = Answer.objects.create(question=self.question, author=self.author, profile=profile)
+            Answer.objects.filter(pk=answer.pk).update(created_at=base + datetime.timedelta(minutes=minutes))
+            AnswerContent.objects.create(answer=answer, content=f'Réponse {minutes}')
+            self.answers.append(answer)
+        self.url = f'/api/forum/questions/{HashIdService.encode(self.question.id)}/'
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def get(self, url):
+        return self.client.get(url, secure=True, SERVER_NAME='localhost').data
+
+    def pages(self, between_pages=None):
+        page = self.get(f'{self.url}?include=answers')['answers']
+        pages = [[answer['id'] for answer in page['results']]]
+        while page['next']:
+            if between_pages:
+                between_pages(len(pages))
+            page = self.get(page['next'])
+            pages.append([answer['id'] for answer in page['results']])
+        return pages
+
+    def expected(self):
+        ordered = sorted(
+            Answer.objects.filter(question=self.question).values_list('created_at', 'id'), reverse=True
+        )
+        return [HashIdService.encode(answer_id) for _, answer_id in ordered]
+
+    @mock.patch.object(AnswerCursorPagination, 'page_size', 2)
+    def test_cursor_pages_follow_creation_order(self):
+        pages = self.pages()
+
+        self.assertEqual([len(page) for page in pages], [2, 2, 2, 1])
+        self.assertEqual(sum(pages, []), self.expected())
+
+    @mock.patch.object(AnswerCursorPagination, 'page_size', 2)
+    def test_votes_changing_between_pages_neither_skip_nor_repeat(self):
+        def vote(page_number):
+            # Les réponses pas encore servies montent, une réponse servie est acceptée
+            Answer.objects.filter(pk=self.answers[page_number - 1].pk).update(votes=F('votes') + 10)
+            Answer.objects.filter(pk=self.answers[-page_number].pk).update(is_accepted=True, votes=-5)
+
+        self.assertEqual(sum(self.pages(between_pages=vote), []), self.expected())
+
+
+class VoteServiceTests(TestCase):
+    """Upsert des votes : transitions du compteur et réconciliation"""
+
+    def setUp(self):
+        self.author = User.objects.create_user(email='asker@edulab.test', password='x')
+        profile = self.author.profiles.get(is_current=True)
+        self.question = Question.objects.create(author=self.author, profile=profile)
+        self.answer = Answer.objects.create(question=self.question, author=self.author, profile=profile)
+        self.voters = [User.objects.create_user(email=f'voter{i}@edulab.test', password='x') for i in range(2)]
+
+    def vote(self, vote_type, voter=0, target='question'):
+        target_id = self.question.id if target == 'question' else self.answer.id
+        return VoteService.vote(target, target_id, self.voters[voter].id, vote_type)
+
+    def test_up_down_toggle_and_switch(self):
+        # (vote, votant) -> (compteur, delta, premier vote)
+        steps = [
+            ((1, 0), (1, 1, True)),      # vote pour
+            ((-1, 1), (0, -1, True)),    # vote contre d'un autre utilisateur
+            ((1, 0), (-1, -1, False)),   # même vote : annulation
+            ((1, 0), (0, 1, False)),     # nouveau vote après annulation
+            ((-1, 0), (-2, -2, False)),  # changement pour -> contre
+            ((1, 1), (0, 2, False)),     # changement contre -> pour
+            ((1, 1), (-1, -1, False)),   # annulation
+        ]
+        for (vote_type, voter), expected in steps:
+            with self.subTest(vote_type=vote_type, voter=voter):
+                self.assertEqual(self.vote(vote_type, voter), expected)
+
+        self.question.refresh_from_db()
+        self.assertEqual(self.question.votes, -1)
+        # Une seule ligne par (cible, utilisateur), l'annulation reste une ligne inactive
+        self.assertEqual(
+            sorted(QuestionVote.objects.values_list('user_id', 'vote_type', 'is_active')),
+            [(self.voters[0].id, -1, True), (self.voters[1].id, 1, False)]
+        )
+
+    def test_answer_votes_are_counted_separately(self):
+        self.vote(1)
+        self.assertEqual(self.vote(1, target='answer'), (1, 1, True))
+        self.assertEqual(self.vote(-1, voter=1, target='answer'), (0, -1, True))
+        self.question.refresh_from_db()
+        self.assertEqual(self.question.votes, 1)
+
+    def test_author_points_follow_upvotes(self):
+        client = APIClient()
+        client.force_authenticate(self.voters[0])
+        url = f'/api/forum/questions/{HashIdService.encode(self.question.id)}/vote/'
+        self.author.refresh_from_db()
+        start = self.author.points
+
+        # vote pour, annulation, contre, contre -> pour, pour -> contre
+        for vote_type, earned in ((1, 5), (1, 0), (-1, 0), (1, 5), (-1, 0)):
+            with self.subTest(vote_type=vote_type):
+                client.post(url, {'vote_type': vote_type}, format='json', secure=True, SERVER_NAME='localhost')
+                self.author.refresh_from_db()
+                self.assertEqual(self.author.points - start, earned)
+
+    def test_reconcile_restores_drifted_counters(self):
+        self.vote(1)
+        self.vote(1, voter=1)
+        self.vote(-1, target='answer')
+        Question.objects.filter(pk=self.question.pk).update(votes=7)
+        Answer.objects.filter(pk=self.answer.pk).update(votes=0)
+
+        self.assertEqual(VoteService.reconcile(), 2)
+
+        self.question.refresh_from_db()
+        self.answer.refresh_from_db()
+        self.assertEqual((self.question.votes, self.answer.votes), (2, -1))
+        self.assertEqual(VoteService.reconcile(), 0)
@@ -17,11 +17,11 @@ urlpatterns = [
 Endpoints disponibles:
 - GET /api/forum/questions/ (liste)
 - POST /api/forum/questions/ (créer)
-- GET /api/forum/questions/{id}/
+- GET /api/forum/questions/{id}/?include=answers
 - PATCH /api/forum/questions/{id}/ (modifier)
 - DELETE /api/forum/questions/{id}/ (soft delete)
 - POST /api/forum/questions/{id}/vote/
-- GET /api/forum/questions/{id}/answers/
+- GET /api/forum/questions/{id}/answers/?cursor=
 - POST /api/forum/questions/{id}/answers/ (créer réponse)
 - POST /api/forum/answers/{id}/vote/
 - POST /api/forum/answers/{id}/accept/
@@ -7,15 +7,34 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters
+from rest_framework.pagination import CursorPagination
 from django.db import transaction
+from django.db.models import F
 
-from apps.forum.models import Question, Answer, QuestionVote, AnswerVote
+from apps.forum.models import Question, Answer
 from apps.forum.serializers import (
     QuestionSerializer, QuestionCreateSerializer, QuestionUpdateSerializer,
     AnswerSerializer, AnswerCreateSerializer
 )
 from apps.core.mixins import HashIdMixin
 
+class AnswerCursorPagination(CursorPagination):
+    """
+    Réponses d'une question, des plus récentes aux plus anciennes.
+    DRF place le curseur sur le premier champ de l'ordre : created_at,
+    immuable, permet un accès par l'index (question, is_active, -created_at)
+    à coût constant, et les votes qui changent entre deux pages ne font ni
+    sauter ni répéter de réponse (un tri par votes le ferait). L'id
+    départage les réponses créées au même instant.
+    """
+    page_size = 20
+    ordering = ('-created_at', '-id')
+
+    def get_ordering(self, request, queryset, view):
+        # Le OrderingFilter de QuestionViewSet porte sur les questions : ne pas l'appliquer aux réponses
+        return self.ordering
+
+
 class QuestionViewSet(HashIdMixin, viewsets.ModelViewSet):
     """Gestion des questions du forum"""
     permission_classes = [IsAuthenticated]
@@ -47,7 +66,10 @@ class QuestionViewSet(HashIdMixin, viewsets.ModelViewSet):
         if tag:
             queryset = queryset.filter(tags__tag=tag.lower(), tags__is_active=True)
         
-        return queryset.distinct()
+        queryset = queryset.distinct()
+        if self.action in ('list', 'retrieve'):
+            queryset = QuestionSerializer.setup_eager_loading(queryset, self.request.user)
+        return queryset
     
     def create(self, request, *args, **kwargs):
         """Override create to return QuestionSerializer response"""
@@ -65,7 +87,10 @@ class QuestionViewSet(HashIdMixin, viewsets.ModelViewSet):
         )
     
     def retrieve(self, request, *args, **kwargs):
-        """Incrémenter les vues"""
+        """
+        Incrémenter les vues.
+        ?include=answers ajoute la première page de réponses (pagination par curseur).
+        """
         instance = self.get_object()
         
         # Enregistrer la vue
@@ -76,12 +101,30 @@ class QuestionViewSet(HashIdMixin, viewsets.ModelViewSet):
             ip_address=request.META.get('REMOTE_ADDR')
         )
         
-        # Incrémenter le compteur
+        # Incrémenter le compteur (atomique)
+        Question.objects.filter(pk=instance.pk).update(views_count=F('views_count') + 1)
         instance.views_count += 1
-        instance.save(update_fields=['views_count'])
         
         serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+        data = serializer.data
+        
+        if 'answers' in request.query_params.get('include', '').split(','):
+            paginator = AnswerCursorPagination()
+            page = paginator.paginate_queryset(self._answers_queryset(instance), request, view=self)
+            # Les pages suivantes sont servies par GET /answers/
+            paginator.base_url = self.reverse_action('answers', args=[kwargs[self.lookup_field]])
+            data['answers'] = {
+                'next': paginator.get_next_link(),
+                'results': AnswerSerializer(page, many=True, context={'request': request}).data
+            }
+        
+        return Response(data)
+    
+    def _answers_queryset(self, question):
+        return AnswerSerializer.setup_eager_loading(
+            question.answers.filter(is_active=True),
+            self.request.user
+        )
     
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def vote(self, request, pk=None):
@@ -95,45 +138,22 @@ class QuestionViewSet(HashIdMixin, viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        with transaction.atomic():
-            # Vérifier si vote existe déjà
-            existing_vote = QuestionVote.objects.filter(
-                question=question,
-                user=request.user,
-                is_active=True
-            ).first()
-            
-            if existing_vote:
-                if existing_vote.vote_type == vote_type:
-                    # Annuler le vote
-                    existing_vote.delete(hard=False)
-                    question.votes -= vote_type
-                else:
-                    # Changer le vote
-                    question.votes -= existing_vote.vote_type
-                    existing_vote.vote_type = vote_type
-                    existing_vote.save()
-                    question.votes += vote_type
-            else:
-                # Nouveau vote
-                QuestionVote.objects.create(
-                    question=question,
-                    user=request.user,
-                    vote_type=vote_type
-                )
-                question.votes += vote_type
-                
-                # Attribution de points à l'auteur si upvote
-                if vote_type == 1:
-                    from django.conf import settings
-                    question.author.add_points(
-                        settings.GAMIFICATION_POINTS.get('ANSWER_UPVOTED', 5),
-                        'question_upvoted'
-                    )
-            
-            question.save(update_fields=['votes'])
+        from apps.forum.services import VoteService
+        votes, delta, _ = VoteService.vote('question', question.id, request.user.id, vote_type)
+        
+        # Points de l'auteur : gagnés à chaque vote pour, repris à son annulation
+        upvotes = VoteService.upvotes_delta(vote_type, delta)
+        if upvotes:
+            from django.conf import settings
+            from apps.gamification.services import PointsLedger
+            PointsLedger.award(
+                question.author_id,
+                upvotes * settings.GAMIFICATION_POINTS.get('ANSWER_UPVOTED', 5),
+                'question_upvoted' if upvotes > 0 else 'question_upvote_removed',
+                related=question
+            )
         
-        return Response({'votes': question.votes})
+        return Response({'votes': votes})
     
     @action(detail=True, methods=['get', 'post'], permission_classes=[IsAuthenticated])
     def answers(self, request, pk=None):
@@ -141,7 +161,15 @@ class QuestionViewSet(HashIdMixin, viewsets.ModelViewSet):
         question = self.get_object()
         
         if request.method == 'GET':
-            answers = question.answers.filter(is_active=True)
+            answers = self._answers_queryset(question)
+            
+            # Pagination par curseur à partir du lien "next" de ?include=answers
+            if 'cursor' in request.query_params:
+                paginator = AnswerCursorPagination()
+                page = paginator.paginate_queryset(answers, request, view=self)
+                serializer = AnswerSerializer(page, many=True, context={'request': request})
+                return paginator.get_paginated_response(serializer.data)
+            
             serializer = AnswerSerializer(
                 answers,
                 many=True,
@@ -157,72 +185,15 @@ class QuestionViewSet(HashIdMixin, viewsets.ModelViewSet):
             serializer.is_valid(raise_exception=True)
             answer = serializer.save()
             
-            # AI Auto-Resolution
-            try:
-                from django.conf import settings
-                if settings.GEMINI_API_KEY:
-                    # Récupérer le contenu de la question
-                    q_title = question.titles.filter(is_current=True).first()
-                    q_content = question.contents.filter(is_current=True).first()
-                    
-                    question_text = f"{q_title.title if q_title else ''}\n{q_content.content if q_content else ''}"
-                    
-                    # Récupérer le contenu de la réponse
-                    a_content = answer.contents.filter(is_current=True).first()
-                    answer_text = a_content.content if a_content else ""
-                    
-                    if self._evaluate_answer(question_text, answer_text):
-                        question.is_solved = True
-                        question.save(update_fields=['is_solved'])
-                        
-                        # Historique
-                        from apps.forum.models import QuestionStatusHistory
-                        QuestionStatusHistory.objects.create(
-                            question=question,
-                            is_solved=True,
-                            changed_by=request.user
-                        )
-            except Exception as e:
-                print(f"Auto-resolution error: {e}")
+            # Résolution automatique : évaluation IA en file (tâche Celery par lots)
+            from apps.forum.services import AnswerEvaluationService
+            AnswerEvaluationService.enqueue(answer)
             
             return Response(
                 AnswerSerializer(answer, context={'request': request}).data,
                 status=status.HTTP_201_CREATED
             )
 
-    def _evaluate_answer(self, question_text, answer_text):
-        """Évalue si la réponse résout la question via Gemini"""
-        from google import genai
-        from django.conf import settings
-        
-        if not settings.GEMINI_API_KEY:
-            return False
-            
-        try:
-            client = genai.Client(api_key=settings.GEMINI_API_KEY)
-            
-            prompt = f"""
-            Tu es un expert pédagogique.
-            
-            Question: {question_text}
-            
-            Réponse proposée: {answer_text}
-            
-            Cette réponse résout-elle COMPLÈTEMENT et CORRECTEMENT la question posée ?
-            Réponds UNIQUEMENT par 'OUI' ou 'NON'.
-            """
-            
-            response = client.models.generate_content(
-                model="gemini-2.5-flash", contents=prompt
-            )
-            
-            result = response.text.strip().upper()
-            return "OUI" in result
-            
-        except Exception as e:
-            print(f"Erreur évaluation IA: {e}")
-            return False
-
 
 class AnswerViewSet(HashIdMixin, viewsets.GenericViewSet):
     """Actions sur les réponses"""
@@ -242,40 +213,22 @@ class AnswerViewSet(HashIdMixin, viewsets.GenericViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        with transaction.atomic():
-            existing_vote = AnswerVote.objects.filter(
-                answer=answer,
-                user=request.user,
-                is_active=True
-            ).first()
-            
-            if existing_vote:
-                if existing_vote.vote_type == vote_type:
-                    existing_vote.delete(hard=False)
-                    answer.votes -= vote_type
-                else:
-                    answer.votes -= existing_vote.vote_type
-                    existing_vote.vote_type = vote_type
-                    existing_vote.save()
-                    answer.votes += vote_type
-            else:
-                AnswerVote.objects.create(
-                    answer=answer,
-                    user=request.user,
-                    vote_type=vote_type
-                )
-                answer.votes += vote_type
-                
-                if vote_type == 1:
-                    from django.conf import settings
-                    answer.author.add_points(
-                        settings.GAMIFICATION_POINTS.get('ANSWER_UPVOTED', 5),
-                        'answer_upvoted'
-                    )
-            
-            answer.save(update_fields=['votes'])
+        from apps.forum.services import VoteService
+        votes, delta, _ = VoteService.vote('answer', answer.id, request.user.id, vote_type)
+        
+        # Points de l'auteur : gagnés à chaque vote pour, repris à son annulation
+        upvotes = VoteService.upvotes_delta(vote_type, delta)
+        if upvotes:
+            from django.conf import settings
+            from apps.gamification.services import PointsLedger
+            PointsLedger.award(
+                answer.author_id,
+                upvotes * settings.GAMIFICATION_POINTS.get('ANSWER_UPVOTED', 5),
+                'answer_upvoted' if upvotes > 0 else 'answer_upvote_removed',
+                related=answer
+            )
         
-        return Response({'votes': answer.votes})
+        return Response({'votes': votes})
     
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def accept(self, request, pk=None):
@@ -311,9 +264,12 @@ class AnswerViewSet(HashIdMixin, viewsets.GenericViewSet):
             question.save()
             
             # Attribution de points à l'auteur de la réponse
-            answer.author.add_points(
+            from apps.gamification.services import PointsLedger
+            PointsLedger.award(
+                answer.author_id,
                 settings.GAMIFICATION_POINTS['ANSWER_ACCEPTED'],
-                'answer_accepted'
+                'answer_accepted',
+                related=answer
             )
         
         return Response({'message': 'Réponse acceptée'})
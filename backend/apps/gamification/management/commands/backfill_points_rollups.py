@@ -0,0 +1,65 @@
+"""
+Commande pour reconstruire les cumuls de points par période depuis l'historique
+"""
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Max
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from apps.gamification.models import UserPointsHistory, UserPointsRollup
+from apps.gamification.services import PointsRollupService
+
+
+class Command(BaseCommand):
+    help = 'Reconstruit user_points_rollups à partir de user_points_history, par lots'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+
+        # Une seule transaction : les lecteurs voient les anciens cumuls jusqu'au
+        # commit, et les gains appliqués pendant la reconstruction attendent le
+        # verrou puis s'ajoutent aux cumuls reconstruits (ils ne sont pas dans
+        # l'historique lu, leur transaction n'étant pas validée).
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                table = connection.ops.quote_name(UserPointsRollup._meta.db_table)
+                with connection.cursor() as cursor:
+                    cursor.execute(f'LOCK TABLE {table} IN EXCLUSIVE MODE')
+            # SQLite : la suppression prend le verrou d'écriture de la base
+            deleted, _ = UserPointsRollup.objects.all().delete()
+            last_id = UserPointsHistory.objects.aggregate(Max('id'))['id__max'] or 0
+            self.stdout.write(f'{deleted} cumuls supprimés, historique jusqu\'à #{last_id}')
+
+            cursor_id = 0
+            processed = 0
+            while cursor_id < last_id:
+                # Même date que le registre des points : celle du gain, pas de son application
+                rows = list(
+                    UserPointsHistory.objects.filter(id__gt=cursor_id, id__lte=last_id)
+                    .order_by('id')
+                    .values_list('id', 'user_id', 'points_change', Coalesce('occurred_at', 'created_at'))[:chunk_size]
+                )
+                if not rows:
+                    break
+
+                increments = defaultdict(int)
+                for _, user_id, points, occurred_at in rows:
+                    for period_type, period_start in PointsRollupService.periods(timezone.localdate(occurred_at)):
+                        increments[(user_id, period_type, period_start)] += points
+
+                # Lots d'au plus 500 lignes par INSERT (limite de paramètres SQLite)
+                items = list(increments.items())
+                for i in range(0, len(items), 500):
+                    PointsRollupService.add(dict(items[i:i + 500]))
+
+                cursor_id = rows[-1][0]
+                processed += len(rows)
+                self.stdout.write(f'  {processed} lignes traitées (#{cursor_id})')
+
+        self.stdout.write(self.style.SUCCESS(f'✓ Cumuls reconstruits depuis {processed} lignes d\'historique'))
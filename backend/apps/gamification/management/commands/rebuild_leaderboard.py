@@ -0,0 +1,17 @@
+"""
+Commande pour reconstruire le classement Redis depuis users.points
+"""
+from django.core.management.base import BaseCommand
+from apps.gamification.services import LeaderboardService
+
+
+class Command(BaseCommand):
+    help = 'Reconstruit le classement (sorted set Redis) à partir des points des utilisateurs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        self.stdout.write('Reconstruction du classement...')
+        count = LeaderboardService.rebuild(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'✓ Classement reconstruit : {count} utilisateurs'))
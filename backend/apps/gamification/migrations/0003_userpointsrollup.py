@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:08
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('gamification', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserPointsRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_type', models.CharField(choices=[('WEEK', 'Semaine'), ('MONTH', 'Mois')], max_length=10)),
+                ('period_start', models.DateField()),
+                ('points_gained', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='points_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Cumul Points',
+                'verbose_name_plural': 'Cumuls Points',
+                'db_table': 'user_points_rollups',
+                'indexes': [models.Index(fields=['period_type', 'period_start', '-points_gained'], name='idx_rollup_top')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='userpointsrollup',
+            constraint=models.UniqueConstraint(fields=('user', 'period_type', 'period_start'), name='unique_user_points_rollup'),
+        ),
+    ]
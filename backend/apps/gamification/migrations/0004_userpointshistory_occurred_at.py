@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 14:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamification', '0003_userpointsrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userpointshistory',
+            name='occurred_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
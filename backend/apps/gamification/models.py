@@ -95,6 +95,8 @@ class UserPointsHistory(TimestampMixin):
     reason = models.CharField(max_length=255, db_index=True)
     related_content_type = models.CharField(max_length=50, null=True, blank=True)
     related_object_id = models.IntegerField(null=True, blank=True)
+    # Date du gain (created_at est celle de son application, plus tardive si mis en file)
+    occurred_at = models.DateTimeField(null=True, blank=True)
     
     class Meta:
         db_table = 'user_points_history'
@@ -105,3 +107,30 @@ class UserPointsHistory(TimestampMixin):
             models.Index(fields=['reason']),
         ]
         ordering = ['-created_at']
+
+class UserPointsRollup(models.Model):
+    """Points gagnés par utilisateur et par période (classements hebdo / mensuels)"""
+    PERIOD_CHOICES = [
+        ('WEEK', 'Semaine'),
+        ('MONTH', 'Mois'),
+    ]
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='points_rollups')
+    period_type = models.CharField(max_length=10, choices=PERIOD_CHOICES)
+    period_start = models.DateField()
+    points_gained = models.IntegerField(default=0)
+    
+    class Meta:
+        db_table = 'user_points_rollups'
+        verbose_name = 'Cumul Points'
+        verbose_name_plural = 'Cumuls Points'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'period_type', 'period_start'],
+                name='unique_user_points_rollup'
+            ),
+        ]
+        indexes = [
+            # Top N d'une période
+            models.Index(fields=['period_type', 'period_start', '-points_gained'], name='idx_rollup_top'),
+        ]
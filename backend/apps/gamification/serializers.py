@@ -49,12 +49,28 @@ class LeaderboardUserSerializer(serializers.ModelSerializer):
         fields = ['id', 'email', 'profile', 'points', 'rank', 'badges_count']
     
     def get_profile(self, obj):
-        from apps.users.serializers import UserProfileDetailSerializer
-        profile = obj.profiles.filter(is_current=True).first()
+        from apps.users.serializers import UserProfileDetailSerializer, first_current
+        profile = first_current(obj, 'current_profiles', 'profiles')
         return UserProfileDetailSerializer(profile).data if profile else None
     
     def get_badges_count(self, obj):
+        if hasattr(obj, 'active_badges_count'):
+            return obj.active_badges_count
         return obj.user_badges.filter(is_active=True).count()
+    
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Nombre de badges annoté et cartes de profil préchargées : requêtes constantes par page"""
+        from django.db.models import Count, OuterRef, Subquery
+        from django.db.models.functions import Coalesce
+        from apps.users.serializers import user_prefetch_lookups
+        
+        badges = UserBadge.objects.filter(
+            user=OuterRef('pk'), is_active=True
+        ).order_by().values('user').annotate(total=Count('id')).values('total')
+        return queryset.annotate(
+            active_badges_count=Coalesce(Subquery(badges), 0)
+        ).prefetch_related(*user_prefetch_lookups(applications=False))
 
 class UserPointsHistorySerializer(serializers.ModelSerializer):
     class Meta:
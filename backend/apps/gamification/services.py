@@ -1,35 +1,532 @@
 # ============================================
 # apps/gamification/services.py
 # ============================================
+import datetime
+import json
+import logging
+from collections import defaultdict
+
 from django.conf import settings
-from apps.gamification.models import Badge, UserBadge, BadgeCriteria
+from django.db import connection, transaction
+from django.utils import timezone
+from apps.gamification.models import (
+    Badge, UserBadge, BadgeCriteria, UserPointsHistory, UserPointsRollup
+)
+from apps.users.models import User
+
+logger = logging.getLogger(__name__)
+
+
+class PointsLedger:
+    """
+    Registre des points.
+
+    Chaque gain est appliqué par un UPDATE atomique (points = points + n)
+    sans réécrire la ligne utilisateur ni déclencher post_save sur User ;
+    l'historique est écrit en lot. En mode asynchrone, les gains sont mis en
+    file Redis et appliqués par utilisateur par la tâche apply_points_events.
+    """
+
+    QUEUE_KEY = 'gamification:points_events'
+    # Lot en cours : déplacé par LMOVE, supprimé une fois appliqué et validé
+    PROCESSING_KEY = 'gamification:points_events:processing'
+    LOCK_KEY = 'gamification:points_events:lock'
+    LOCK_TIMEOUT = 300
+    BATCH_SIZE = 1000
+
+    @staticmethod
+    def award(user, points, reason, related=None, defer=None):
+        """
+        Attribue des points à un utilisateur (instance ou id).
+        Retourne le nouveau total, ou None si le gain a été mis en file.
+        """
+        user_id = getattr(user, 'pk', user)
+        event = {
+            'user_id': user_id,
+            'points': points,
+            'reason': reason,
+            'related_content_type': related._meta.model_name if related is not None else None,
+            'related_object_id': related.pk if related is not None else None,
+            # Les cumuls par période suivent la date du gain, pas celle de son application
+            'occurred_at': timezone.now().isoformat(),
+        }
+
+        if defer is None:
+            defer = getattr(settings, 'POINTS_LEDGER_ASYNC', False)
+        if defer and PointsLedger._enqueue(event):
+            return None
+
+        new_total = PointsLedger.apply(user_id, [event])
+        if new_total is not None and hasattr(user, 'points'):
+            user.points = new_total
+        return new_total
+
+    @staticmethod
+    def apply(user_id, events):
+        """Applique les gains d'un utilisateur en une seule mise à jour"""
+        total = sum(event['points'] for event in events)
+        table = connection.ops.quote_name(User._meta.db_table)
+
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'UPDATE {table} SET points = points + %s WHERE id = %s RETURNING points',
+                    [total, user_id]
+                )
+                row = cursor.fetchone()
+            if row is None:
+                logger.warning(f"Points ignorés : utilisateur {user_id} introuvable")
+                return None
+
+            new_total = row[0]
+            running = new_total - total
+            history = []
+            increments = defaultdict(int)
+            for event in events:
+                occurred_at = PointsLedger.event_time(event)
+                history.append(UserPointsHistory(
+                    user_id=user_id,
+                    points_change=event['points'],
+                    previous_total=running,
+                    new_total=running + event['points'],
+                    reason=event['reason'],
+                    related_content_type=event.get('related_content_type'),
+                    related_object_id=event.get('related_object_id'),
+                    occurred_at=occurred_at,
+                ))
+                running += event['points']
+                for period in PointsRollupService.periods(timezone.localdate(occurred_at)):
+                    increments[(user_id, *period)] += event['points']
+            UserPointsHistory.objects.bulk_create(history)
+            PointsRollupService.add(increments)
+            transaction.on_commit(lambda: LeaderboardService.update(user_id, total))
+
+        return new_total
+
+    @staticmethod
+    def event_time(event):
+        """Horodatage du gain (instant d'application pour un événement mis en file sans horodatage)"""
+        from django.utils.dateparse import parse_datetime
+
+        occurred_at = event.get('occurred_at')
+        return parse_datetime(occurred_at) if occurred_at else timezone.now()
+
+    @staticmethod
+    def _enqueue(event):
+        from apps.core.redis_client import get_redis_client
+        try:
+            get_redis_client().rpush(PointsLedger.QUEUE_KEY, json.dumps(event))
+            return True
+        except Exception as e:
+            logger.warning(f"File des points indisponible, application immédiate : {e}")
+            return False
+
+    @staticmethod
+    def drain(batch_size=None):
+        """
+        Applique les gains en file, regroupés par utilisateur.
+        Retourne le nombre d'événements appliqués.
+
+        Chaque lot passe de la file à la liste de traitement (LMOVE) et n'en
+        est supprimé qu'après validation de la transaction : un lot laissé
+        par un drain interrompu est rejoué au passage suivant.
+        """
+        from apps.core.redis_client import get_redis_client
+
+        client = get_redis_client()
+        batch_size = batch_size or PointsLedger.BATCH_SIZE
+        applied = 0
+
+        # Un seul drain à la fois : la liste de traitement lui appartient
+        if not client.set(PointsLedger.LOCK_KEY, 1, nx=True, ex=PointsLedger.LOCK_TIMEOUT):
+            return 0
+
+        try:
+            raw_events = client.lrange(PointsLedger.PROCESSING_KEY, 0, -1)
+            # Borné à la taille initiale : les lots remis en file attendent le passage suivant
+            remaining = client.llen(PointsLedger.QUEUE_KEY)
+            while raw_events or remaining > 0:
+                if not raw_events:
+                    pipe = client.pipeline()
+                    for _ in range(min(batch_size, remaining)):
+                        pipe.lmove(PointsLedger.QUEUE_KEY, PointsLedger.PROCESSING_KEY, 'LEFT', 'RIGHT')
+                    raw_events = [raw for raw in pipe.execute() if raw is not None]
+                    if not raw_events:
+                        break
+                    remaining -= len(raw_events)
+
+                applied += PointsLedger._apply_batch(client, raw_events)
+                raw_events = None
+        finally:
+            client.delete(PointsLedger.LOCK_KEY)
+
+        return applied
+
+    @staticmethod
+    def _apply_batch(client, raw_events):
+        """Applique un lot de la liste de traitement, puis l'en retire (échecs remis en file)"""
+        by_user = defaultdict(list)
+        for raw in raw_events:
+            event = json.loads(raw)
+            by_user[event['user_id']].append(event)
+
+        applied = 0
+        failed = []
+        with transaction.atomic():
+            for user_id, events in by_user.items():
+                try:
+                    # Point de sauvegarde par utilisateur (transaction de apply)
+                    PointsLedger.apply(user_id, events)
+                    applied += len(events)
+                except Exception as e:
+                    logger.error(f"Échec d'application des points pour {user_id}, remise en file : {e}")
+                    failed.extend(events)
+
+        pipe = client.pipeline()
+        pipe.delete(PointsLedger.PROCESSING_KEY)
+        if failed:
+            pipe.rpush(PointsLedger.QUEUE_KEY, *(json.dumps(event) for event in failed))
+        pipe.execute()
+
+        # Les seuils de points peuvent débloquer des badges
+        for user in User.objects.filter(id__in=list(by_user)):
+            BadgeService.check_and_award_badges(user, event='points_changed')
+
+        return applied
+
+
+class PointsRollupService:
+    """Cumuls de points par période, alimentés par le registre des points"""
+
+    PERIODS = ('WEEK', 'MONTH')
+
+    @staticmethod
+    def period_start(period_type, day):
+        if period_type == 'WEEK':
+            return day - datetime.timedelta(days=day.weekday())
+        return day.replace(day=1)
+
+    @classmethod
+    def periods(cls, day):
+        """[(période, début)] contenant le jour donné"""
+        return [(period_type, cls.period_start(period_type, day)) for period_type in cls.PERIODS]
+
+    @staticmethod
+    def add(increments):
+        """
+        Ajoute {(user_id, période, début): points} aux cumuls, en une requête
+        (INSERT ... ON CONFLICT DO UPDATE : pas de lecture préalable).
+        """
+        if not increments:
+            return
+        table = connection.ops.quote_name(UserPointsRollup._meta.db_table)
+        rows = [
+            (user_id, period_type, period_start, points)
+            for (user_id, period_type, period_start), points in increments.items()
+        ]
+        placeholders = ', '.join(['(%s, %s, %s, %s)'] * len(rows))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} (user_id, period_type, period_start, points_gained) '
+                f'VALUES {placeholders} '
+                f'ON CONFLICT (user_id, period_type, period_start) '
+                f'DO UPDATE SET points_gained = {table}.points_gained + EXCLUDED.points_gained',
+                [value for row in rows for value in row]
+            )
+
+    @staticmethod
+    def top(period_type, period_start, offset, limit):
+        """(total, [(user_id, points, rang), ...]) d'une période, via l'index idx_rollup_top"""
+        rollups = UserPointsRollup.objects.filter(
+            period_type=period_type,
+            period_start=period_start,
+            points_gained__gt=0,
+            user__is_active=True
+        )
+        page = rollups.order_by('-points_gained', 'user_id').values_list(
+            'user_id', 'points_gained'
+        )[offset:offset + limit]
+        return rollups.count(), [
+            (user_id, points, offset + i + 1) for i, (user_id, points) in enumerate(page)
+        ]
+
+
+class LeaderboardService:
+    """
+    Classement global dans un sorted set Redis (score = points).
+
+    Rang, page et voisins sont en O(log n). Tant que le classement n'a pas
+    été construit (commande rebuild_leaderboard) ou si Redis est indisponible,
+    les méthodes retournent None et l'appelant se replie sur la base.
+    """
+
+    KEY = 'gamification:leaderboard'
+    READY_KEY = 'gamification:leaderboard:ready'
+
+    @classmethod
+    def _client(cls):
+        """Client Redis si le classement est exploitable, sinon None"""
+        from apps.core.redis_client import get_redis_client
+        try:
+            client = get_redis_client()
+            return client if client.exists(cls.READY_KEY) else None
+        except Exception as e:
+            logger.warning(f"Classement Redis indisponible : {e}")
+            return None
+
+    @classmethod
+    def update(cls, user_id, delta):
+        """
+        Applique un gain ou un retrait de points au score d'un utilisateur
+        (appelé après chaque application). ZINCRBY est commutatif : des mises
+        à jour concurrentes donnent le bon total quel que soit leur ordre ;
+        une mise à jour perdue (Redis indisponible) est réparée par rebuild().
+        """
+        if not delta:
+            return
+        client = cls._client()
+        if client is None:
+            return
+        try:
+            if float(client.zincrby(cls.KEY, delta, str(user_id))) <= 0:
+                client.zrem(cls.KEY, str(user_id))
+        except Exception as e:
+            logger.warning(f"Mise à jour du classement impossible pour {user_id} : {e}")
+
+    @classmethod
+    def remove(cls, user_id):
+        client = cls._client()
+        if client is not None:
+            try:
+                client.zrem(cls.KEY, str(user_id))
+            except Exception as e:
+                logger.warning(f"Retrait du classement impossible pour {user_id} : {e}")
+
+    @classmethod
+    def page(cls, offset, limit):
+        """(total, [(user_id, points, rang), ...]) ou None"""
+        client = cls._client()
+        if client is None:
+            return None
+        try:
+            pipe = client.pipeline(transaction=False)
+            pipe.zcard(cls.KEY)
+            pipe.zrevrange(cls.KEY, offset, offset + limit - 1, withscores=True)
+            total, entries = pipe.execute()
+        except Exception as e:
+            logger.warning(f"Lecture du classement impossible : {e}")
+            return None
+        return total, [
+            (int(member), int(score), offset + i + 1)
+            for i, (member, score) in enumerate(entries)
+        ]
+
+    @classmethod
+    def rank(cls, points):
+        """Rang pour un total de points : 1 + nombre de scores strictement supérieurs"""
+        client = cls._client()
+        if client is None:
+            return None
+        try:
+            return client.zcount(cls.KEY, f'({points}', '+inf') + 1
+        except Exception as e:
+            logger.warning(f"Lecture du rang impossible : {e}")
+            return None
+
+    @classmethod
+    def around(cls, user_id, radius):
+        """
+        (total, entrées) des voisins de l'utilisateur, ou None. Un utilisateur
+        absent du classement (aucun point) est placé après le dernier : ses
+        voisins sont les radius derniers, comme dans le repli base de données.
+        """
+        client = cls._client()
+        if client is None:
+            return None
+        try:
+            position = client.zrevrank(cls.KEY, str(user_id))
+            if position is None:
+                position = client.zcard(cls.KEY)
+        except Exception as e:
+            logger.warning(f"Lecture du classement impossible : {e}")
+            return None
+        offset = max(position - radius, 0)
+        return cls.page(offset, position - offset + radius + 1)
+
+    @classmethod
+    def rebuild(cls, chunk_size=5000):
+        """Reconstruit le classement depuis users.points (échange atomique)"""
+        from apps.core.redis_client import get_redis_client
+
+        client = get_redis_client()
+        tmp_key = f'{cls.KEY}:rebuild'
+        client.delete(tmp_key)
+
+        users = User.objects.filter(is_active=True, points__gt=0).values_list('id', 'points')
+        count = 0
+        batch = {}
+        for user_id, points in users.iterator(chunk_size=chunk_size):
+            batch[str(user_id)] = points
+            if len(batch) >= chunk_size:
+                client.zadd(tmp_key, batch)
+                count += len(batch)
+                batch = {}
+        if batch:
+            client.zadd(tmp_key, batch)
+            count += len(batch)
+
+        pipe = client.pipeline()
+        if count:
+            pipe.rename(tmp_key, cls.KEY)
+        else:
+            pipe.delete(cls.KEY)
+        pipe.set(cls.READY_KEY, 1)
+        pipe.execute()
+        return count
+
+
+class BadgeRuleIndex:
+    """
+    Règles de badges compilées une fois par processus et indexées par événement.
+
+    La version courante est conservée dans le cache Django et incrémentée à
+    chaque modification de Badge / BadgeCriteria (voir signals.py) ; une
+    recompilation périodique couvre les caches non partagés entre processus.
+    """
+
+    VERSION_KEY = 'gamification:badge_rules_version'
+    MAX_AGE = 300  # secondes
+
+    # Compteurs requis par action, et événements qui les font évoluer
+    ACTION_COUNTERS = {
+        'first_question': ('questions', 1),
+        'first_answer': ('answers', 1),
+        'become_mentor': ('mentor', 1),
+    }
+    COUNT_ACTIONS = {
+        'questions_posted': 'questions',
+        'answers_posted': 'answers',
+    }
+    COUNTER_EVENTS = {
+        'questions': 'question_posted',
+        'answers': 'answer_posted',
+        'mentor': 'become_mentor',
+    }
+
+    _rules = None
+    _version = None
+    _compiled_at = 0.0
+
+    @classmethod
+    def compile(cls):
+        """
+        {événement: [(badge_id, [(compteur, seuil), ...]), ...]}
+        Un badge est attribué dès qu'un de ses critères est rempli.
+        """
+        criteria = BadgeCriteria.objects.filter(
+            is_active=True, badge__is_active=True
+        ).values_list('badge_id', 'criteria_type', 'criteria_value')
+
+        by_badge = defaultdict(list)
+        for badge_id, criteria_type, value in criteria:
+            value = value or {}
+            if criteria_type == 'POINTS_THRESHOLD':
+                by_badge[badge_id].append(('points', value.get('points', 0)))
+            elif criteria_type == 'FIRST_ACTION' and value.get('action') in cls.ACTION_COUNTERS:
+                by_badge[badge_id].append(cls.ACTION_COUNTERS[value['action']])
+            elif criteria_type == 'ACTION_COUNT' and value.get('action') in cls.COUNT_ACTIONS:
+                by_badge[badge_id].append((cls.COUNT_ACTIONS[value['action']], value.get('count', 0)))
+
+        index = defaultdict(list)
+        for badge_id, rules in by_badge.items():
+            # Les points évoluent avec chaque action : règle évaluée pour tout événement
+            events = {cls.COUNTER_EVENTS[c] for c, _ in rules if c in cls.COUNTER_EVENTS}
+            if any(c == 'points' for c, _ in rules):
+                events.update(cls.COUNTER_EVENTS.values())
+                events.add('points_changed')
+            for event in events:
+                index[event].append((badge_id, rules))
+            index[None].append((badge_id, rules))
+        return dict(index)
+
+    @classmethod
+    def rules_for(cls, event=None):
+        import time
+        from django.core.cache import cache
+
+        version = cache.get(cls.VERSION_KEY)
+        if (
+            cls._rules is None
+            or version != cls._version
+            or time.monotonic() - cls._compiled_at > cls.MAX_AGE
+        ):
+            cls._rules = cls.compile()
+            cls._version = version
+            cls._compiled_at = time.monotonic()
+        return cls._rules.get(event, [])
+
+    @classmethod
+    def invalidate(cls):
+        from django.core.cache import cache
+
+        try:
+            cache.incr(cls.VERSION_KEY)
+        except ValueError:
+            cache.set(cls.VERSION_KEY, 1, timeout=None)
+        cls._rules = None
+
+
+class UserCounters(dict):
+    """Compteurs d'un utilisateur, calculés à la première lecture puis mémorisés"""
+
+    def __init__(self, user):
+        super().__init__()
+        self.user = user
+
+    def __missing__(self, key):
+        user = self.user
+        if key == 'points':
+            value = user.points
+        elif key == 'questions':
+            value = user.questions.filter(is_active=True).count()
+        elif key == 'answers':
+            value = user.answers.filter(is_active=True).count()
+        elif key == 'mentor':
+            value = int(hasattr(user, 'mentor_profile') and user.mentor_profile.is_active)
+        else:
+            raise KeyError(key)
+        self[key] = value
+        return value
+
 
 class BadgeService:
     """Service pour gérer l'attribution automatique des badges"""
     
     @staticmethod
-    def check_and_award_badges(user):
-        """Vérifier et attribuer les badges gagnés"""
-        awarded_badges = []
+    def check_and_award_badges(user, event=None):
+        """
+        Vérifier et attribuer les badges gagnés.
         
-        # Récupérer tous les badges actifs
-        badges = Badge.objects.filter(is_active=True)
+        event ('question_posted', 'answer_posted', 'become_mentor',
+        'points_changed') limite l'évaluation aux règles concernées ;
+        None évalue toutes les règles.
+        """
+        rules = BadgeRuleIndex.rules_for(event)
+        if not rules:
+            return []
         
-        for badge in badges:
-            # Vérifier si l'utilisateur a déjà ce badge
-            if UserBadge.objects.filter(
-                user=user,
-                badge=badge,
-                is_active=True
-            ).exists():
-                continue
-            
-            # Vérifier les critères
-            if BadgeService._check_badge_criteria(user, badge):
-                user_badge = UserBadge.objects.create(
-                    user=user,
-                    badge=badge
-                )
+        owned = set(
+            UserBadge.objects.filter(user=user, is_active=True).values_list('badge_id', flat=True)
+        )
+        candidates = [(badge_id, criteria) for badge_id, criteria in rules if badge_id not in owned]
+        if not candidates:
+            return []
+        
+        counters = UserCounters(user)
+        awarded_badges = []
+        for badge_id, criteria in candidates:
+            if any(counters[counter] >= threshold for counter, threshold in criteria):
+                user_badge = UserBadge.objects.create(user=user, badge_id=badge_id)
                 awarded_badges.append(user_badge)
                 
                 # Créer notification
@@ -38,45 +535,6 @@ class BadgeService:
         
         return awarded_badges
     
-    @staticmethod
-    def _check_badge_criteria(user, badge):
-        """Vérifier si l'utilisateur remplit les critères du badge"""
-        criteria = badge.criteria.filter(is_active=True)
-        
-        for criterion in criteria:
-            criteria_type = criterion.criteria_type
-            criteria_value = criterion.criteria_value
-            
-            if criteria_type == 'POINTS_THRESHOLD':
-                required_points = criteria_value.get('points', 0)
-                if user.points >= required_points:
-                    return True
-            
-            elif criteria_type == 'FIRST_ACTION':
-                action = criteria_value.get('action')
-                if action == 'first_question':
-                    if user.questions.filter(is_active=True).exists():
-                        return True
-                elif action == 'first_answer':
-                    if user.answers.filter(is_active=True).exists():
-                        return True
-                elif action == 'become_mentor':
-                    if hasattr(user, 'mentor_profile') and user.mentor_profile.is_active:
-                        return True
-            
-            elif criteria_type == 'ACTION_COUNT':
-                action = criteria_value.get('action')
-                count = criteria_value.get('count', 0)
-                
-                if action == 'questions_posted':
-                    if user.questions.filter(is_active=True).count() >= count:
-                        return True
-                elif action == 'answers_posted':
-                    if user.answers.filter(is_active=True).count() >= count:
-                        return True
-        
-        return False
-    
     @staticmethod
     def initialize_default_badges():
         """Créer les badges par défaut"""
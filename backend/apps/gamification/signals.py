@@ -0,0 +1,26 @@
+# ============================================
+# apps/gamification/signals.py
+# ============================================
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from apps.gamification.models import Badge, BadgeCriteria
+from apps.users.models import User
+
+
+@receiver(post_save, sender=Badge)
+@receiver(post_delete, sender=Badge)
+@receiver(post_save, sender=BadgeCriteria)
+@receiver(post_delete, sender=BadgeCriteria)
+def invalidate_badge_rules(sender, instance, **kwargs):
+    """Les règles compilées sont reconstruites à la prochaine vérification"""
+    from apps.gamification.services import BadgeRuleIndex
+    BadgeRuleIndex.invalidate()
+
+
+@receiver(post_save, sender=User)
+def remove_inactive_user_from_leaderboard(sender, instance, created, **kwargs):
+    """Un compte désactivé sort du classement"""
+    if not created and not instance.is_active:
+        from apps.gamification.services import LeaderboardService
+        LeaderboardService.remove(instance.id)
@@ -0,0 +1,16 @@
+# ============================================
+# apps/gamification/tasks.py - Tâches Celery pour la gamification
+# ============================================
+from celery import shared_task
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(name='gamification.apply_points_events')
+def apply_points_events():
+    """Applique par lots les gains de points mis en file (mode POINTS_LEDGER_ASYNC)"""
+    from apps.gamification.services import PointsLedger
+    
+    applied = PointsLedger.drain()
+    return f"{applied} gains de points appliqués"
@@ -1,3 +1,409 @@
+import datetime
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.bookings.models import Booking
+from apps.core.utils import HashIdService
+from apps.forum.models import Answer, Question
+from apps.gamification.models import Badge, BadgeCriteria, UserBadge, UserPointsHistory, UserPointsRollup
+from apps.gamification.services import (
+    BadgeRuleIndex, BadgeService, LeaderboardService, PointsLedger, PointsRollupService
+)
+from apps.mentors.models import MentorProfile
+from apps.users.models import User, UserAvatar, UserCountry
+
+
+class LeaderboardQueryCountTests(TestCase):
+    """Le classement se charge en un nombre de requêtes indépendant de la taille de page"""
+
+    @classmethod
+    def setUpTestData(cls):
+        badges = [Badge.objects.create(code=f'badge-{i}') for i in range(3)]
+        cls.users = []
+        for i in range(12):
+            user = User.objects.create_user(email=f'leader{i}@edulab.test', password='x', points=(i + 1) * 10)
+            profile = user.profiles.get(is_current=True)
+            UserAvatar.objects.create(profile=profile, avatar_url=f'https://edulab.test/{i}.png')
+            UserCountry.objects.create(profile=profile, country='Bénin')
+            for badge in badges[:i % 4]:
+                UserBadge.objects.create(user=user, badge=badge)
+            cls.users.append(user)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.users[0])
+        # Classement Redis non construit : repli base de données
+        patcher = mock.patch.object(LeaderboardService, '_client', return_value=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get(self, url):
+        return self.client.get(url, secure=True, SERVER_NAME='localhost')
+
+    def test_leaderboard_constant_queries(self):
+        # Page, comptage, profils, avatars, pays, universités
+        for limit in (3, 12):
+            with self.assertNumQueries(6):
+                response = self.get(f'/api/gamification/leaderboard/?limit={limit}')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data['results']), limit)
+
+        first = response.data['results'][0]
+        self.assertEqual(first['email'], 'leader11@edulab.test')
+        self.assertEqual(first['rank'], 1)
+        self.assertEqual(first['badges_count'], 3)
+        self.assertEqual(first['profile']['avatar'], 'https://edulab.test/11.png')
+        self.assertEqual(first['profile']['country'], 'Bénin')
+
+    def test_period_leaderboard_constant_queries(self):
+        for i, user in enumerate(self.users):
+            PointsLedger.award(user, i + 1, 'test')
+
+        # Cumuls, comptage, utilisateurs, profils, avatars, pays, universités
+        for limit in (3, 12):
+            with self.assertNumQueries(7):
+                response = self.get(f'/api/gamification/leaderboard/?period=week&limit={limit}')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data['results']), limit)
+
+        self.assertEqual(response.data['results'][0]['period_points'], 12)
+        self.assertEqual(response.data['results'][0]['rank'], 1)
+
+
+    def test_invalid_parameters(self):
+        for url in ('leaderboard/?limit=abc', 'leaderboard/?offset=1.5', 'leaderboard/around_me/?radius=x'):
+            with self.subTest(url=url):
+                response = self.get(f'/api/gamification/{url}')
+                self.assertEqual(response.status_code, 400)
+
+        with mock.patch.object(LeaderboardService, 'page', return_value=(0, [])) as page:
+            self.assertEqual(self.get('/api/gamification/leaderboard/?limit=1000&offset=-3').status_code, 200)
+        page.assert_called_once_with(0, 100)
+
+
+class PointsAwardTests(TestCase):
+    """Chaque action n'est créditée qu'une fois (signaux post_save de apps/core/signals.py)"""
+
+    def setUp(self):
+        self.student = User.objects.create_user(email='student@edulab.test', password='x')
+        self.mentor = User.objects.create_user(email='mentor@edulab.test', password='x', role='MENTOR')
+        self.client = APIClient()
+
+    def request(self, method, user, url, data):
+        self.client.force_authenticate(user)
+        return getattr(self.client, method)(url, data, format='json', secure=True, SERVER_NAME='localhost')
+
+    def reasons(self, user):
+        return list(UserPointsHistory.objects.filter(user=user).values_list('reason', flat=True))
+
+    def test_question_and_answer_are_awarded_once(self):
+        response = self.request('post', self.student, '/api/forum/questions/', {'title': 'Intégrales', 'content': '?'})
+        self.assertEqual(response.status_code, 201)
+        question = Question.objects.get()
+        response = self.request(
+            'post', self.mentor, f'/api/forum/questions/{HashIdService.encode(question.id)}/answers/', {'content': 'Par parties'}
+        )
+        self.assertEqual(response.status_code, 201)
+
+        points = settings.GAMIFICATION_POINTS
+        self.assertEqual(self.reasons(self.student), ['question_posted'])
+        self.assertEqual(self.reasons(self.mentor), ['answer_posted'])
+        self.student.refresh_from_db()
+        self.mentor.refresh_from_db()
+        self.assertEqual((self.student.points, self.mentor.points), (points['QUESTION_POSTED'], points['ANSWER_POSTED']))
+
+    def test_completed_booking_is_awarded_once(self):
+        MentorProfile.objects.create(user=self.mentor, is_verified=True)
+        booking = Booking.objects.create(
+            student=self.student, mentor=self.mentor,
+            date=datetime.date.today() + datetime.timedelta(days=1), time=datetime.time(10)
+        )
+        response = self.request(
+            'patch', self.mentor, f'/api/bookings/{HashIdService.encode(booking.id)}/update_status/', {'status': 'COMPLETED'}
+        )
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.reasons(self.student), ['booking_completed'])
+        self.student.refresh_from_db()
+        self.assertEqual(self.student.points, settings.GAMIFICATION_POINTS['BOOKING_COMPLETED'])
+        self.assertEqual(MentorProfile.objects.get(user=self.mentor).total_sessions, 1)
+
+        # Réservation terminée réenregistrée : ni points ni session de plus
+        booking.refresh_from_db()
+        booking.save()
+        self.assertEqual(self.reasons(self.student), ['booking_completed'])
+        self.assertEqual(MentorProfile.objects.get(user=self.mentor).total_sessions, 1)
+
+
+class PointsRollupTests(TestCase):
+    """Cumuls par période : datés par le gain, même appliqué plus tard depuis la file"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='late@edulab.test', password='x')
+
+    def rollups(self):
+        return {
+            (period_type, period_start): points
+            for period_type, period_start, points in UserPointsRollup.objects.filter(user=self.user)
+            .values_list('period_type', 'period_start', 'points_gained')
+        }
+
+    def test_queued_event_is_rolled_up_in_its_own_period(self):
+        with mock.patch.object(PointsLedger, '_enqueue', return_value=True) as enqueue:
+            PointsLedger.award(self.user, 5, 'answer_posted', defer=True)
+        event = enqueue.call_args.args[0]
+
+        # Gain de la semaine dernière appliqué aujourd'hui (file en retard), avec un gain du jour
+        occurred = timezone.now() - datetime.timedelta(days=8)
+        event['occurred_at'] = occurred.isoformat()
+        PointsLedger.apply(self.user.id, [event, {'points': 3, 'reason': 'question_posted'}])
+
+        expected = {}
+        for points, day in ((5, timezone.localdate(occurred)), (3, timezone.localdate())):
+            for period in PointsRollupService.periods(day):
+                expected[period] = expected.get(period, 0) + points
+        self.assertEqual(self.rollups(), expected)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.points, 8)
+
+
+    def test_backfill_matches_live_rollups(self):
+        occurred = timezone.now() - datetime.timedelta(days=40)
+        PointsLedger.apply(self.user.id, [
+            {'points': 5, 'reason': 'answer_posted', 'occurred_at': occurred.isoformat()},
+            {'points': 3, 'reason': 'question_posted'},
+        ])
+        PointsLedger.award(self.user, 7, 'test')
+        live = self.rollups()
+        self.assertEqual(len(live), 4)
+
+        call_command('backfill_points_rollups', chunk_size=2, stdout=StringIO())
+        self.assertEqual(self.rollups(), live)
+
+        # Historique antérieur à occurred_at : daté par created_at
+        UserPointsHistory.objects.filter(user=self.user).update(occurred_at=None)
+        call_command('backfill_points_rollups', stdout=StringIO())
+        self.assertEqual(sum(self.rollups().values()), 2 * 15)
+        self.assertEqual(self.rollups()[('WEEK', PointsRollupService.period_start('WEEK', timezone.localdate()))], 15)
+
+
+class LeaderboardUpdateTests(TestCase):
+    """Classement Redis : les retraits de points font reculer le score"""
+
+    def setUp(self):
+        try:
+            import fakeredis
+        except ImportError:
+            self.skipTest('fakeredis non installé')
+        self.redis = fakeredis.FakeRedis(decode_responses=True)
+        self.redis.set(LeaderboardService.READY_KEY, 1)
+        patcher = mock.patch('apps.core.redis_client.get_redis_client', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user(email='ranked@edulab.test', password='x')
+
+    def award(self, points):
+        with self.captureOnCommitCallbacks(execute=True):
+            PointsLedger.award(self.user, points, 'test', defer=False)
+
+    def score(self):
+        return self.redis.zscore(LeaderboardService.KEY, str(self.user.id))
+
+    def test_score_follows_gains_and_deductions(self):
+        self.award(10)
+        self.award(5)
+        self.assertEqual(self.score(), 15)
+
+        self.award(-6)
+        self.assertEqual(self.score(), 9)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.points, 9)
+
+        self.award(-9)
+        self.assertIsNone(self.score())
+
+    def test_concurrent_updates_commute(self):
+        LeaderboardService.rebuild()
+        # Callbacks on_commit de deux gains concurrents exécutés dans le désordre
+        LeaderboardService.update(self.user.id, 3)
+        LeaderboardService.update(self.user.id, 5)
+        self.assertEqual(self.score(), 8)
+
+
+class PointsQueueDrainTests(TestCase):
+    """File des points : un lot n'est retiré de Redis qu'une fois appliqué"""
+
+    def setUp(self):
+        try:
+            import fakeredis
+        except ImportError:
+            self.skipTest('fakeredis non installé')
+        self.redis = fakeredis.FakeRedis(decode_responses=True)
+        patcher = mock.patch('apps.core.redis_client.get_redis_client', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.users = [User.objects.create_user(email=f'queued{i}@edulab.test', password='x') for i in range(2)]
+        for i in range(5):
+            PointsLedger.award(self.users[i % 2], i + 1, 'test', defer=True)
+
+    def points(self):
+        return [User.objects.values_list('points', flat=True).get(pk=user.pk) for user in self.users]
+
+    def test_drain_applies_batches_and_empties_lists(self):
+        self.assertEqual(PointsLedger.drain(batch_size=2), 5)
+
+        self.assertEqual(self.points(), [1 + 3 + 5, 2 + 4])
+        self.assertEqual(self.redis.llen(PointsLedger.QUEUE_KEY), 0)
+        self.assertFalse(self.redis.exists(PointsLedger.PROCESSING_KEY, PointsLedger.LOCK_KEY))
+
+    def test_interrupted_batch_is_replayed(self):
+        # Arrêt brutal du worker pendant l'application du premier lot
+        with mock.patch.object(PointsLedger, 'apply', side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                PointsLedger.drain(batch_size=2)
+        self.assertEqual(self.points(), [0, 0])
+        self.assertEqual(self.redis.llen(PointsLedger.PROCESSING_KEY), 2)
+
+        self.assertEqual(PointsLedger.drain(batch_size=2), 5)
+        self.assertEqual(self.points(), [1 + 3 + 5, 2 + 4])
+        self.assertFalse(self.redis.exists(PointsLedger.PROCESSING_KEY))
+
+    def test_failed_user_is_requeued(self):
+        apply = PointsLedger.apply
+
+        def fail_first_user(user_id, events):
+            if user_id == self.users[0].id:
+                raise ValueError('base indisponible')
+            return apply(user_id, events)
+
+        with mock.patch.object(PointsLedger, 'apply', side_effect=fail_first_user):
+            self.assertEqual(PointsLedger.drain(), 2)
+        self.assertEqual(self.points(), [0, 2 + 4])
+        self.assertEqual(self.redis.llen(PointsLedger.QUEUE_KEY), 3)
+
+        self.assertEqual(PointsLedger.drain(), 3)
+        self.assertEqual(self.points(), [1 + 3 + 5, 2 + 4])
+
+
+class BadgeRuleTests(TestCase):
+    """Règles de badges indexées par événement : mêmes badges que l'évaluation complète"""
+
+    def setUp(self):
+        BadgeService.initialize_default_badges()
+        for code, criteria_type, value in (
+            ('answerer', 'FIRST_ACTION', {'action': 'first_answer'}),
+            ('helper', 'ACTION_COUNT', {'action': 'answers_posted', 'count': 3}),
+            ('mentor', 'FIRST_ACTION', {'action': 'become_mentor'}),
+        ):
+            BadgeCriteria.objects.create(
+                badge=Badge.objects.create(code=code), criteria_type=criteria_type, criteria_value=value
+            )
+        self.users = [User.objects.create_user(email=f'badger{i}@edulab.test', password='x') for i in range(4)]
+
+    def post(self, user, answers=0, questions=0):
+        profile = user.profiles.get(is_current=True)
+        question = Question.objects.create(author=self.users[-1], profile=self.users[-1].profiles.get(is_current=True))
+        for _ in range(questions):
+            Question.objects.create(author=user, profile=profile)
+        for _ in range(answers):
+            Answer.objects.create(question=question, author=user, profile=profile)
+
+    def badges(self):
+        return {
+            user.id: set(UserBadge.objects.filter(user=user).values_list('badge__code', flat=True))
+            for user in self.users
+        }
+
+    def test_event_index_matches_full_scan(self):
+        self.post(self.users[0], questions=1)
+        self.post(self.users[1], answers=3)
+        MentorProfile.objects.create(user=self.users[2], is_verified=True)
+        PointsLedger.award(self.users[3], 600, 'test')
+        BadgeService.check_and_award_badges(self.users[3], event='points_changed')
+        by_event = self.badges()
+
+        UserBadge.objects.all().delete()
+        for user in User.objects.filter(pk__in=[user.pk for user in self.users]):
+            BadgeService.check_and_award_badges(user)
+
+        self.assertEqual(self.badges(), by_event)
+        self.assertEqual(by_event[self.users[1].id], {'answerer', 'helper'})
+        self.assertEqual(by_event[self.users[2].id], {'mentor', 'curious'})
+
+    def test_event_evaluation_queries(self):
+        self.post(self.users[1], answers=2)
+        user = User.objects.get(pk=self.users[1].pk)
+        BadgeRuleIndex.rules_for()
+
+        # Badges possédés, nombre de réponses (les points sont lus sur l'utilisateur)
+        with self.assertNumQueries(2):
+            self.assertEqual(BadgeService.check_and_award_badges(user, event='answer_posted'), [])
+        # Badges possédés, questions, réponses, profil mentor
+        with self.assertNumQueries(4):
+            self.assertEqual(BadgeService.check_and_award_badges(user), [])
+        with self.assertNumQueries(0):
+            self.assertEqual(BadgeService.check_and_award_badges(user, event='unknown'), [])
+
+    def test_rule_changes_are_picked_up(self):
+        self.post(self.users[0], answers=2)
+        user = User.objects.get(pk=self.users[0].pk)
+        self.assertEqual(BadgeService.check_and_award_badges(user, event='answer_posted'), [])
+
+        # Règle modifiée par un autre processus : ici, sans signal, seule la version du cache change
+        BadgeCriteria.objects.filter(badge__code='helper').update(criteria_value={'action': 'answers_posted', 'count': 2})
+        self.assertEqual(BadgeService.check_and_award_badges(user, event='answer_posted'), [])
+        cache.incr(BadgeRuleIndex.VERSION_KEY)
+        awarded = BadgeService.check_and_award_badges(user, event='answer_posted')
+        self.assertEqual([user_badge.badge.code for user_badge in awarded], ['helper'])
+
+        # Nouvelle règle enregistrée : invalidation par signal
+        BadgeCriteria.objects.create(
+            badge=Badge.objects.create(code='talker'), criteria_type='POINTS_THRESHOLD', criteria_value={'points': 30}
+        )
+        awarded = BadgeService.check_and_award_badges(user, event='points_changed')
+        self.assertEqual([user_badge.badge.code for user_badge in awarded], ['talker'])
+
+
+class LeaderboardAroundTests(TestCase):
+    """Voisins dans le classement : mêmes résultats depuis Redis et depuis la base"""
+
+    def setUp(self):
+        try:
+            import fakeredis
+        except ImportError:
+            self.skipTest('fakeredis non installé')
+        self.redis = fakeredis.FakeRedis(decode_responses=True)
+        patcher = mock.patch('apps.core.redis_client.get_redis_client', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.users = [
+            User.objects.create_user(email=f'around{i}@edulab.test', password='x', points=(i + 1) * 10)
+            for i in range(8)
+        ]
+        self.unranked = User.objects.create_user(email='newcomer@edulab.test', password='x')
+        LeaderboardService.rebuild()
+
+    def around(self, user, radius):
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get(
+            f'/api/gamification/leaderboard/around_me/?radius={radius}', secure=True, SERVER_NAME='localhost'
+        )
+        return response.data['count'], [(item['email'], item['rank']) for item in response.data['results']]
+
+    def test_redis_and_database_agree(self):
+        for user, radius in ((self.users[4], 2), (self.users[7], 3), (self.users[0], 1), (self.unranked, 2)):
+            with self.subTest(user=user.email, radius=radius):
+                from_redis = self.around(user, radius)
+                with mock.patch.object(LeaderboardService, '_client', return_value=None):
+                    self.assertEqual(self.around(user, radius), from_redis)
 
-# Create your tests here.
+        # Sans points : après le dernier classé, voisins = les derniers du classement
+        self.assertEqual(self.around(self.unranked, 2), (8, [('around1@edulab.test', 7), ('around0@edulab.test', 8)]))
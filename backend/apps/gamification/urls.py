@@ -14,7 +14,8 @@ urlpatterns = [
 
 """
 Endpoints disponibles:
-- GET /api/gamification/leaderboard/
+- GET /api/gamification/leaderboard/?period=week|month
+- GET /api/gamification/leaderboard/around_me/
 - GET /api/gamification/my_badges/
 - GET /api/gamification/all_badges/
 - GET /api/gamification/points_history/
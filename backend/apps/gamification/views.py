@@ -13,6 +13,7 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.db.models import Window, F
 from django.db.models.functions import RowNumber
+from django.utils import timezone
 
 from apps.gamification.models import Badge, UserBadge, UserPointsHistory
 from apps.gamification.serializers import (
@@ -24,10 +25,78 @@ from apps.users.models import User
 class GamificationViewSet(viewsets.GenericViewSet):
     """Endpoints gamification"""
     permission_classes = [IsAuthenticated]
+    MAX_LIMIT = 100
+    MAX_RADIUS = 50
+    
+    @staticmethod
+    def _int_param(request, name, default, minimum, maximum=None):
+        """Paramètre entier ramené dans [minimum, maximum] ; ValueError s'il n'est pas numérique"""
+        value = max(int(request.query_params.get(name, default)), minimum)
+        return value if maximum is None else min(value, maximum)
+    
+    @staticmethod
+    def _ranked_users(entries):
+        """Utilisateurs dans l'ordre du classement, avec leur rang"""
+        users = LeaderboardUserSerializer.setup_eager_loading(
+            User.objects.all()
+        ).in_bulk([user_id for user_id, _, _ in entries])
+        ranked = []
+        for user_id, _, rank in entries:
+            user = users.get(user_id)
+            if user is not None:
+                user.rank = rank
+                ranked.append(user)
+        return ranked
     
     @action(detail=False, methods=['get'])
     def leaderboard(self, request):
-        """GET /api/gamification/leaderboard/"""
+        """GET /api/gamification/leaderboard/?period=week|month"""
+        # Paramètres de pagination
+        try:
+            limit = self._int_param(request, 'limit', 20, 1, self.MAX_LIMIT)
+            offset = self._int_param(request, 'offset', 0, 0)
+        except ValueError:
+            return Response(
+                {'error': 'limit et offset doivent être des entiers'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Classement hebdomadaire / mensuel depuis les cumuls par période
+        period = request.query_params.get('period')
+        if period:
+            from apps.gamification.services import PointsRollupService
+            period_type = {'week': 'WEEK', 'month': 'MONTH'}.get(period)
+            if period_type is None:
+                return Response(
+                    {'error': 'period doit être week ou month'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            period_start = PointsRollupService.period_start(period_type, timezone.localdate())
+            total, entries = PointsRollupService.top(period_type, period_start, offset, limit)
+            period_points = {user_id: points for user_id, points, _ in entries}
+            users = self._ranked_users(entries)
+            data = LeaderboardUserSerializer(users, many=True).data
+            for item, user in zip(data, users):
+                item['period_points'] = period_points[user.id]
+            return Response({
+                'count': total,
+                'period': period,
+                'period_start': period_start,
+                'results': data
+            })
+        
+        # Classement Redis (O(log n)) si disponible
+        from apps.gamification.services import LeaderboardService
+        cached = LeaderboardService.page(offset, limit)
+        if cached is not None:
+            total, entries = cached
+            serializer = LeaderboardUserSerializer(self._ranked_users(entries), many=True)
+            return Response({
+                'count': total,
+                'results': serializer.data
+            })
+        
+        # Repli base de données
         # Limiter aux utilisateurs actifs avec points
         users = User.objects.filter(
             is_active=True,
@@ -42,12 +111,8 @@ class GamificationViewSet(viewsets.GenericViewSet):
             )
         )
         
-        # Paramètres de pagination
-        limit = int(request.query_params.get('limit', 20))
-        offset = int(request.query_params.get('offset', 0))
-        
         # Appliquer pagination
-        paginated_users = users[offset:offset + limit]
+        paginated_users = LeaderboardUserSerializer.setup_eager_loading(users)[offset:offset + limit]
         
         serializer = LeaderboardUserSerializer(paginated_users, many=True)
         return Response({
@@ -55,6 +120,42 @@ class GamificationViewSet(viewsets.GenericViewSet):
             'results': serializer.data
         })
     
+    @action(detail=False, methods=['get'], url_path='leaderboard/around_me')
+    def around_me(self, request):
+        """GET /api/gamification/leaderboard/around_me/?radius=5 - Voisins de l'utilisateur"""
+        from apps.gamification.services import LeaderboardService
+        
+        try:
+            radius = self._int_param(request, 'radius', 5, 0, self.MAX_RADIUS)
+        except ValueError:
+            return Response(
+                {'error': 'radius doit être un entier'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        cached = LeaderboardService.around(request.user.id, radius)
+        if cached is not None:
+            total, entries = cached
+            users = self._ranked_users(entries)
+        else:
+            # Repli base de données : rang de compétition puis voisins
+            total = User.objects.filter(is_active=True, points__gt=0).count()
+            user = request.user
+            position = User.objects.filter(is_active=True, points__gt=user.points).count()
+            offset = max(position - radius, 0)
+            users = list(
+                LeaderboardUserSerializer.setup_eager_loading(
+                    User.objects.filter(is_active=True, points__gt=0)
+                ).order_by('-points', 'id')[offset:position + radius + 1]
+            )
+            for i, u in enumerate(users):
+                u.rank = offset + i + 1
+        
+        serializer = LeaderboardUserSerializer(users, many=True)
+        return Response({
+            'count': total,
+            'results': serializer.data
+        })
+    
     @action(detail=False, methods=['get'])
     def my_badges(self, request):
         """GET /api/gamification/my_badges/"""
@@ -100,10 +201,13 @@ class GamificationViewSet(viewsets.GenericViewSet):
         user = request.user
         
         # Rang global
-        rank = User.objects.filter(
-            is_active=True,
-            points__gt=user.points
-        ).count() + 1
+        from apps.gamification.services import LeaderboardService
+        rank = LeaderboardService.rank(user.points)
+        if rank is None:
+            rank = User.objects.filter(
+                is_active=True,
+                points__gt=user.points
+            ).count() + 1
         
         # Total utilisateurs
         total_users = User.objects.filter(is_active=True).count()
@@ -18,9 +18,14 @@ class MentorSocialInline(admin.TabularInline):
 
 @admin.register(MentorProfile)
 class MentorProfileAdmin(admin.ModelAdmin):
-    list_display = ('user', 'rating', 'reviews_count', 'is_verified', 'total_sessions', 'is_active')
+    list_display = ('user', 'rating', 'reviews_count', 'ranking_score', 'is_verified', 'total_sessions', 'is_active')
     list_filter = ('is_verified', 'is_active', 'created_at')
     search_fields = ('user__email',)
+    # Tenus à jour par les signaux de MentorReview
+    readonly_fields = (
+        'rating', 'reviews_count', 'rating_sum', 'ranking_score',
+        'rating_count_1', 'rating_count_2', 'rating_count_3', 'rating_count_4', 'rating_count_5'
+    )
     inlines = [MentorBioInline, MentorSpecialtyInline, MentorSocialInline]
 
 @admin.register(MentorAvailability)
@@ -46,7 +51,7 @@ class MentorApplicationAdmin(admin.ModelAdmin):
     list_display = ('user', 'status_badge', 'ai_status_badge', 'ai_validated', 'ai_score', 'university', 'created_at', 'cv_link', 'id_card_link')
     list_filter = ('status', 'ai_status', 'ai_validated', 'created_at')
     search_fields = ('user__email', 'user__first_name', 'user__last_name', 'university')
-    readonly_fields = ('created_at', 'updated_at', 'ai_status', 'ai_recommendation', 'ai_score', 'ai_validated')
+    readonly_fields = ('created_at', 'updated_at', 'ai_status', 'ai_recommendation', 'ai_score', 'ai_validated', 'ai_attempts', 'ai_started_at', 'ai_task_id')
     
     fieldsets = (
         ('Informations Utilisateur', {
@@ -59,7 +64,7 @@ class MentorApplicationAdmin(admin.ModelAdmin):
             'fields': ('linkedin', 'twitter', 'website')
         }),
         ('Analyse IA (Automatique)', {
-            'fields': ('ai_status', 'ai_validated', 'ai_score', 'ai_recommendation'),
+            'fields': ('ai_status', 'ai_validated', 'ai_score', 'ai_recommendation', 'ai_attempts', 'ai_started_at', 'ai_task_id'),
             'description': 'Ces champs sont remplis automatiquement par l\'IA Gemini après la soumission.'
         }),
         ('Décision Admin', {
@@ -83,6 +88,7 @@ class MentorApplicationAdmin(admin.ModelAdmin):
     def ai_status_badge(self, obj):
         colors = {
             'PENDING': '#6b7280',    # gray-500
+            'QUEUED': '#f59e0b',     # amber-500
             'PROCESSING': '#3b82f6', # blue-500
             'COMPLETED': '#10b981',  # emerald-500
             'FAILED': '#ef4444',     # red-500
@@ -121,12 +127,6 @@ class MentorApplicationAdmin(admin.ModelAdmin):
     @admin.action(description='Relancer l\'analyse IA')
     def retry_ai_review(self, request, queryset):
         from .services import MentorAIRewiewService
-        import threading
-        for instance in queryset:
-            thread = threading.Thread(
-                target=MentorAIRewiewService.review_application,
-                args=(instance.id,)
-            )
-            thread.start()
-        self.message_user(request, f"Analyse IA relancée pour {queryset.count()} candidature(s).")
+        count = MentorAIRewiewService.enqueue(queryset.values_list('id', flat=True))
+        self.message_user(request, f"Analyse IA relancée pour {count} candidature(s).")
 
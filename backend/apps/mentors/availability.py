@@ -0,0 +1,336 @@
+# ============================================
+# apps/mentors/availability.py - Disponibilités compilées (bitmaps)
+# ============================================
+import datetime
+import logging
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from apps.mentors.models import (
+    MentorAvailability, MentorSpecificDateAvailability, MentorCompiledAvailability, MentorProfile
+)
+
+logger = logging.getLogger(__name__)
+
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES  # 96
+SESSION_SLOTS = 60 // SLOT_MINUTES  # Une session dure 1h
+WEEKDAYS = ['MONDAY', 'TUESDAY', 'WEDNESDAY', 'THURSDAY', 'FRIDAY', 'SATURDAY', 'SUNDAY']
+
+# Statuts qui ne bloquent pas un créneau
+FREE_BOOKING_STATUSES = ['CANCELLED', 'REJECTED']
+
+
+def _minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def available_range(start_time, end_time):
+    """Créneaux entièrement couverts par une plage de disponibilité"""
+    start = -(-_minutes(start_time) // SLOT_MINUTES)  # arrondi supérieur
+    end = _minutes(end_time) // SLOT_MINUTES
+    return start, end
+
+
+def busy_range(start_time, minutes=60):
+    """Créneaux touchés par une session qui commence à start_time"""
+    start = _minutes(start_time) // SLOT_MINUTES
+    end = -(-(_minutes(start_time) + minutes) // SLOT_MINUTES)
+    return start, min(end, SLOTS_PER_DAY)
+
+
+def slot_label(index):
+    minutes = int(index) * SLOT_MINUTES
+    return f'{minutes // 60:02d}:{minutes % 60:02d}'
+
+
+def _pack(bits):
+    return np.packbits(bits).tobytes()
+
+
+def _unpack(data, shape):
+    bits = np.unpackbits(np.frombuffer(bytes(data), dtype=np.uint8))
+    return bits[:int(np.prod(shape))].reshape(shape).astype(bool)
+
+
+def weekday_indexes(start_date, days):
+    """Jour de la semaine (0 = lundi) de chaque date de la plage, vectorisé"""
+    dates = np.arange(np.datetime64(start_date), np.datetime64(start_date) + days)
+    # Le 1970-01-01 était un jeudi (indice 3)
+    return (dates.astype('int64') + 3) % 7
+
+
+class CompiledAvailability:
+    """Vue décompressée d'une disponibilité compilée"""
+
+    def __init__(self, weekly, date_bitmaps):
+        self.weekly = weekly  # (7, SLOTS_PER_DAY) bool
+        self.date_bitmaps = date_bitmaps  # {date: (SLOTS_PER_DAY,) bool}
+
+    @classmethod
+    def from_model(cls, compiled):
+        weekly = _unpack(compiled.weekly_bitmap, (7, SLOTS_PER_DAY))
+        date_bitmaps = {
+            datetime.date.fromisoformat(day): _unpack(bytes.fromhex(bits), (SLOTS_PER_DAY,))
+            for day, bits in compiled.date_bitmaps.items()
+        }
+        return cls(weekly, date_bitmaps)
+
+    def for_range(self, start_date, days):
+        """
+        Matrice (jours, créneaux) des disponibilités sur la plage. Une date
+        spécifique s'ajoute aux créneaux hebdomadaires de ce jour (union) :
+        elle ouvre des créneaux supplémentaires, elle n'en ferme aucun.
+        """
+        grid = self.weekly[weekday_indexes(start_date, days)]
+        for day, bits in self.date_bitmaps.items():
+            offset = (day - start_date).days
+            if 0 <= offset < days:
+                grid[offset] |= bits
+        return grid
+
+
+class AvailabilityBitmapService:
+    """Compilation et exploitation des disponibilités sous forme de bitmaps"""
+
+    @staticmethod
+    def compile(mentor_profile_id):
+        """
+        Reconstruit le bitmap d'un mentor à partir de ses disponibilités actives :
+        règles hebdomadaires d'un côté, dates spécifiques à venir de l'autre
+        (combinées par union à la lecture, voir CompiledAvailability.for_range).
+        """
+        weekly = np.zeros((7, SLOTS_PER_DAY), dtype=bool)
+        rules = MentorAvailability.objects.filter(
+            mentor_profile_id=mentor_profile_id,
+            is_active=True
+        ).values_list('day_of_week', 'start_time', 'end_time')
+        for day, start_time, end_time in rules:
+            if day in WEEKDAYS:
+                start, end = available_range(start_time, end_time)
+                weekly[WEEKDAYS.index(day), start:end] = True
+
+        date_bitmaps = {}
+        specific = MentorSpecificDateAvailability.objects.filter(
+            mentor_profile_id=mentor_profile_id,
+            is_active=True,
+            specific_date__gte=timezone.localdate()
+        ).values_list('specific_date', 'start_time', 'end_time')
+        for day, start_time, end_time in specific:
+            bits = date_bitmaps.setdefault(day, np.zeros(SLOTS_PER_DAY, dtype=bool))
+            start, end = available_range(start_time, end_time)
+            bits[start:end] = True
+
+        compiled, _ = MentorCompiledAvailability.objects.update_or_create(
+            mentor_profile_id=mentor_profile_id,
+            defaults={
+                'weekly_bitmap': _pack(weekly),
+                'date_bitmaps': {day.isoformat(): _pack(bits).hex() for day, bits in date_bitmaps.items()},
+            }
+        )
+        return compiled
+
+    @staticmethod
+    def invalidate(mentor_profile_id):
+        """
+        Invalide le bitmap dans la transaction courante puis le reconstruit
+        après commit (une seule fois, même après plusieurs modifications).
+        """
+        MentorCompiledAvailability.objects.filter(mentor_profile_id=mentor_profile_id).delete()
+
+        def rebuild():
+            if not MentorCompiledAvailability.objects.filter(mentor_profile_id=mentor_profile_id).exists():
+                AvailabilityBitmapService.compile(mentor_profile_id)
+
+        transaction.on_commit(rebuild)
+
+    @staticmethod
+    def compile_missing(mentor_profile_ids=None):
+        """
+        Compile les bitmaps absents (invalidés puis non reconstruits, ou
+        profils antérieurs à la compilation). Retourne le nombre de mentors compilés.
+        """
+        profiles = MentorProfile.objects.filter(compiled_availability__isnull=True)
+        if mentor_profile_ids is not None:
+            profiles = profiles.filter(pk__in=mentor_profile_ids)
+        compiled = 0
+        for mentor_profile_id in profiles.values_list('pk', flat=True).iterator():
+            AvailabilityBitmapService.compile(mentor_profile_id)
+            compiled += 1
+        return compiled
+
+    @staticmethod
+    def schedule_compile(mentor_profile_ids):
+        """Compilation hors requête (tâche Celery) des bitmaps absents"""
+        from apps.mentors.tasks import compile_availabilities
+        try:
+            compile_availabilities.delay(list(mentor_profile_ids))
+        except Exception as e:
+            # Repris au prochain passage de Celery Beat (compile-missing-availabilities)
+            logger.warning(f"Mise en file de la compilation des disponibilités impossible : {e}")
+
+    @staticmethod
+    def get(mentor_profile):
+        """Disponibilité compilée d'un mentor (compilée à la demande si absente)"""
+        try:
+            compiled = mentor_profile.compiled_availability
+        except MentorCompiledAvailability.DoesNotExist:
+            compiled = AvailabilityBitmapService.compile(mentor_profile.id)
+        return CompiledAvailability.from_model(compiled)
+
+    @staticmethod
+    def busy_grid(mentor_user_id, start_date, days):
+        """Bitmap (jours, créneaux) des réservations qui bloquent le mentor"""
+        from apps.bookings.models import Booking
+
+        busy = np.zeros((days, SLOTS_PER_DAY), dtype=bool)
+        bookings = Booking.objects.filter(
+            mentor_id=mentor_user_id,
+            date__range=[start_date, start_date + datetime.timedelta(days=days - 1)],
+            is_active=True
+        ).exclude(status__in=FREE_BOOKING_STATUSES).values_list('date', 'time')
+        for day, time in bookings:
+            start, end = busy_range(time)
+            busy[(day - start_date).days, start:end] = True
+        return busy
+
+    @staticmethod
+    def free_session_starts(available, busy, now_slot=None):
+        """
+        Débuts de session possibles : créneaux alignés sur une grille d'1h
+        depuis le début de chaque plage disponible, libres pendant toute la session.
+        """
+        positions = np.arange(SLOTS_PER_DAY)
+
+        # Position du début de la plage courante pour chaque créneau
+        previous = np.zeros_like(available)
+        previous[:, 1:] = available[:, :-1]
+        run_starts = np.where(available & ~previous, positions, 0)
+        run_starts = np.maximum.accumulate(run_starts, axis=1)
+        on_grid = available & ((positions - run_starts) % SESSION_SLOTS == 0)
+
+        free = available & ~busy
+        width = SLOTS_PER_DAY - SESSION_SLOTS + 1
+        fits = np.ones((available.shape[0], width), dtype=bool)
+        for k in range(SESSION_SLOTS):
+            fits &= free[:, k:k + width]
+
+        starts = np.zeros_like(available)
+        starts[:, :width] = fits & on_grid[:, :width]
+        if now_slot is not None:
+            # Aujourd'hui : pas de créneau déjà commencé
+            starts[0, :now_slot + 1] = False
+        return starts
+
+    @classmethod
+    def available_slots(cls, mentor_profile, start_date, end_date):
+        """{'YYYY-MM-DD': ['HH:MM', ...]} des créneaux libres sur la plage"""
+        days = (end_date - start_date).days + 1
+        if days <= 0:
+            return {}
+
+        available = cls.get(mentor_profile).for_range(start_date, days)
+        busy = cls.busy_grid(mentor_profile.user_id, start_date, days)
+
+        now = timezone.localtime()
+        now_slot = _minutes(now) // SLOT_MINUTES if start_date == now.date() else None
+        starts = cls.free_session_starts(available, busy, now_slot)
+
+        results = {}
+        day_indexes, slot_indexes = np.nonzero(starts)
+        for day_index, slot_index in zip(day_indexes.tolist(), slot_indexes.tolist()):
+            day = (start_date + datetime.timedelta(days=day_index)).isoformat()
+            results.setdefault(day, []).append(slot_label(slot_index))
+        return results
+
+
+def find_free_mentors(queryset, day, start_time, end_time):
+    """
+    Mentors du queryset ayant une session libre qui commence dans
+    [start_time, end_time - 1h] le jour donné.
+
+    Le filtrage grossier est fait en SQL (index sur day_of_week / specific_date),
+    la vérification exacte sur les bitmaps de tous les candidats à la fois.
+    Un candidat dont le bitmap n'est pas encore compilé est ignoré et sa
+    compilation mise en file : rien n'est compilé pendant la requête.
+    Retourne une liste de (mentor_profile, ['HH:MM', ...]).
+    """
+    from django.db.models import Exists, OuterRef, Q
+    from apps.bookings.models import Booking
+
+    weekday = day.weekday()
+    weekly_rule = MentorAvailability.objects.filter(
+        mentor_profile=OuterRef('pk'),
+        is_active=True,
+        day_of_week=WEEKDAYS[weekday],
+        start_time__lt=end_time,
+        end_time__gt=start_time
+    )
+    specific_rule = MentorSpecificDateAvailability.objects.filter(
+        mentor_profile=OuterRef('pk'),
+        is_active=True,
+        specific_date=day,
+        start_time__lt=end_time,
+        end_time__gt=start_time
+    )
+    candidates = []
+    compiled = []
+    missing = []
+    for mentor in queryset.filter(Q(Exists(weekly_rule)) | Q(Exists(specific_rule))).select_related(
+        'user', 'compiled_availability'
+    ):
+        try:
+            compiled.append(mentor.compiled_availability)
+        except MentorCompiledAvailability.DoesNotExist:
+            missing.append(mentor.id)
+            continue
+        candidates.append(mentor)
+    if missing:
+        AvailabilityBitmapService.schedule_compile(missing)
+    if not candidates:
+        return []
+
+    # Bitmaps hebdomadaires de tous les candidats décompressés en une fois
+    weekly_bytes = np.frombuffer(
+        b''.join(bytes(c.weekly_bitmap) for c in compiled), dtype=np.uint8
+    ).reshape(len(compiled), -1)
+    weekly = np.unpackbits(weekly_bytes, axis=1)[:, :7 * SLOTS_PER_DAY].reshape(-1, 7, SLOTS_PER_DAY)
+    available = weekly[:, weekday].astype(bool)
+
+    day_key = day.isoformat()
+    for row, c in enumerate(compiled):
+        bits = c.date_bitmaps.get(day_key)
+        if bits:
+            available[row] |= _unpack(bytes.fromhex(bits), (SLOTS_PER_DAY,))
+
+    # Réservations bloquantes des candidats ce jour-là (une requête)
+    row_by_user = {mentor.user_id: row for row, mentor in enumerate(candidates)}
+    busy = np.zeros_like(available)
+    bookings = Booking.objects.filter(
+        mentor_id__in=list(row_by_user),
+        date=day,
+        is_active=True
+    ).exclude(status__in=FREE_BOOKING_STATUSES).values_list('mentor_id', 'time')
+    for mentor_id, time in bookings:
+        start, end = busy_range(time)
+        busy[row_by_user[mentor_id], start:end] = True
+
+    now = timezone.localtime()
+    now_slot = _minutes(now) // SLOT_MINUTES if day == now.date() else None
+    starts = AvailabilityBitmapService.free_session_starts(available, busy, now_slot)
+
+    # Fenêtre demandée : la session doit commencer et finir dans [start, end]
+    window = np.zeros(SLOTS_PER_DAY, dtype=bool)
+    first = -(-_minutes(start_time) // SLOT_MINUTES)
+    last = _minutes(end_time) // SLOT_MINUTES - SESSION_SLOTS
+    if last >= first:
+        window[first:last + 1] = True
+    starts &= window
+
+    results = []
+    for row in np.flatnonzero(starts.any(axis=1)).tolist():
+        slots = [slot_label(i) for i in np.flatnonzero(starts[row]).tolist()]
+        results.append((candidates[row], slots))
+    return results
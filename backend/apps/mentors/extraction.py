@@ -0,0 +1,125 @@
+# ============================================
+# apps/mentors/extraction.py - Extraction du texte des CV
+# ============================================
+"""
+Extraction bornée du texte des CV (PDF) pour l'analyse IA des candidatures.
+
+Seuls les MAX_CHARS premiers caractères sont transmis au modèle :
+l'extraction s'arrête dès qu'ils sont atteints (ou après MAX_PAGES pages)
+au lieu de parcourir tout le document. Elle tourne dans un sous-processus
+Python avec un délai par fichier : un PDF piégé ou démesuré est abandonné
+sans bloquer le worker Celery. (Un pool multiprocessing est exclu : les
+workers prefork de Celery sont des processus démons, qui ne peuvent pas
+avoir d'enfants multiprocessing.)
+
+Le résultat est mis en cache (CVTextCache) par empreinte sha256 du
+fichier : une réanalyse ou un même CV déposé deux fois n'est pas relu.
+"""
+import hashlib
+import io
+import json
+import logging
+import subprocess
+import sys
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def extract_text(data, max_chars, max_pages):
+    """
+    Texte des premières pages d'un PDF (octets), arrêté à max_chars caractères
+    ou max_pages pages. Retourne (texte, pages lues, nombre de pages).
+    Exécutée dans le sous-processus d'extraction : pas d'accès à Django ici.
+    """
+    from pypdf import PdfReader
+
+    reader = PdfReader(io.BytesIO(data))
+    page_count = len(reader.pages)
+    parts, length, pages_read = [], 0, 0
+    for index in range(min(page_count, max_pages)):
+        page_text = reader.pages[index].extract_text() or ''
+        parts.append(page_text)
+        length += len(page_text) + 1
+        pages_read += 1
+        if length >= max_chars:
+            break
+    return '\n'.join(parts)[:max_chars], pages_read, page_count
+
+
+class CVTextExtractor:
+    """Extraction du texte d'un CV : cache, puis sous-processus borné dans le temps"""
+
+    @staticmethod
+    def config():
+        return settings.MENTOR_CV_EXTRACTION
+
+    @classmethod
+    def _run(cls, data, max_chars, max_pages):
+        """
+        Extraction dans un sous-processus (ou dans le processus courant si
+        SUBPROCESS est faux). Lève subprocess.TimeoutExpired après TIMEOUT secondes.
+        """
+        config = cls.config()
+        if not config['SUBPROCESS']:
+            return extract_text(data, max_chars, max_pages)
+
+        result = subprocess.run(
+            [sys.executable, '-m', 'apps.mentors.extraction', str(max_chars), str(max_pages)],
+            input=data, capture_output=True, timeout=config['TIMEOUT'], cwd=settings.BASE_DIR
+        )
+        if result.returncode:
+            errors = result.stderr.decode(errors='replace').strip().splitlines()
+            raise RuntimeError(errors[-1] if errors else f'code de sortie {result.returncode}')
+        return tuple(json.loads(result.stdout))
+
+    @classmethod
+    def extract(cls, cv_file):
+        """
+        Texte d'un CV (FieldFile), limité à MAX_CHARS caractères.
+        Retourne '' si le fichier est illisible ou si l'extraction dépasse TIMEOUT.
+        """
+        from apps.mentors.models import CVTextCache
+
+        config = cls.config()
+        max_chars, max_pages = config['MAX_CHARS'], config['MAX_PAGES']
+        try:
+            with cv_file.open('rb') as f:
+                data = f.read()
+        except (OSError, ValueError) as e:
+            logger.error(f"CV illisible ({cv_file.name}): {e}")
+            return ''
+
+        content_hash = hashlib.sha256(data).hexdigest()
+        cached = CVTextCache.objects.filter(content_hash=content_hash).first()
+        # Une extraction complète, ou faite avec des limites au moins aussi larges, suffit
+        if cached and (not cached.truncated or (cached.max_chars >= max_chars and cached.max_pages >= max_pages)):
+            return cached.text[:max_chars]
+
+        try:
+            text, pages_read, page_count = cls._run(data, max_chars, max_pages)
+        except subprocess.TimeoutExpired:
+            logger.error(f"Extraction du CV {cv_file.name} abandonnée après {config['TIMEOUT']}s")
+            return ''
+        except Exception as e:
+            logger.error(f"Erreur lors de l'extraction du PDF {cv_file.name}: {e}")
+            return ''
+
+        CVTextCache.objects.update_or_create(
+            content_hash=content_hash,
+            defaults={
+                'text': text,
+                'max_chars': max_chars,
+                'max_pages': max_pages,
+                'truncated': len(text) >= max_chars or pages_read < page_count,
+                'pages_read': pages_read,
+                'page_count': page_count,
+            }
+        )
+        return text
+
+
+if __name__ == '__main__':
+    # Sous-processus de CVTextExtractor : PDF sur stdin, (texte, pages lues, pages) en JSON sur stdout
+    print(json.dumps(extract_text(sys.stdin.buffer.read(), int(sys.argv[1]), int(sys.argv[2]))))
@@ -0,0 +1,105 @@
+"""
+Benchmark : extraction du texte des CV (intégrale vs bornée + cache)
+"""
+import io
+import time
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+
+from apps.mentors.extraction import CVTextExtractor
+
+
+def build_pdf(pages, lines_per_page, seed):
+    """PDF texte de pages pages (Helvetica), écrit à la main : pas de dépendance de génération"""
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        None,  # arbre des pages, complété après les pages
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+    ]
+    kids = []
+    for page in range(pages):
+        lines = [
+            f'({seed}-{page}-{line} Experience professionnelle en ingenierie logicielle, enseignement et mentorat) Tj T*'
+            for line in range(lines_per_page)
+        ]
+        stream = ('BT /F1 10 Tf 12 TL 40 800 Td ' + ' '.join(lines) + ' ET').encode('latin-1')
+        objects.append(b'<< /Length %d >>\nstream\n' % len(stream) + stream + b'\nendstream')
+        objects.append(
+            b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] '
+            b'/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>' % len(objects)
+        )
+        kids.append(b'%d 0 R' % len(objects))
+    objects[1] = b'<< /Type /Pages /Kids [' + b' '.join(kids) + b'] /Count %d >>' % pages
+
+    out = io.BytesIO()
+    out.write(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b'%d 0 obj\n' % number + body + b'\nendobj\n')
+    xref = out.tell()
+    out.write(b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b'%010d 00000 n \n' % offset)
+    out.write(b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+def extract_all(data):
+    """Extraction historique : toutes les pages concaténées"""
+    from pypdf import PdfReader
+
+    text = ""
+    for page in PdfReader(io.BytesIO(data)).pages:
+        text += page.extract_text() + "\n"
+    return text
+
+
+class Command(BaseCommand):
+    help = 'Compare l\'extraction intégrale des CV à l\'extraction bornée (sous-processus, cache par empreinte)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--files', type=int, default=8)
+        parser.add_argument('--pages', type=int, default=200)
+        parser.add_argument('--lines', type=int, default=60, help='Lignes de texte par page')
+        parser.add_argument('--inline', action='store_true', help='Extraction dans le processus courant')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Génération de {options['files']} PDF de {options['pages']} pages...")
+        pdfs = [build_pdf(options['pages'], options['lines'], seed) for seed in range(options['files'])]
+        size = sum(len(data) for data in pdfs) / len(pdfs) / 1024
+        self.stdout.write(f"taille moyenne {size:.0f} Ko")
+
+        started = time.perf_counter()
+        full = [extract_all(data) for data in pdfs]
+        self.report('intégrale', started, full)
+
+        extraction = dict(settings.MENTOR_CV_EXTRACTION)
+        if options['inline']:
+            extraction['SUBPROCESS'] = False
+
+        with override_settings(MENTOR_CV_EXTRACTION=extraction), transaction.atomic():
+            for label in ('bornée', 'bornée (cache)'):
+                started = time.perf_counter()
+                texts = [CVTextExtractor.extract(ContentFile(data, name=f'cv_{i}.pdf')) for i, data in enumerate(pdfs)]
+                self.report(label, started, texts)
+            # Le cache du benchmark n'est pas conservé
+            transaction.set_rollback(True)
+
+        self.stdout.write(
+            f"limites : {extraction['MAX_CHARS']} caractères, {extraction['MAX_PAGES']} pages, "
+            f"{'sous-processus' if extraction['SUBPROCESS'] else 'en ligne'} ; texte identique au début de l'intégrale : "
+            f"{all(full_text.startswith(text) for full_text, text in zip(full, texts))}"
+        )
+
+    def report(self, label, started, texts):
+        elapsed = time.perf_counter() - started
+        chars = sum(len(text) for text in texts) / len(texts)
+        self.stdout.write(
+            f"{label:<16} {elapsed:7.2f}s ({elapsed / len(texts) * 1000:.0f} ms/fichier), "
+            f"{chars:.0f} caractères/fichier"
+        )
@@ -0,0 +1,31 @@
+"""
+Commande pour remettre en file les analyses IA de candidatures bloquées
+(worker arrêté en pleine analyse, tâche perdue, broker indisponible)
+"""
+from django.core.management.base import BaseCommand
+from apps.mentors.services import MentorAIRewiewService
+
+
+class Command(BaseCommand):
+    help = 'Remet en file les analyses IA restées PROCESSING, QUEUED ou PENDING trop longtemps'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than', type=int, default=None,
+            help='Minutes sans progression (défaut : MENTOR_REVIEW["STUCK_AFTER"])'
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Lister sans remettre en file')
+
+    def handle(self, *args, **options):
+        older_than = options['older_than'] * 60 if options['older_than'] is not None else None
+        stuck = list(MentorAIRewiewService.stuck(older_than).values_list('id', 'ai_status', 'ai_attempts'))
+
+        for application_id, ai_status, attempts in stuck:
+            self.stdout.write(f'  Candidature #{application_id} : {ai_status} ({attempts} essai(s))')
+
+        if options['dry_run']:
+            self.stdout.write(f'{len(stuck)} analyse(s) bloquée(s) (aucune remise en file)')
+            return
+
+        count = MentorAIRewiewService.enqueue(application_id for application_id, _, _ in stuck)
+        self.stdout.write(self.style.SUCCESS(f'✓ {count} analyse(s) remise(s) en file'))
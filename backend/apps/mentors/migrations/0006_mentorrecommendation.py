@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-19 12:56
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('mentors', '0005_mentorapplication_ai_recommendation_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MentorRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('score', models.FloatField()),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('mentor_profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommendations', to='mentors.mentorprofile')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mentor_recommendations', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'mentor_recommendations',
+                'ordering': ['rank'],
+                'indexes': [models.Index(fields=['student', 'rank'], name='mentor_reco_student_fd9b16_idx')],
+                'unique_together': {('student', 'mentor_profile')},
+            },
+        ),
+    ]
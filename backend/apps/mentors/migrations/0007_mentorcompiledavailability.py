@@ -0,0 +1,26 @@
+# Generated by Django 4.2.7 on 2026-10-19 12:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mentors', '0006_mentorrecommendation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MentorCompiledAvailability',
+            fields=[
+                ('mentor_profile', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='compiled_availability', serialize=False, to='mentors.mentorprofile')),
+                ('weekly_bitmap', models.BinaryField()),
+                ('date_bitmaps', models.JSONField(default=dict)),
+                ('compiled_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'mentor_compiled_availabilities',
+            },
+        ),
+    ]
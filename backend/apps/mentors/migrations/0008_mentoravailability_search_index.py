@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mentors', '0007_mentorcompiledavailability'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='mentoravailability',
+            index=models.Index(fields=['day_of_week', 'is_active', 'start_time'], name='mentor_avai_day_of__af886f_idx'),
+        ),
+    ]
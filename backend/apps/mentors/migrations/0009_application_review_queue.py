@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mentors', '0008_mentoravailability_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mentorapplication',
+            name='ai_attempts',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='mentorapplication',
+            name='ai_started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='mentorapplication',
+            name='ai_task_id',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='mentorapplication',
+            name='ai_status',
+            field=models.CharField(choices=[('PENDING', 'En attente'), ('QUEUED', "En file d'analyse"), ('PROCESSING', "En cours d'analyse"), ('COMPLETED', 'Analyse terminée'), ('FAILED', "Échec de l'analyse")], default='PENDING', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='mentorapplication',
+            index=models.Index(fields=['ai_status', 'ai_started_at'], name='mentor_appl_ai_stat_b392c7_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-19 14:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mentors', '0009_application_review_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CVTextCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('content_hash', models.CharField(max_length=64, unique=True)),
+                ('text', models.TextField(blank=True)),
+                ('max_chars', models.IntegerField()),
+                ('max_pages', models.IntegerField()),
+                ('truncated', models.BooleanField(default=False)),
+                ('pages_read', models.IntegerField(default=0)),
+                ('page_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Texte de CV (cache)',
+                'verbose_name_plural': 'Textes de CV (cache)',
+                'db_table': 'mentor_cv_text_cache',
+            },
+        ),
+    ]
@@ -0,0 +1,85 @@
+# Generated by Django 4.2.7 on 2026-10-19 14:07
+
+import apps.mentors.models
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_ratings(apps, schema_editor):
+    """Remplit somme, histogramme et score de classement depuis les avis actifs"""
+    MentorProfile = apps.get_model('mentors', 'MentorProfile')
+    MentorReview = apps.get_model('mentors', 'MentorReview')
+    prior = settings.MENTOR_RANKING
+
+    histograms = {}
+    counts = MentorReview.objects.filter(is_active=True).values('mentor_profile_id', 'rating').annotate(n=Count('id'))
+    for row in counts.iterator():
+        histograms.setdefault(row['mentor_profile_id'], {})[row['rating']] = row['n']
+
+    profiles = list(MentorProfile.objects.only('id'))
+    for profile in profiles:
+        histogram = histograms.get(profile.id, {})
+        for value in range(1, 6):
+            setattr(profile, f'rating_count_{value}', histogram.get(value, 0))
+        profile.reviews_count = sum(histogram.values())
+        profile.rating_sum = sum(value * n for value, n in histogram.items())
+        profile.rating = profile.rating_sum / profile.reviews_count if profile.reviews_count else 0.0
+        profile.ranking_score = (
+            (profile.rating_sum + prior['PRIOR_WEIGHT'] * prior['PRIOR_MEAN'])
+            / (profile.reviews_count + prior['PRIOR_WEIGHT'])
+        )
+    MentorProfile.objects.bulk_update(profiles, [
+        'rating', 'reviews_count', 'rating_sum', 'ranking_score',
+        'rating_count_1', 'rating_count_2', 'rating_count_3', 'rating_count_4', 'rating_count_5'
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mentors', '0010_cv_text_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mentorprofile',
+            name='ranking_score',
+            field=models.FloatField(default=apps.mentors.models.default_ranking_score),
+        ),
+        migrations.AddField(
+            model_name='mentorprofile',
+            name='rating_count_1',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='mentorprofile',
+            name='rating_count_2',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='mentorprofile',
+            name='rating_count_3',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='mentorprofile',
+            name='rating_count_4',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='mentorprofile',
+            name='rating_count_5',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='mentorprofile',
+            name='rating_sum',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_ratings, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='mentorprofile',
+            index=models.Index(fields=['is_verified', 'is_active', '-ranking_score'], name='mentor_ranking_idx'),
+        ),
+    ]
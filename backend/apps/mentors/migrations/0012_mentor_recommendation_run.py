@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-19 14:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mentors', '0011_mentor_rating_histogram'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MentorRecommendationRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('started_at', models.DateTimeField(db_index=True)),
+                ('is_full', models.BooleanField(default=False)),
+                ('mentors_fingerprint', models.CharField(blank=True, max_length=64)),
+                ('students_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'mentor_recommendation_runs',
+                'ordering': ['-started_at'],
+            },
+        ),
+    ]
@@ -5,6 +5,30 @@ from django.db import models
 from apps.core.models import TimestampMixin, SoftDeleteMixin, VersionedFieldMixin
 from apps.users.models import User
 
+def rating_expressions(rating_sum, reviews_count):
+    """
+    Moyenne et score de classement à partir des expressions de somme et de nombre de notes.
+    Score bayésien : la moyenne tirée vers PRIOR_MEAN comme si le mentor avait
+    déjà PRIOR_WEIGHT notes, pour qu'une seule note à 5 ne passe pas devant 200 notes à 4,9.
+    """
+    from django.conf import settings
+    from django.db.models import FloatField, Value
+    from django.db.models.functions import Cast, Coalesce, NullIf
+
+    prior = settings.MENTOR_RANKING
+    total = Cast(rating_sum, FloatField())
+    return {
+        'rating': Coalesce(total / NullIf(reviews_count, 0), Value(0.0)),
+        'ranking_score': (total + prior['PRIOR_WEIGHT'] * prior['PRIOR_MEAN']) / (reviews_count + prior['PRIOR_WEIGHT']),
+    }
+
+
+def default_ranking_score():
+    """Score d'un mentor sans note : la moyenne a priori"""
+    from django.conf import settings
+    return settings.MENTOR_RANKING['PRIOR_MEAN']
+
+
 class MentorProfile(TimestampMixin, SoftDeleteMixin):
     """Profil mentor"""
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='mentor_profile')
@@ -13,24 +37,72 @@ class MentorProfile(TimestampMixin, SoftDeleteMixin):
     is_verified = models.BooleanField(default=False, db_index=True)
     total_sessions = models.IntegerField(default=0)
     
+    # Notes dénormalisées (tenues à jour par les signaux de MentorReview)
+    rating_sum = models.IntegerField(default=0)
+    rating_count_1 = models.IntegerField(default=0)
+    rating_count_2 = models.IntegerField(default=0)
+    rating_count_3 = models.IntegerField(default=0)
+    rating_count_4 = models.IntegerField(default=0)
+    rating_count_5 = models.IntegerField(default=0)
+    ranking_score = models.FloatField(default=default_ranking_score)  # moyenne bayésienne, tri de l'annuaire
+    
     class Meta:
         db_table = 'mentor_profiles'
         verbose_name = 'Profil Mentor'
         verbose_name_plural = 'Profils Mentors'
         indexes = [
             models.Index(fields=['rating', 'is_verified', 'is_active']),
+            models.Index(fields=['is_verified', 'is_active', '-ranking_score'], name='mentor_ranking_idx'),
         ]
     
     def __str__(self):
         return f"Mentor: {self.user.email}"
     
-    def update_rating(self):
-        """Recalculer la moyenne des notes"""
-        reviews = self.reviews.filter(is_active=True)
-        if reviews.exists():
-            self.rating = reviews.aggregate(models.Avg('rating'))['rating__avg']
-            self.reviews_count = reviews.count()
-            self.save()
+    @property
+    def rating_histogram(self):
+        return {str(value): getattr(self, f'rating_count_{value}') for value in range(1, 6)}
+    
+    @classmethod
+    def apply_review(cls, mentor_profile_id, rating, delta):
+        """
+        Ajoute (delta=1) ou retire (delta=-1) une note, en un seul UPDATE :
+        les expressions portent sur les valeurs de la ligne avant mise à jour.
+        """
+        from django.db.models import F
+
+        rating_sum = F('rating_sum') + delta * rating
+        reviews_count = F('reviews_count') + delta
+        return cls.objects.filter(pk=mentor_profile_id).update(
+            rating_sum=rating_sum,
+            reviews_count=reviews_count,
+            **{f'rating_count_{rating}': F(f'rating_count_{rating}') + delta},
+            **rating_expressions(rating_sum, reviews_count)
+        )
+    
+    @classmethod
+    def recompute_ratings(cls, queryset=None):
+        """Recalcule les notes dénormalisées depuis les avis actifs (rattrapage)"""
+        from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Sum, Value
+        from django.db.models.functions import Coalesce
+
+        def aggregate(expression):
+            return Coalesce(Subquery(
+                MentorReview.objects.filter(mentor_profile=OuterRef('pk'), is_active=True)
+                .values('mentor_profile').annotate(value=expression).values('value'),
+                output_field=IntegerField()
+            ), Value(0))
+
+        rating_sum, reviews_count = aggregate(Sum('rating')), aggregate(Count('id'))
+        queryset = cls.objects.all() if queryset is None else queryset
+        return queryset.update(
+            rating_sum=rating_sum,
+            reviews_count=reviews_count,
+            **{
+                f'rating_count_{value}': aggregate(Count('id', filter=Q(rating=value)))
+                for value in range(1, 6)
+            },
+            **rating_expressions(rating_sum, reviews_count)
+        )
 
 class MentorBio(TimestampMixin, VersionedFieldMixin):
     mentor_profile = models.ForeignKey(MentorProfile, on_delete=models.CASCADE, related_name='bios')
@@ -67,6 +139,10 @@ class MentorAvailability(TimestampMixin, SoftDeleteMixin):
     class Meta:
         db_table = 'mentor_availabilities'
         ordering = ['day_of_week', 'start_time']
+        indexes = [
+            # Recherche "qui est libre tel jour à telle heure ?"
+            models.Index(fields=['day_of_week', 'is_active', 'start_time']),
+        ]
 
 class MentorSpecificDateAvailability(TimestampMixin, SoftDeleteMixin):
     """Disponibilités pour des dates spécifiques (ponctuelles)"""
@@ -142,6 +218,7 @@ class MentorApplication(TimestampMixin, SoftDeleteMixin):
     # Champs pour l'analyse IA
     AI_STATUS_CHOICES = [
         ('PENDING', 'En attente'),
+        ('QUEUED', 'En file d\'analyse'),
         ('PROCESSING', 'En cours d\'analyse'),
         ('COMPLETED', 'Analyse terminée'),
         ('FAILED', 'Échec de l\'analyse'),
@@ -150,10 +227,78 @@ class MentorApplication(TimestampMixin, SoftDeleteMixin):
     ai_recommendation = models.TextField(blank=True, verbose_name="Recommandation IA")
     ai_score = models.IntegerField(null=True, blank=True, verbose_name="Score de confiance IA")
     ai_validated = models.BooleanField(default=False, verbose_name="Validé par l'IA")
+    # Suivi de la tâche Celery d'analyse (file mentor_reviews)
+    ai_task_id = models.CharField(max_length=255, blank=True)
+    ai_attempts = models.IntegerField(default=0)
+    ai_started_at = models.DateTimeField(null=True, blank=True)
     
     class Meta:
         db_table = 'mentor_applications'
         ordering = ['-created_at']
+        indexes = [
+            # Relance des analyses bloquées (requeue_stuck_reviews)
+            models.Index(fields=['ai_status', 'ai_started_at']),
+        ]
         
     def __str__(self):
         return f"Application: {self.user.email} ({self.status})"
+
+class CVTextCache(TimestampMixin):
+    """Texte extrait d'un CV (PDF), par empreinte du contenu : réanalyses et doublons ne relisent pas le fichier"""
+    content_hash = models.CharField(max_length=64, unique=True)  # sha256 du fichier
+    text = models.TextField(blank=True)
+    max_chars = models.IntegerField()  # limites appliquées à l'extraction
+    max_pages = models.IntegerField()
+    truncated = models.BooleanField(default=False)  # extraction arrêtée avant la fin du document
+    pages_read = models.IntegerField(default=0)
+    page_count = models.IntegerField(default=0)
+    
+    class Meta:
+        db_table = 'mentor_cv_text_cache'
+        verbose_name = 'Texte de CV (cache)'
+        verbose_name_plural = 'Textes de CV (cache)'
+
+class MentorRecommendation(TimestampMixin):
+    """Top-k des mentors recommandés pour un étudiant (pré-calculé)"""
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='mentor_recommendations')
+    mentor_profile = models.ForeignKey(MentorProfile, on_delete=models.CASCADE, related_name='recommendations')
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+    
+    class Meta:
+        db_table = 'mentor_recommendations'
+        ordering = ['rank']
+        unique_together = ['student', 'mentor_profile']
+        indexes = [
+            models.Index(fields=['student', 'rank']),
+        ]
+    
+    def __str__(self):
+        return f"{self.student.email} -> {self.mentor_profile.user.email} (#{self.rank})"
+
+class MentorRecommendationRun(TimestampMixin):
+    """Passe du moteur de recommandation : point de départ du rafraîchissement incrémental suivant"""
+    started_at = models.DateTimeField(db_index=True)
+    is_full = models.BooleanField(default=False)
+    # Empreinte des spécialités des mentors vérifiés utilisées pour cette passe
+    mentors_fingerprint = models.CharField(max_length=64, blank=True)
+    students_count = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        db_table = 'mentor_recommendation_runs'
+        ordering = ['-started_at']
+    
+    def __str__(self):
+        return f"{'Complet' if self.is_full else 'Incrémental'} {self.started_at:%Y-%m-%d %H:%M} ({self.students_count})"
+
+class MentorCompiledAvailability(models.Model):
+    """Disponibilités compilées : bitmap de créneaux de 15 min sur la semaine"""
+    mentor_profile = models.OneToOneField(
+        MentorProfile, on_delete=models.CASCADE, primary_key=True, related_name='compiled_availability'
+    )
+    weekly_bitmap = models.BinaryField()  # 7 jours x 96 créneaux, bits compactés
+    date_bitmaps = models.JSONField(default=dict)  # {'YYYY-MM-DD': bitmap hex} pour les dates spécifiques
+    compiled_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'mentor_compiled_availabilities'
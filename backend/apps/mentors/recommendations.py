@@ -0,0 +1,327 @@
+# ============================================
+# apps/mentors/recommendations.py - Moteur de recommandation de mentors
+# ============================================
+import datetime
+import hashlib
+import logging
+import re
+import unicodedata
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from apps.mentors.models import MentorSpecialty, MentorRecommendation, MentorRecommendationRun
+
+logger = logging.getLogger(__name__)
+
+# Poids de chaque signal d'intérêt d'un étudiant
+SIGNAL_WEIGHTS = {
+    'question_tag': 1.0,
+    'mentor_search': 2.0,
+    'booking_domain': 3.0,
+}
+
+# Poids du préfixe (4 lettres) d'un terme : "math" rejoint "mathematiques"
+PREFIX_LENGTH = 4
+PREFIX_WEIGHT = 0.5
+
+STOP_WORDS = {
+    'les', 'des', 'une', 'pour', 'avec', 'dans', 'sur', 'par', 'aux',
+    'est', 'qui', 'que', 'the', 'and', 'for', 'mentor', 'mentors',
+}
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+# Historique des passes conservé (audit)
+RUN_HISTORY_DAYS = 7
+
+
+def tokenize(text):
+    """Normalise un texte libre en termes (minuscules, sans accents)"""
+    if not text:
+        return []
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return [t for t in TOKEN_RE.findall(text) if len(t) >= 2 and t not in STOP_WORDS]
+
+
+def extract_terms(text):
+    """Termes pondérés d'un texte : le mot complet et son préfixe"""
+    terms = []
+    for token in tokenize(text):
+        terms.append((token, 1.0))
+        if len(token) >= PREFIX_LENGTH:
+            terms.append((f'{token[:PREFIX_LENGTH]}*', PREFIX_WEIGHT))
+    return terms
+
+
+def _l2_normalize(matrix):
+    """Normalisation L2 des lignes (en place) pour un score cosinus"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix /= norms
+    return matrix
+
+
+class MentorMatrix:
+    """Spécialités des mentors vérifiés, vectorisées en TF-IDF"""
+
+    def __init__(self, profile_ids, user_ids, vocab, matrix, idf, fingerprint=''):
+        self.profile_ids = profile_ids
+        self.vocab = vocab
+        self.matrix = matrix
+        self.idf = idf
+        # Empreinte des lignes (mentor, spécialité) : change avec une spécialité ou une vérification
+        self.fingerprint = fingerprint
+        # user_id -> colonne, pour ne jamais recommander un mentor à lui-même
+        self.column_by_user = {user_id: col for col, user_id in enumerate(user_ids)}
+
+    @property
+    def size(self):
+        return len(self.profile_ids)
+
+
+class MentorRecommendationEngine:
+    """
+    Calcule le top-k des mentors pour chaque étudiant.
+
+    Les signaux d'intérêt (tags des questions, recherches de mentors,
+    domaines des réservations) sont collectés sous forme de triplets
+    creux (étudiant, terme, poids), puis densifiés par blocs d'étudiants
+    et multipliés par la matrice TF-IDF des spécialités des mentors.
+    """
+
+    def __init__(self, top_k=None, chunk_size=2000):
+        self.top_k = top_k or getattr(settings, 'MENTOR_RECOMMENDATIONS_TOP_K', 10)
+        self.chunk_size = chunk_size
+
+    # ------------------------------------------------------------
+    # Construction des vecteurs
+    # ------------------------------------------------------------
+    def build_mentor_matrix(self):
+        rows = MentorSpecialty.objects.filter(
+            is_active=True,
+            mentor_profile__is_active=True,
+            mentor_profile__is_verified=True
+        ).values_list('mentor_profile_id', 'mentor_profile__user_id', 'specialty').order_by('mentor_profile_id', 'specialty')
+
+        digest = hashlib.sha256()
+        profile_index = {}
+        profile_ids, user_ids = [], []
+        vocab = {}
+        r, c, w = [], [], []
+
+        for profile_id, user_id, specialty in rows.iterator(chunk_size=5000):
+            digest.update(f'{profile_id}:{specialty}\n'.encode())
+            row = profile_index.get(profile_id)
+            if row is None:
+                row = profile_index[profile_id] = len(profile_ids)
+                profile_ids.append(profile_id)
+                user_ids.append(user_id)
+            for term, weight in extract_terms(specialty):
+                r.append(row)
+                c.append(vocab.setdefault(term, len(vocab)))
+                w.append(weight)
+
+        if not profile_ids or not vocab:
+            return None
+
+        matrix = np.zeros((len(profile_ids), len(vocab)), dtype=np.float32)
+        np.add.at(matrix, (np.asarray(r), np.asarray(c)), np.asarray(w, dtype=np.float32))
+
+        # IDF : les spécialités rares discriminent davantage
+        df = np.count_nonzero(matrix, axis=0)
+        idf = (np.log((1 + len(profile_ids)) / (1 + df)) + 1).astype(np.float32)
+        matrix *= idf
+        _l2_normalize(matrix)
+
+        return MentorMatrix(profile_ids, user_ids, vocab, matrix, idf, digest.hexdigest())
+
+    def _student_signals(self, student_ids=None):
+        """Itère sur (student_id, texte, poids) pour chaque signal d'intérêt"""
+        from apps.forum.models import QuestionTag
+        from apps.analytics.models import SearchLog
+        from apps.bookings.models import BookingDomain
+
+        sources = [
+            (
+                QuestionTag.objects.filter(
+                    is_active=True,
+                    question__is_active=True,
+                    question__author__role='STUDENT'
+                ),
+                'question__author_id', 'tag', SIGNAL_WEIGHTS['question_tag']
+            ),
+            (
+                SearchLog.objects.filter(category='MENTORS', user__role='STUDENT'),
+                'user_id', 'search_query', SIGNAL_WEIGHTS['mentor_search']
+            ),
+            (
+                BookingDomain.objects.filter(
+                    booking__is_active=True,
+                    booking__student__role='STUDENT'
+                ),
+                'booking__student_id', 'domain', SIGNAL_WEIGHTS['booking_domain']
+            ),
+        ]
+
+        for queryset, student_field, text_field, weight in sources:
+            if student_ids is not None:
+                queryset = queryset.filter(**{f'{student_field}__in': student_ids})
+            for student_id, text in queryset.values_list(student_field, text_field).iterator(chunk_size=10000):
+                yield student_id, text, weight
+
+    # ------------------------------------------------------------
+    # Calcul
+    # ------------------------------------------------------------
+    def compute(self, student_ids=None, mentors=None):
+        """
+        Recalcule les recommandations des étudiants donnés (tous si None).
+        Retourne le nombre d'étudiants ayant au moins une recommandation.
+        """
+        mentors = mentors or self.build_mentor_matrix()
+        if mentors is None:
+            logger.info("Aucun mentor vérifié avec spécialités, recommandations ignorées")
+            return 0
+
+        student_index = {}
+        rows, cols, weights = [], [], []
+        for student_id, text, signal_weight in self._student_signals(student_ids):
+            for term, term_weight in extract_terms(text):
+                col = mentors.vocab.get(term)
+                if col is None:
+                    continue
+                rows.append(student_index.setdefault(student_id, len(student_index)))
+                cols.append(col)
+                weights.append(signal_weight * term_weight)
+
+        if student_ids is not None:
+            # Étudiants sans signal exploitable : leurs anciennes recommandations sont obsolètes
+            stale = set(student_ids) - set(student_index)
+            if stale:
+                MentorRecommendation.objects.filter(student_id__in=stale).delete()
+
+        if not student_index:
+            return 0
+
+        rows = np.asarray(rows, dtype=np.int64)
+        order = np.argsort(rows, kind='stable')
+        rows = rows[order]
+        cols = np.asarray(cols, dtype=np.int64)[order]
+        weights = np.asarray(weights, dtype=np.float32)[order]
+        students = np.fromiter(student_index.keys(), dtype=np.int64, count=len(student_index))
+
+        k = min(self.top_k, mentors.size)
+        stored = 0
+        for start in range(0, len(students), self.chunk_size):
+            stop = min(start + self.chunk_size, len(students))
+            lo, hi = np.searchsorted(rows, [start, stop])
+
+            dense = np.zeros((stop - start, len(mentors.vocab)), dtype=np.float32)
+            np.add.at(dense, (rows[lo:hi] - start, cols[lo:hi]), weights[lo:hi])
+            dense *= mentors.idf
+            _l2_normalize(dense)
+
+            # Similarité cosinus étudiants x mentors
+            scores = dense @ mentors.matrix.T
+
+            chunk_students = students[start:stop]
+            for i, student_id in enumerate(chunk_students.tolist()):
+                col = mentors.column_by_user.get(student_id)
+                if col is not None:
+                    scores[i, col] = -1.0
+
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            ranking = np.argsort(-top_scores, axis=1, kind='stable')
+            top = np.take_along_axis(top, ranking, axis=1)
+            top_scores = np.take_along_axis(top_scores, ranking, axis=1)
+
+            stored += self._store(chunk_students, top, top_scores, mentors)
+
+        return stored
+
+    def _store(self, student_ids, top, top_scores, mentors):
+        recommendations = []
+        recommended_students = set()
+        for i, student_id in enumerate(student_ids.tolist()):
+            for rank, (col, score) in enumerate(zip(top[i].tolist(), top_scores[i].tolist()), start=1):
+                if score <= 0:
+                    break
+                recommendations.append(MentorRecommendation(
+                    student_id=student_id,
+                    mentor_profile_id=mentors.profile_ids[col],
+                    score=round(score, 6),
+                    rank=rank
+                ))
+                recommended_students.add(student_id)
+
+        with transaction.atomic():
+            MentorRecommendation.objects.filter(student_id__in=student_ids.tolist()).delete()
+            MentorRecommendation.objects.bulk_create(recommendations, batch_size=5000)
+
+        return len(recommended_students)
+
+    # ------------------------------------------------------------
+    # Rafraîchissement incrémental
+    # ------------------------------------------------------------
+    def refresh(self, full=False):
+        """
+        Recalcul incrémental : seuls les étudiants ayant de nouveaux signaux
+        depuis la dernière passe (MentorRecommendationRun) sont traités. Un
+        changement des mentors recommandables (spécialités, vérification),
+        détecté par l'empreinte de leur matrice, impose un recalcul complet ;
+        les autres mises à jour du profil mentor (avis, sessions) non.
+        """
+        run_started = timezone.now()
+        mentors = self.build_mentor_matrix()
+        fingerprint = mentors.fingerprint if mentors else ''
+        last_run = None if full else MentorRecommendationRun.objects.first()
+
+        if last_run is None or last_run.mentors_fingerprint != fingerprint:
+            count = self.compute(mentors=mentors)
+            MentorRecommendation.objects.filter(created_at__lt=run_started).delete()
+            self._record_run(run_started, fingerprint, count, is_full=True)
+            logger.info(f"Recommandations recalculées (complet) pour {count} étudiants")
+            return count
+
+        student_ids = self._students_with_new_signals(last_run.started_at)
+        count = self.compute(student_ids, mentors=mentors) if student_ids else 0
+        self._record_run(run_started, fingerprint, count, is_full=False)
+        if student_ids:
+            logger.info(f"Recommandations recalculées pour {count}/{len(student_ids)} étudiants")
+        return count
+
+    @staticmethod
+    def _record_run(started_at, fingerprint, count, is_full):
+        MentorRecommendationRun.objects.create(
+            started_at=started_at,
+            is_full=is_full,
+            mentors_fingerprint=fingerprint,
+            students_count=count
+        )
+        MentorRecommendationRun.objects.filter(
+            started_at__lt=started_at - datetime.timedelta(days=RUN_HISTORY_DAYS)
+        ).delete()
+
+    @staticmethod
+    def _students_with_new_signals(since):
+        from apps.forum.models import QuestionTag
+        from apps.analytics.models import SearchLog
+        from apps.bookings.models import BookingDomain
+
+        student_ids = set(
+            QuestionTag.objects.filter(created_at__gt=since, question__author__role='STUDENT')
+            .values_list('question__author_id', flat=True)
+        )
+        student_ids.update(
+            SearchLog.objects.filter(created_at__gt=since, category='MENTORS', user__role='STUDENT')
+            .values_list('user_id', flat=True)
+        )
+        student_ids.update(
+            BookingDomain.objects.filter(created_at__gt=since, booking__student__role='STUDENT')
+            .values_list('booking__student_id', flat=True)
+        )
+        return student_ids
@@ -1,14 +1,18 @@
 # ============================================
 # apps/mentors/serializers.py
 # ============================================
+import logging
+
 from rest_framework import serializers
 from apps.mentors.models import (
-    MentorProfile, MentorBio, MentorSpecialty, MentorAvailability,
+    MentorProfile, MentorSpecialty, MentorAvailability,
     MentorSocial, MentorReview, MentorApplication
 )
-from apps.users.serializers import UserSerializer
+from apps.users.serializers import UserSerializer, first_current
 from apps.core.serializers import HashIdField
 
+logger = logging.getLogger(__name__)
+
 class MentorAvailabilitySerializer(serializers.ModelSerializer):
     day_label = serializers.CharField(source='get_day_of_week_display', read_only=True)
     
@@ -35,26 +39,34 @@ class MentorProfileDetailSerializer(serializers.ModelSerializer):
     specialties = serializers.SerializerMethodField()
     availabilities = serializers.SerializerMethodField()
     socials = serializers.SerializerMethodField()
+    rating_histogram = serializers.DictField(child=serializers.IntegerField(), read_only=True)
     
     class Meta:
         model = MentorProfile
         fields = [
             'id', 'user', 'bio', 'specialties', 'availabilities',
-            'socials', 'rating', 'reviews_count', 'is_verified',
+            'socials', 'rating', 'reviews_count', 'rating_histogram', 'is_verified',
             'total_sessions', 'created_at'
         ]
     
+    @staticmethod
+    def active(obj, attached, related):
+        """Lignes actives, depuis les lignes attachées au profil (prefetch, onboarding) s'il y en a"""
+        if hasattr(obj, attached):
+            return getattr(obj, attached)
+        return getattr(obj, related).filter(is_active=True)
+    
     def get_bio(self, obj):
-        bio = obj.bios.filter(is_current=True).first()
+        bio = first_current(obj, 'current_bios', 'bios')
         return bio.bio if bio else None
     
     def get_specialties(self, obj):
-        specialties = obj.specialties.filter(is_active=True)
+        specialties = self.active(obj, 'active_specialties', 'specialties')
         return [s.specialty for s in specialties]
     
     def get_availabilities(self, obj):
         # Récupérer les créneaux récurrents
-        recurring = obj.availabilities.filter(is_active=True)
+        recurring = self.active(obj, 'active_availabilities', 'availabilities')
         recurring_list = []
         
         day_mapping = {
@@ -67,7 +79,7 @@ class MentorProfileDetailSerializer(serializers.ModelSerializer):
             recurring_list.append(f"{day_label} : {avail.start_time.strftime('%H:%M')} - {avail.end_time.strftime('%H:%M')}")
         
         # Récupérer les dates spécifiques
-        specific = obj.specific_date_availabilities.filter(is_active=True)
+        specific = self.active(obj, 'active_specific_dates', 'specific_date_availabilities')
         specific_list = []
         
         for avail in specific:
@@ -79,7 +91,7 @@ class MentorProfileDetailSerializer(serializers.ModelSerializer):
         return ' • '.join(all_availabilities) if all_availabilities else None
     
     def get_socials(self, obj):
-        socials = obj.socials.filter(is_active=True)
+        socials = self.active(obj, 'active_socials', 'socials')
         return MentorSocialSerializer(socials, many=True).data
 
 class MentorProfileListSerializer(serializers.ModelSerializer):
@@ -96,12 +108,25 @@ class MentorProfileListSerializer(serializers.ModelSerializer):
             'reviews_count', 'is_verified', 'total_sessions'
         ]
 
+    @staticmethod
+    def prefetch_lookups():
+        """Prefetch des lignes affichées : le nombre de requêtes ne dépend plus du nombre de mentors"""
+        from django.db.models import Prefetch
+        from apps.mentors.models import MentorBio
+        from apps.users.serializers import user_prefetch_lookups
+
+        return [
+            Prefetch('bios', queryset=MentorBio.objects.filter(is_current=True).order_by('pk'), to_attr='current_bios'),
+            Prefetch('specialties', queryset=MentorSpecialty.objects.filter(is_active=True), to_attr='active_specialties'),
+            *user_prefetch_lookups('user__'),
+        ]
+
     def get_bio(self, obj):
-        bio = obj.bios.filter(is_current=True).first()
+        bio = first_current(obj, 'current_bios', 'bios')
         return bio.bio[:200] if bio else None  # Tronquer pour la liste
     
     def get_specialties(self, obj):
-        specialties = obj.specialties.filter(is_active=True)[:5]
+        specialties = MentorProfileDetailSerializer.active(obj, 'active_specialties', 'specialties')[:5]
         return [s.specialty for s in specialties]
 
 class MentorProfileUpdateSerializer(serializers.Serializer):
@@ -120,122 +145,47 @@ class MentorProfileUpdateSerializer(serializers.Serializer):
         required=False
     )
     
-    def update(self, instance, validated_data):
-        from django.db import transaction
-        import logging
-        
-        logger = logging.getLogger(__name__)
-        logger.info('🔵 [BACKEND] Starting mentor profile update...')
-        logger.info(f'📊 [BACKEND] Received data: {validated_data}')
+    def validate_availabilities(self, value):
+        """Sépare créneaux hebdomadaires (day_of_week) et dates spécifiques (specific_date)"""
+        from django.utils.dateparse import parse_date, parse_time
         
-        with transaction.atomic():
-            # Mise à jour bio
-            if 'bio' in validated_data:
-                logger.info(f'📝 [BACKEND] Updating bio: {validated_data["bio"][:50]}...')
-                # Désactiver les anciennes bios
-                instance.bios.filter(is_current=True).update(is_current=False)
-                MentorBio.objects.create(
-                    mentor_profile=instance,
-                    bio=validated_data['bio'],
-                    is_current=True
-                )
-            
-            # Mise à jour spécialités
-            if 'specialties' in validated_data:
-                logger.info(f'🎯 [BACKEND] Updating specialties: {validated_data["specialties"]}')
-                # Désactiver anciennes
-                instance.specialties.filter(is_active=True).update(is_active=False)
-                # Créer nouvelles
-                for specialty in validated_data['specialties']:
-                    MentorSpecialty.objects.create(
-                        mentor_profile=instance,
-                        specialty=specialty
-                    )
-            
-            # Mise à jour disponibilités
-            if 'availabilities' in validated_data:
-                from apps.mentors.models import MentorSpecificDateAvailability
-                
-                availabilities_data = validated_data['availabilities']
-                logger.info(f'📅 [BACKEND] Processing {len(availabilities_data)} availability slots')
-                logger.info(f'📋 [BACKEND] Availabilities data: {availabilities_data}')
-                
-                # Désactiver toutes les anciennes disponibilités (récurrentes et spécifiques)
-                old_recurring_count = instance.availabilities.filter(is_active=True).count()
-                old_specific_count = instance.specific_date_availabilities.filter(is_active=True).count()
-                
-                instance.availabilities.filter(is_active=True).update(is_active=False)
-                instance.specific_date_availabilities.filter(is_active=True).update(is_active=False)
-                
-                logger.info(f'🗑️ [BACKEND] Deactivated {old_recurring_count} recurring and {old_specific_count} specific slots')
-                
-                recurring_created = 0
-                specific_created = 0
-                
-                for avail in availabilities_data:
-                    # Vérifier si c'est un créneau récurrent (day_of_week) ou une date spécifique (specific_date)
-                    if 'day_of_week' in avail:
-                        # Créneau hebdomadaire récurrent
-                        logger.info(f'➕ [BACKEND] Creating recurring slot: {avail}')
-                        MentorAvailability.objects.create(
-                            mentor_profile=instance,
-                            day_of_week=avail['day_of_week'],
-                            start_time=avail['start_time'],
-                            end_time=avail['end_time']
-                        )
-                        recurring_created += 1
-                    elif 'specific_date' in avail:
-                        # Date spécifique ponctuelle
-                        logger.info(f'➕ [BACKEND] Creating specific date slot: {avail}')
-                        MentorSpecificDateAvailability.objects.create(
-                            mentor_profile=instance,
-                            specific_date=avail['specific_date'],
-                            start_time=avail['start_time'],
-                            end_time=avail['end_time']
-                        )
-                        specific_created += 1
-                    else:
-                        logger.warning(f'⚠️ [BACKEND] Unknown availability format: {avail}')
-                
-                logger.info(f'✅ [BACKEND] Created {recurring_created} recurring and {specific_created} specific slots')
-            
-            # Mise à jour réseaux sociaux
-            if 'socials' in validated_data:
-                logger.info(f'🔗 [BACKEND] Updating social links')
-                instance.socials.filter(is_active=True).update(is_active=False)
-                
-                # Le frontend envoie un dict avec linkedin, twitter, website
-                # On doit le transformer en liste de dicts avec platform et url
-                socials_dict = validated_data['socials']
-                
-                if isinstance(socials_dict, dict):
-                    # Format: {'linkedin': 'url', 'twitter': 'url', 'website': 'url'}
-                    platform_mapping = {
-                        'linkedin': 'LINKEDIN',
-                        'twitter': 'TWITTER',
-                        'website': 'WEBSITE'
-                    }
-                    
-                    for key, url in socials_dict.items():
-                        if url and key in platform_mapping:
-                            MentorSocial.objects.create(
-                                mentor_profile=instance,
-                                platform=platform_mapping[key],
-                                url=url
-                            )
-                            logger.info(f'➕ [BACKEND] Added {platform_mapping[key]}: {url}')
-                elif isinstance(socials_dict, list):
-                    # Format: [{'platform': 'LINKEDIN', 'url': 'url'}, ...]
-                    for social in socials_dict:
-                        if 'platform' in social and 'url' in social:
-                            MentorSocial.objects.create(
-                                mentor_profile=instance,
-                                platform=social['platform'],
-                                url=social['url']
-                            )
-                            logger.info(f'➕ [BACKEND] Added {social["platform"]}: {social["url"]}')
+        recurring, specific = [], []
+        for avail in value:
+            try:
+                start = parse_time(str(avail.get('start_time', '')))
+                end = parse_time(str(avail.get('end_time', '')))
+            except ValueError:
+                start = end = None
+            if 'day_of_week' in avail:
+                day = avail['day_of_week']
+                if start is None or end is None or day not in dict(MentorAvailability.DAY_CHOICES):
+                    raise serializers.ValidationError(f"Créneau invalide : {avail}")
+                recurring.append((day, start, end))
+            elif 'specific_date' in avail:
+                try:
+                    specific_date = parse_date(str(avail['specific_date']))
+                except ValueError:
+                    specific_date = None
+                if start is None or end is None or specific_date is None:
+                    raise serializers.ValidationError(f"Créneau invalide : {avail}")
+                specific.append((specific_date, start, end))
+            else:
+                logger.warning(f"Format de disponibilité inconnu ignoré : {avail}")
+        return {'recurring': recurring, 'specific': specific}
+    
+    def validate_socials(self, value):
+        """[{'platform': 'LINKEDIN', 'url': url}, ...] -> {plateforme: url}"""
+        platforms = dict(MentorSocial.PLATFORM_CHOICES)
+        return {
+            social['platform']: social['url']
+            for social in value
+            if social.get('platform') in platforms and social.get('url')
+        }
+    
+    def update(self, instance, validated_data):
+        from apps.mentors.services import MentorProfileUpdateService
         
-        logger.info('🎉 [BACKEND] Mentor profile update completed successfully!')
+        MentorProfileUpdateService.update(instance, validated_data)
         return instance
 
 class MentorReviewSerializer(serializers.ModelSerializer):
@@ -263,7 +213,7 @@ class MentorReviewCreateSerializer(serializers.Serializer):
         student = self.context['request'].user
         
         with transaction.atomic():
-            # Créer la review
+            # Créer la review (notes du mentor ajustées par le signal post_save)
             review = MentorReview.objects.create(
                 mentor_profile=mentor_profile,
                 student=student,
@@ -278,9 +228,6 @@ class MentorReviewCreateSerializer(serializers.Serializer):
                     is_current=True
                 )
             
-            # Mettre à jour la moyenne du mentor
-            mentor_profile.update_rating()
-            
         return review
 
 class MentorApplicationSerializer(serializers.ModelSerializer):
@@ -297,6 +244,30 @@ class MentorApplicationSerializer(serializers.ModelSerializer):
             'ai_score', 'ai_validated', 'created_at'
         ]
         
+    def validate_availability(self, value):
+        """Créneaux hebdomadaires [{'day': 'MONDAY', 'startTime': '09:00', 'endTime': '10:00'}, ...]"""
+        from django.utils.dateparse import parse_time
+        
+        if not value:
+            return value
+        if not isinstance(value, list):
+            raise serializers.ValidationError("Les disponibilités doivent être une liste de créneaux.")
+        days = dict(MentorAvailability.DAY_CHOICES)
+        for slot in value:
+            if not isinstance(slot, dict):
+                raise serializers.ValidationError(f"Créneau invalide : {slot}")
+            day = slot.get('day') or slot.get('day_of_week')
+            if not day:
+                continue  # ignoré à la création du profil
+            try:
+                start = parse_time(str(slot.get('startTime') or slot.get('start_time') or ''))
+                end = parse_time(str(slot.get('endTime') or slot.get('end_time') or ''))
+            except ValueError:
+                start = end = None
+            if day not in days or start is None or end is None:
+                raise serializers.ValidationError(f"Créneau invalide : {slot}")
+        return value
+    
     def validate_cv_file(self, value):
         if not value.name.endswith('.pdf'):
             raise serializers.ValidationError("Le fichier doit être un PDF.")
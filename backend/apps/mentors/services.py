@@ -1,56 +1,88 @@
 # ============================================
 # apps/mentors/services.py - Services Mentors
 # ============================================
-import os
 import logging
 import json
 import re
-from pypdf import PdfReader
-from google import genai
+from datetime import timedelta
+
 from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
 from .models import MentorApplication
 
 logger = logging.getLogger(__name__)
 
 class MentorAIRewiewService:
+    """
+    Analyse IA des candidatures mentor, exécutée par la tâche Celery
+    mentors.review_application (file dédiée, voir MENTOR_REVIEW).
+    Statuts : QUEUED (en file) -> PROCESSING -> COMPLETED / FAILED.
+    """
+
     @staticmethod
-    def extract_text_from_pdf(pdf_path):
-        """Extrait le texte d'un fichier PDF"""
-        try:
-            if not os.path.exists(pdf_path):
-                logger.error(f"Fichier PDF non trouvé: {pdf_path}")
-                return ""
-                
-            reader = PdfReader(pdf_path)
-            text = ""
-            for page in reader.pages:
-                text += page.extract_text() + "\n"
-            return text
-        except Exception as e:
-            logger.error(f"Erreur lors de l'extraction du PDF: {str(e)}")
-            return ""
+    def config():
+        return settings.MENTOR_REVIEW
 
     @staticmethod
-    def review_application(application_id):
-        """Analyse une candidature avec l'IA"""
-        try:
-            application = MentorApplication.objects.get(id=application_id)
-            application.ai_status = 'PROCESSING'
-            application.save(update_fields=['ai_status'])
+    def enqueue(application_ids):
+        """
+        Met des candidatures en file d'analyse. Les tâches ne partent
+        qu'après le commit : le worker ne lit jamais une ligne à moitié écrite.
+        """
+        application_ids = list(application_ids)
+        MentorApplication.objects.filter(pk__in=application_ids).update(
+            ai_status='QUEUED', ai_task_id='', updated_at=timezone.now()
+        )
 
-            # Extraction du texte du CV
-            cv_text = ""
-            if application.cv_file:
-                cv_text = MentorAIRewiewService.extract_text_from_pdf(application.cv_file.path)
+        def send():
+            from apps.mentors.tasks import review_application
+            for application_id in application_ids:
+                try:
+                    result = review_application.delay(application_id)
+                except Exception as e:
+                    # Reste QUEUED : reprise par la commande requeue_stuck_reviews
+                    logger.warning(f"Mise en file de l'analyse de la candidature {application_id} impossible : {e}")
+                    continue
+                MentorApplication.objects.filter(pk=application_id).update(ai_task_id=result.id)
 
-            # Récupérer le nom de l'utilisateur
-            user_name = "Inconnu"
-            profile = application.user.profiles.filter(is_current=True).first()
-            if profile:
-                user_name = profile.name
+        transaction.on_commit(send)
+        return len(application_ids)
+
+    @classmethod
+    def stuck(cls, older_than=None):
+        """Candidatures dont l'analyse est bloquée (worker arrêté, tâche perdue)"""
+        cutoff = timezone.now() - timedelta(seconds=older_than or cls.config()['STUCK_AFTER'])
+        return MentorApplication.objects.filter(
+            Q(ai_status='PROCESSING', ai_started_at__lt=cutoff)
+            | Q(ai_status='PROCESSING', ai_started_at__isnull=True, updated_at__lt=cutoff)
+            | Q(ai_status__in=['QUEUED', 'PENDING'], updated_at__lt=cutoff)
+        )
+
+    @classmethod
+    def claimable(cls):
+        """
+        Candidatures qu'une tâche d'analyse peut prendre : en attente, en file
+        ou en échec, ou en cours mais bloquées depuis STUCK_AFTER (worker arrêté).
+        Une analyse en cours sur un autre worker n'est pas reprise en double.
+        """
+        cutoff = timezone.now() - timedelta(seconds=cls.config()['STUCK_AFTER'])
+        return (
+            Q(ai_status__in=['PENDING', 'QUEUED', 'FAILED'])
+            | Q(ai_status='PROCESSING', ai_started_at__lt=cutoff)
+            | Q(ai_status='PROCESSING', ai_started_at__isnull=True, updated_at__lt=cutoff)
+        )
+
+    @staticmethod
+    def mark_failed(application_id, message):
+        MentorApplication.objects.filter(pk=application_id).update(
+            ai_status='FAILED', ai_recommendation=message, updated_at=timezone.now()
+        )
 
-            # Préparation du prompt
-            prompt = f"""
+    @staticmethod
+    def build_prompt(application, user_name, cv_text):
+        return f"""
             Tu es un expert en recrutement académique pour EduLab Africa. 
             Ta mission est d'analyser la candidature d'un utilisateur qui souhaite devenir Mentor sur notre plateforme.
             
@@ -63,7 +95,7 @@ class MentorAIRewiewService:
             
             Texte extrait du CV (PDF) :
             ---
-            {cv_text[:4000]}
+            {cv_text}
             ---
             
             Analyse cette candidature selon les critères suivants :
@@ -80,43 +112,348 @@ class MentorAIRewiewService:
             }}
             """
 
-            # Appel à Gemini via le nouveau SDK (comme dans Tutor AI)
-            if not settings.GEMINI_API_KEY:
+    @classmethod
+    def review_application(cls, application_id):
+        """
+        Analyse une candidature avec l'IA. Retourne False si elle n'est pas
+        à analyser (inexistante, déjà analysée, en cours d'analyse ailleurs)
+        ou si l'analyse échoue.
+        Les erreurs transitoires du fournisseur (y compris ProviderUnavailable)
+        sont propagées, candidature remise en QUEUED, pour que la tâche réessaie.
+        """
+        from apps.ai_tools.providers import ProviderError, ProviderUnavailable, get_provider
+
+        claimed = MentorApplication.objects.filter(cls.claimable(), pk=application_id).update(
+            ai_status='PROCESSING',
+            ai_started_at=timezone.now(),
+            ai_attempts=F('ai_attempts') + 1
+        )
+        if not claimed:
+            return False
+        application = MentorApplication.objects.select_related('user').get(pk=application_id)
+
+        try:
+            # Extraction du texte du CV (bornée, en cache par empreinte)
+            cv_text = ""
+            if application.cv_file:
+                from apps.mentors.extraction import CVTextExtractor
+                cv_text = CVTextExtractor.extract(application.cv_file)
+
+            # Récupérer le nom de l'utilisateur
+            user_name = "Inconnu"
+            profile = application.user.profiles.filter(is_current=True).first()
+            if profile:
+                user_name = profile.name
+
+            # Appel via le fournisseur LLM partagé (comme dans Tutor AI)
+            provider = get_provider()
+            if not provider.is_configured():
                 raise ValueError("GEMINI_API_KEY non configurée dans les settings.")
-                
-            client = genai.Client(api_key=settings.GEMINI_API_KEY)
-            
-            response = client.models.generate_content(
-                model='gemini-flash-latest', 
-                contents=prompt
+            response = provider.generate(
+                cls.build_prompt(application, user_name, cv_text), model='gemini-flash-latest'
             )
-            
-            # Parser la réponse
-            text_response = response.text
-            json_match = re.search(r'\{.*\}', text_response, re.DOTALL)
-            
-            if json_match:
-                result = json.loads(json_match.group())
-                
-                application.ai_score = result.get('score', 0)
-                application.ai_recommendation = result.get('recommendation', '')
-                application.ai_validated = result.get('validated', False)
-                application.ai_status = 'COMPLETED'
-            else:
-                application.ai_status = 'FAILED'
-                application.ai_recommendation = "L'IA n'a pas renvoyé un format JSON valide."
-            
-            application.save()
-            return True
-
+        except ProviderError as e:
+            # Disjoncteur ouvert ou fournisseur saturé : transitoire aussi pour une tâche de fond
+            if e.retryable or isinstance(e, ProviderUnavailable):
+                MentorApplication.objects.filter(pk=application_id).update(
+                    ai_status='QUEUED', updated_at=timezone.now()
+                )
+                raise
+            logger.error(f"Erreur lors de l'analyse IA: {str(e)}")
+            cls.mark_failed(application_id, f"Erreur technique: {str(e)}")
+            return False
         except Exception as e:
             logger.error(f"Erreur lors de l'analyse IA: {str(e)}")
-            try:
-                # Re-fetch application to avoid stale data if needed
-                app = MentorApplication.objects.get(id=application_id)
-                app.ai_status = 'FAILED'
-                app.ai_recommendation = f"Erreur technique: {str(e)}"
-                app.save()
-            except:
-                pass
+            cls.mark_failed(application_id, f"Erreur technique: {str(e)}")
+            return False
+
+        # Parser la réponse
+        json_match = re.search(r'\{.*\}', response.text, re.DOTALL)
+        try:
+            result = json.loads(json_match.group()) if json_match else None
+        except ValueError:
+            result = None
+
+        if result is None:
+            cls.mark_failed(application_id, "L'IA n'a pas renvoyé un format JSON valide.")
             return False
+
+        application.ai_score = result.get('score', 0)
+        application.ai_recommendation = result.get('recommendation', '')
+        application.ai_validated = result.get('validated', False)
+        application.ai_status = 'COMPLETED'
+        application.save(update_fields=[
+            'ai_score', 'ai_recommendation', 'ai_validated', 'ai_status', 'updated_at'
+        ])
+        return True
+
+
+class MentorOnboardingService:
+    """
+    Création du profil mentor (non vérifié) à partir d'une candidature,
+    en une seule transaction. Bio, spécialités, disponibilités et réseaux
+    sociaux passent par les synchronisations de MentorProfileUpdateService :
+    une nouvelle candidature ne réécrit que ce qui a changé.
+    """
+
+    SOCIAL_FIELDS = [('linkedin', 'LINKEDIN'), ('twitter', 'TWITTER'), ('website', 'WEBSITE')]
+
+    @staticmethod
+    def availability_slots(slots):
+        """
+        Créneaux hebdomadaires (jour, début, fin) de la candidature
+        ('day'/'startTime' ou 'day_of_week'/'start_time'), validés par MentorApplicationSerializer.
+        """
+        from django.utils.dateparse import parse_time
+
+        return [
+            (
+                slot.get('day') or slot.get('day_of_week'),
+                parse_time(str(slot.get('startTime') or slot.get('start_time'))),
+                parse_time(str(slot.get('endTime') or slot.get('end_time'))),
+            )
+            for slot in slots
+            if slot.get('day') or slot.get('day_of_week')
+        ]
+
+    @classmethod
+    def onboard(cls, user, application):
+        """
+        Crée ou met à jour le profil mentor de user d'après application.
+        Retourne le profil, avec ses lignes courantes attachées (current_bios,
+        active_specialties, ...) : MentorProfileDetailSerializer ne relit pas la base.
+        """
+        from apps.mentors.models import MentorProfile
+        from apps.users.models import UserUniversity
+
+        sync = MentorProfileUpdateService
+        now = timezone.now()
+        with transaction.atomic():
+            # Nouveau profil : non vérifié par défaut (en attente de validation admin)
+            mentor_profile, created = MentorProfile.objects.get_or_create(user=user)
+            if created:
+                mentor_profile.current_bios = []
+                mentor_profile.active_specialties = []
+                mentor_profile.active_availabilities = []
+                mentor_profile.active_specific_dates = []
+
+            # 1. Bio
+            if application.bio:
+                _, bio = sync.sync_bio(mentor_profile, application.bio, now, fresh=created)
+                mentor_profile.current_bios = [bio]
+
+            # 2. Spécialités
+            if application.specialties:
+                _, mentor_profile.active_specialties = sync.sync_specialties(
+                    mentor_profile, application.specialties, now, fresh=created
+                )
+
+            # 3. Disponibilités hebdomadaires (les dates spécifiques sont conservées)
+            if application.availability:
+                _, recurring, _ = sync.sync_availabilities(
+                    mentor_profile, cls.availability_slots(application.availability), None, now, fresh=created
+                )
+                mentor_profile.active_availabilities = sorted(
+                    recurring, key=lambda slot: (slot.day_of_week, slot.start_time)
+                )
+
+            # 4. Réseaux sociaux
+            _, mentor_profile.active_socials = sync.sync_socials(mentor_profile, {
+                platform: getattr(application, field)
+                for field, platform in cls.SOCIAL_FIELDS if getattr(application, field)
+            }, now, fresh=created)
+
+            # 5. Université (profil utilisateur courant)
+            if application.university:
+                user_profile = user.profiles.filter(is_current=True).first()
+                if user_profile:
+                    user_profile.universities.filter(is_current=True).update(is_current=False, updated_at=now)
+                    user_profile.current_universities = [UserUniversity.objects.create(
+                        profile=user_profile,
+                        university=application.university,
+                        is_current=True
+                    )]
+                    user.current_profiles = [user_profile]
+
+        user.latest_mentor_applications = [application]
+        return mentor_profile
+
+
+class MentorProfileUpdateService:
+    """
+    Mise à jour du profil mentor par différence : seules les lignes ajoutées
+    ou retirées sont écrites, une section inchangée ne coûte qu'une lecture.
+    Les lignes retirées sont désactivées (historique), puis supprimées par
+    purge_superseded après MENTOR_PROFILE_HISTORY_DAYS jours.
+    Chaque sync_* retourne (modifié, lignes actives après synchronisation) ;
+    fresh=True pour un profil qui vient d'être créé (rien à relire).
+    """
+
+    @staticmethod
+    def retire(model, mentor_profile_id, rows, unique_fields, now):
+        """
+        Désactive rows. Les lignes inactives de même clé (unique_together
+        avec is_active) sont supprimées d'abord : elles bloqueraient la désactivation.
+        """
+        if not rows:
+            return
+        if unique_fields:
+            duplicates = Q()
+            for row in rows:
+                duplicates |= Q(**{field: getattr(row, field) for field in unique_fields})
+            model.objects.filter(duplicates, mentor_profile_id=mentor_profile_id, is_active=False).delete()
+        model.objects.filter(pk__in=[row.pk for row in rows]).update(
+            is_active=False, deleted_at=now, updated_at=now
+        )
+
+    @staticmethod
+    def sync_bio(mentor_profile, bio, now, fresh=False):
+        from apps.mentors.models import MentorBio
+
+        current = None if fresh else mentor_profile.bios.filter(is_current=True).first()
+        if current and current.bio == bio:
+            return False, current
+        if current:
+            MentorBio.objects.filter(mentor_profile_id=mentor_profile.id, is_current=True).update(
+                is_current=False, updated_at=now
+            )
+        return True, MentorBio.objects.create(mentor_profile=mentor_profile, bio=bio, is_current=True)
+
+    @classmethod
+    def sync_specialties(cls, mentor_profile, specialties, now, fresh=False):
+        from apps.mentors.models import MentorSpecialty
+
+        wanted = list(dict.fromkeys(specialties))
+        current = {} if fresh else {row.specialty: row for row in mentor_profile.specialties.filter(is_active=True)}
+        removed = [row for specialty, row in current.items() if specialty not in wanted]
+        added = MentorSpecialty.objects.bulk_create([
+            MentorSpecialty(mentor_profile=mentor_profile, specialty=specialty)
+            for specialty in wanted if specialty not in current
+        ])
+        cls.retire(MentorSpecialty, mentor_profile.id, removed, ['specialty'], now)
+        rows = {row.specialty: row for row in added}
+        return bool(removed or added), [current.get(specialty) or rows[specialty] for specialty in wanted]
+
+    @classmethod
+    def sync_availabilities(cls, mentor_profile, recurring, specific, now, fresh=False):
+        """
+        recurring : (jour, début, fin) ; specific : (date, début, fin), ou None
+        pour ne pas toucher aux dates spécifiques. Retourne (modifié, créneaux
+        hebdomadaires, dates spécifiques). Le bitmap n'est invalidé que si un créneau a changé.
+        """
+        from apps.mentors.models import MentorAvailability, MentorSpecificDateAvailability
+
+        changed = False
+        results = []
+        for model, related, key_fields, unique_fields, wanted in [
+            (MentorAvailability, mentor_profile.availabilities,
+             ('day_of_week', 'start_time', 'end_time'), None, recurring),
+            (MentorSpecificDateAvailability, mentor_profile.specific_date_availabilities,
+             ('specific_date', 'start_time', 'end_time'), ['specific_date', 'start_time'], specific),
+        ]:
+            if wanted is None:
+                results.append(None)
+                continue
+            wanted = list(dict.fromkeys(wanted))
+            current = {} if fresh else {
+                tuple(getattr(row, field) for field in key_fields): row
+                for row in related.filter(is_active=True)
+            }
+            removed = [row for key, row in current.items() if key not in wanted]
+            added = [key for key in wanted if key not in current]
+            kept = [row for key, row in current.items() if key in wanted]
+            if not removed and not added:
+                results.append(kept)
+                continue
+
+            changed = True
+            cls.retire(model, mentor_profile.id, removed, unique_fields, now)
+            results.append(kept + model.objects.bulk_create([
+                model(mentor_profile=mentor_profile, **dict(zip(key_fields, key))) for key in added
+            ]))
+
+        if changed:
+            # bulk_create et update ne déclenchent pas de signal
+            from apps.mentors.availability import AvailabilityBitmapService
+            AvailabilityBitmapService.invalidate(mentor_profile.id)
+        return (changed, *results)
+
+    @classmethod
+    def sync_socials(cls, mentor_profile, socials, now, fresh=False):
+        """socials : {plateforme: url} ; une URL modifiée est mise à jour sur place"""
+        from apps.mentors.models import MentorSocial
+
+        current = {} if fresh else {row.platform: row for row in mentor_profile.socials.filter(is_active=True)}
+        removed = [row for platform, row in current.items() if platform not in socials]
+        updated = []
+        for platform, row in current.items():
+            if platform in socials and row.url != socials[platform]:
+                row.url, row.updated_at = socials[platform], now
+                updated.append(row)
+        added = [platform for platform in socials if platform not in current]
+        kept = [row for platform, row in current.items() if platform in socials]
+        if not removed and not updated and not added:
+            return False, kept
+
+        cls.retire(MentorSocial, mentor_profile.id, removed, ['platform'], now)
+        if updated:
+            MentorSocial.objects.bulk_update(updated, ['url', 'updated_at'])
+        return True, kept + MentorSocial.objects.bulk_create([
+            MentorSocial(mentor_profile=mentor_profile, platform=platform, url=socials[platform])
+            for platform in added
+        ])
+
+    @classmethod
+    def update(cls, mentor_profile, data):
+        """
+        Applique les sections présentes dans data (bio, specialties,
+        recurring/specific, socials). Retourne la liste des sections modifiées.
+        """
+        now = timezone.now()
+        changed = []
+        with transaction.atomic():
+            if 'bio' in data and cls.sync_bio(mentor_profile, data['bio'], now)[0]:
+                changed.append('bio')
+            if 'specialties' in data and cls.sync_specialties(mentor_profile, data['specialties'], now)[0]:
+                changed.append('specialties')
+            if 'availabilities' in data and cls.sync_availabilities(
+                mentor_profile, data['availabilities']['recurring'], data['availabilities']['specific'], now
+            )[0]:
+                changed.append('availabilities')
+            if 'socials' in data and cls.sync_socials(mentor_profile, data['socials'], now)[0]:
+                changed.append('socials')
+
+        logger.debug(f"Profil mentor {mentor_profile.id} : sections modifiées {changed or 'aucune'}")
+        return changed
+
+    @staticmethod
+    def purge_superseded(older_than_days=None, batch_size=1000):
+        """
+        Supprime définitivement les lignes du profil désactivées (ou bios
+        remplacées) depuis plus de older_than_days jours. Retourne le nombre de lignes supprimées.
+        """
+        from apps.mentors.models import (
+            MentorBio, MentorSpecialty, MentorAvailability,
+            MentorSpecificDateAvailability, MentorSocial
+        )
+
+        if older_than_days is None:
+            older_than_days = settings.MENTOR_PROFILE_HISTORY_DAYS
+        cutoff = timezone.now() - timedelta(days=older_than_days)
+
+        deleted = 0
+        for model, superseded in [
+            (MentorBio, Q(is_current=False)),
+            (MentorSpecialty, Q(is_active=False)),
+            (MentorAvailability, Q(is_active=False)),
+            (MentorSpecificDateAvailability, Q(is_active=False)),
+            (MentorSocial, Q(is_active=False)),
+        ]:
+            queryset = model.objects.filter(superseded, updated_at__lt=cutoff)
+            # Par lots : pas de longue transaction sur les tables lues par l'annuaire
+            while True:
+                ids = list(queryset.values_list('pk', flat=True)[:batch_size])
+                if not ids:
+                    break
+                deleted += model.objects.filter(pk__in=ids).delete()[0]
+        return deleted
@@ -1,17 +1,55 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
-from .models import MentorApplication
+from .models import (
+    MentorApplication, MentorAvailability, MentorSpecificDateAvailability,
+    MentorProfile, MentorReview
+)
 from .services import MentorAIRewiewService
-import threading
 
 @receiver(post_save, sender=MentorApplication)
 def trigger_ai_review(sender, instance, created, **kwargs):
-    """Déclenche l'analyse IA dès qu'une candidature est soumise"""
+    """Met l'analyse IA en file dès qu'une candidature est soumise (tâche Celery après le commit)"""
     if created:
-        # On lance l'analyse dans un thread séparé pour ne pas bloquer la réponse HTTP
-        # En production, on utiliserait Celery
-        thread = threading.Thread(
-            target=MentorAIRewiewService.review_application,
-            args=(instance.id,)
-        )
-        thread.start()
+        MentorAIRewiewService.enqueue([instance.id])
+
+
+@receiver([post_save, post_delete], sender=MentorAvailability)
+@receiver([post_save, post_delete], sender=MentorSpecificDateAvailability)
+def invalidate_compiled_availability(sender, instance, **kwargs):
+    """Recompile le bitmap de disponibilités du mentor après modification"""
+    if kwargs.get('signal') is post_delete and not instance.is_active:
+        # Purge d'un créneau déjà désactivé : le bitmap n'en tenait plus compte
+        return
+    from .availability import AvailabilityBitmapService
+    AvailabilityBitmapService.invalidate(instance.mentor_profile_id)
+
+
+@receiver(pre_save, sender=MentorReview)
+def remember_counted_rating(sender, instance, **kwargs):
+    """Note comptée avant modification (avis existant) : (profil, note) ou None"""
+    instance._counted_rating = None
+    if not instance._state.adding and instance.pk:
+        previous = MentorReview.objects.filter(pk=instance.pk, is_active=True).values_list(
+            'mentor_profile_id', 'rating'
+        ).first()
+        instance._counted_rating = previous
+
+
+@receiver(post_save, sender=MentorReview)
+def update_mentor_rating(sender, instance, **kwargs):
+    """Création, modification, désactivation ou restauration d'un avis : notes du mentor ajustées"""
+    previous = getattr(instance, '_counted_rating', None)
+    current = (instance.mentor_profile_id, instance.rating) if instance.is_active else None
+    if previous == current:
+        return
+    if previous:
+        MentorProfile.apply_review(*previous, delta=-1)
+    if current:
+        MentorProfile.apply_review(*current, delta=1)
+
+
+@receiver(post_delete, sender=MentorReview)
+def remove_mentor_rating(sender, instance, **kwargs):
+    """Suppression définitive d'un avis actif"""
+    if instance.is_active:
+        MentorProfile.apply_review(instance.mentor_profile_id, instance.rating, delta=-1)
@@ -0,0 +1,67 @@
+# ============================================
+# apps/mentors/tasks.py - Tâches Celery pour les mentors
+# ============================================
+from celery import shared_task
+from django.conf import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(name='mentors.refresh_mentor_recommendations')
+def refresh_mentor_recommendations(full=False):
+    """
+    Recalcule les recommandations de mentors.
+    
+    Args:
+        full: True pour tout recalculer, sinon seuls les étudiants
+              ayant de nouveaux signaux d'intérêt sont traités.
+    """
+    from apps.mentors.recommendations import MentorRecommendationEngine
+    
+    count = MentorRecommendationEngine().refresh(full=full)
+    return f"Recommandations mises à jour pour {count} étudiants"
+
+
+@shared_task(name='mentors.purge_superseded_profile_rows')
+def purge_superseded_profile_rows():
+    """Supprime les lignes de profil mentor remplacées depuis plus de MENTOR_PROFILE_HISTORY_DAYS jours"""
+    from apps.mentors.services import MentorProfileUpdateService
+    
+    deleted = MentorProfileUpdateService.purge_superseded()
+    return f"{deleted} lignes de profil mentor remplacées supprimées"
+
+
+@shared_task(name='mentors.compile_availabilities')
+def compile_availabilities(mentor_profile_ids=None):
+    """Compile les bitmaps de disponibilités absents (tous, ou ceux des profils donnés)"""
+    from apps.mentors.availability import AvailabilityBitmapService
+    
+    compiled = AvailabilityBitmapService.compile_missing(mentor_profile_ids)
+    return f"{compiled} disponibilités de mentors compilées"
+
+
+@shared_task(
+    bind=True,
+    name='mentors.review_application',
+    acks_late=True,  # redélivrée si le worker s'arrête en pleine analyse
+    max_retries=settings.MENTOR_REVIEW['MAX_RETRIES'],
+    soft_time_limit=settings.MENTOR_REVIEW['SOFT_TIME_LIMIT'],
+    time_limit=settings.MENTOR_REVIEW['TIME_LIMIT'],
+)
+def review_application(self, application_id):
+    """Analyse IA d'une candidature mentor (file mentor_reviews, voir CELERY_TASK_ROUTES)"""
+    from apps.ai_tools.providers import ProviderError
+    from apps.mentors.services import MentorAIRewiewService
+    
+    try:
+        reviewed = MentorAIRewiewService.review_application(application_id)
+    except ProviderError as e:
+        if self.request.retries >= self.max_retries:
+            MentorAIRewiewService.mark_failed(application_id, f"Erreur technique: {str(e)}")
+            return f"Candidature {application_id} : échec après {self.request.retries + 1} essais"
+        # Attente exponentielle entre les essais
+        countdown = settings.MENTOR_REVIEW['RETRY_BACKOFF'] * 2 ** self.request.retries
+        raise self.retry(exc=e, countdown=countdown)
+    
+    return f"Candidature {application_id} : {'analysée' if reviewed else 'non analysée'}"
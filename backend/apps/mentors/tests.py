@@ -1,3 +1,566 @@
-from django.test import TestCase
+import datetime
+import json
+import shutil
+import subprocess
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.bookings.models import Booking
+from apps.mentors.availability import (
+    SLOTS_PER_DAY, WEEKDAYS, AvailabilityBitmapService, CompiledAvailability, _pack, _unpack, slot_label,
+    weekday_indexes
+)
+from apps.mentors.extraction import CVTextExtractor
+from apps.mentors.management.commands.bench_cv_extraction import build_pdf
+from apps.analytics.models import SearchLog
+from apps.mentors.models import (
+    CVTextCache, MentorApplication, MentorAvailability, MentorBio, MentorCompiledAvailability, MentorProfile,
+    MentorRecommendation, MentorRecommendationRun, MentorReview, MentorSpecialty, MentorSpecificDateAvailability
+)
+from apps.mentors.recommendations import MentorRecommendationEngine
+from apps.mentors.services import MentorAIRewiewService, MentorProfileUpdateService
+from apps.users.models import User, UserProfile
+
+
+def extract_in_worker(data):
+    """Extraction depuis un worker billiard (processus démon, comme le prefork de Celery)"""
+    return CVTextExtractor._run(data, 500, 3)
+
+
+class CVTextExtractorTests(TestCase):
+    """Extraction bornée des CV, en sous-processus, avec cache par empreinte"""
+
+    def setUp(self):
+        self.pdf = build_pdf(20, 30, seed=1)
+
+    @override_settings(MENTOR_CV_EXTRACTION=dict(settings.MENTOR_CV_EXTRACTION, MAX_CHARS=500, MAX_PAGES=3))
+    def test_extraction_is_bounded_and_cached(self):
+        text = CVTextExtractor.extract(ContentFile(self.pdf, name='cv.pdf'))
+
+        self.assertEqual(len(text), 500)
+        self.assertTrue(text.startswith('1-0-0 Experience'))
+        cached = CVTextCache.objects.get()
+        self.assertEqual((cached.pages_read, cached.page_count, cached.truncated), (1, 20, True))
+
+        # Même contenu sous un autre nom : servi par le cache, sans extraction
+        with mock.patch.object(CVTextExtractor, '_run') as run:
+            self.assertEqual(CVTextExtractor.extract(ContentFile(self.pdf, name='copie.pdf')), text)
+        run.assert_not_called()
+
+    def test_extraction_runs_inside_daemonic_worker(self):
+        from billiard.pool import Pool
+
+        pool = Pool(1)
+        try:
+            text, pages_read, page_count = pool.apply_async(extract_in_worker, (self.pdf,)).get(timeout=60)
+        finally:
+            pool.terminate()
+            pool.join()
+        self.assertEqual((len(text), pages_read, page_count), (500, 1, 20))
+
+    def test_timeout_and_invalid_files_are_not_cached(self):
+        with mock.patch.object(CVTextExtractor, '_run', side_effect=subprocess.TimeoutExpired('python', 1)):
+            self.assertEqual(CVTextExtractor.extract(ContentFile(self.pdf, name='cv.pdf')), '')
+        self.assertEqual(CVTextExtractor.extract(ContentFile(b'pas un pdf', name='cv.pdf')), '')
+        self.assertFalse(CVTextCache.objects.exists())
+
+
+class MentorOnboardingTests(TestCase):
+    """POST /api/mentors/apply/ : candidature et profil mentor en une transaction"""
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user(email='candidat@test.io', password='pw-Test-1234')
+        UserProfile.objects.create(user=self.user, name='Candidat', is_current=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def apply(self, specialties=('Maths', 'Physique'), availability=None, **extra):
+        availability = availability or [
+            {'day': 'MONDAY', 'startTime': '09:00', 'endTime': '11:00'},
+            {'day': 'FRIDAY', 'startTime': '14:00', 'endTime': '15:00'},
+        ]
+        response = self.client.post('/api/mentors/apply/', {
+            'cv_file': SimpleUploadedFile('cv.pdf', b'%PDF-1.4', content_type='application/pdf'),
+            'bio': 'Enseignant de sciences', 'university': 'UCAD',
+            'specialties': json.dumps(list(specialties)), 'availability': json.dumps(availability),
+            'linkedin': 'https://linkedin.com/in/candidat', **extra,
+        }, format='multipart', secure=True, SERVER_NAME='localhost')
+        return response
+
+    def reject(self):
+        """Demande examinée : une nouvelle candidature est possible"""
+        MentorApplication.objects.filter(user=self.user).update(status='REJECTED')
+
+    def test_onboarding_in_a_handful_of_queries(self):
+        # Candidature, profil, une insertion par table enfant, université (savepoints compris),
+        # puis avatar et pays de l'utilisateur pour la réponse ; aucune relecture du profil créé
+        with self.assertNumQueries(21):
+            response = self.apply()
+
+        self.assertEqual(response.status_code, 201)
+        profile = response.data['mentor_profile']
+        self.assertEqual(profile['bio'], 'Enseignant de sciences')
+        self.assertEqual(profile['specialties'], ['Maths', 'Physique'])
+        self.assertEqual(profile['availabilities'], 'Vendredi : 14:00 - 15:00 • Lundi : 09:00 - 11:00')
+        self.assertEqual(profile['user']['profile']['university'], 'UCAD')
+        self.assertFalse(MentorProfile.objects.get(user=self.user).is_verified)
+
+    def test_repeated_onboarding_only_writes_changes(self):
+        for specialties in (['Maths', 'Physique'], ['Maths'], ['Maths', 'Physique'], ['Maths']):
+            self.assertEqual(self.apply(specialties).status_code, 201)
+            self.reject()
+
+        mentor_profile = MentorProfile.objects.get(user=self.user)
+        self.assertEqual(
+            list(mentor_profile.specialties.filter(is_active=True).values_list('specialty', flat=True)), ['Maths']
+        )
+        self.assertEqual(mentor_profile.availabilities.filter(is_active=True).count(), 2)
+        self.assertEqual(mentor_profile.socials.count(), 1)
+
+    def test_failure_leaves_no_partial_profile(self):
+        with mock.patch('apps.mentors.models.MentorSocial.objects.bulk_create', side_effect=RuntimeError('panne')):
+            with self.assertRaises(RuntimeError):
+                self.apply()
+
+        self.assertFalse(MentorApplication.objects.filter(user=self.user).exists())
+        self.assertFalse(MentorProfile.objects.filter(user=self.user).exists())
+
+    def test_invalid_availability_is_rejected(self):
+        response = self.apply(availability=[{'day': 'MONDAY', 'startTime': '25:00', 'endTime': '11:00'}])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('availability', response.data['details'])
+        self.assertFalse(MentorProfile.objects.filter(user=self.user).exists())
+
+
+class MentorRecommendationRefreshTests(TestCase):
+    """Rafraîchissement incrémental : complet seulement si les spécialités ou la vérification changent"""
+
+    def setUp(self):
+        mentor = User.objects.create_user(email='mentor@test.io', password='x', role='MENTOR')
+        self.profile = MentorProfile.objects.create(user=mentor, is_verified=True)
+        self.specialty = MentorSpecialty.objects.create(mentor_profile=self.profile, specialty='Mathématiques')
+        self.student = User.objects.create_user(email='etudiant@test.io', password='x')
+        self.search('algèbre et mathématiques')
+        self.engine = MentorRecommendationEngine()
+
+    def search(self, query, user=None):
+        SearchLog.objects.create(user=user or self.student, category='MENTORS', search_query=query)
+
+    def refresh(self):
+        with mock.patch.object(self.engine, 'compute', wraps=self.engine.compute) as compute:
+            self.engine.refresh()
+        run = MentorRecommendationRun.objects.first()
+        return run.is_full, [call.args[0] if call.args else None for call in compute.call_args_list]
+
+    def test_refresh_is_incremental_until_mentors_change(self):
+        self.assertEqual(self.refresh(), (True, [None]))
+        self.assertEqual(MentorRecommendation.objects.get().student, self.student)
+
+        # Aucun nouveau signal : rien n'est recalculé, mais la passe est enregistrée
+        self.assertEqual(self.refresh(), (False, []))
+
+        # Avis et sessions touchent le profil mentor sans changer la matrice
+        MentorProfile.apply_review(self.profile.pk, 5, 1)
+        MentorProfile.objects.filter(pk=self.profile.pk).update(total_sessions=3)
+        other = User.objects.create_user(email='autre@test.io', password='x')
+        self.search('mathématiques', user=other)
+        self.assertEqual(self.refresh(), (False, [{other.id}]))
+        self.assertEqual(MentorRecommendation.objects.count(), 2)
+
+        self.specialty.specialty = 'Physique'
+        self.specialty.save()
+        self.assertEqual(self.refresh(), (True, [None]))
+
+        MentorProfile.objects.filter(pk=self.profile.pk).update(is_verified=False)
+        self.assertEqual(self.refresh(), (True, [None]))
+        self.assertFalse(MentorRecommendation.objects.exists())
+
+    def test_run_without_recommendations_still_advances(self):
+        MentorRecommendation.objects.all().delete()
+        SearchLog.objects.all().delete()
+        self.assertEqual(self.refresh(), (True, [None]))
+        # Aucune recommandation écrite : la passe suivante reste incrémentale
+        self.assertEqual(self.refresh(), (False, []))
+
+
+class MentorRatingTests(TestCase):
+    """Notes dénormalisées tenues par les signaux de MentorReview = recompute_ratings"""
+
+    RATING_FIELDS = ['rating', 'reviews_count', 'rating_sum', 'ranking_score'] + [
+        f'rating_count_{value}' for value in range(1, 6)
+    ]
+
+    def setUp(self):
+        mentor = User.objects.create_user(email='mentor@test.io', password='x', role='MENTOR')
+        self.profile = MentorProfile.objects.create(user=mentor, is_verified=True)
+        self.students = [User.objects.create_user(email=f'etudiant{i}@test.io', password='x') for i in range(3)]
+
+    def ratings(self):
+        return MentorProfile.objects.filter(pk=self.profile.pk).values(*self.RATING_FIELDS).get()
+
+    def assertMatchesRecompute(self, histogram):
+        maintained = self.ratings()
+        MentorProfile.recompute_ratings(MentorProfile.objects.filter(pk=self.profile.pk))
+        self.assertEqual(maintained, self.ratings())
+
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.rating_histogram, {str(value): histogram.get(value, 0) for value in range(1, 6)})
+        self.assertEqual(self.profile.rating_sum, sum(value * count for value, count in histogram.items()))
+
+    def test_signals_match_recompute(self):
+        reviews = [
+            MentorReview.objects.create(mentor_profile=self.profile, student=student, rating=rating)
+            for student, rating in zip(self.students, (5, 4, 4))
+        ]
+        self.assertMatchesRecompute({5: 1, 4: 2})
+
+        reviews[1].rating = 2
+        reviews[1].save()
+        self.assertMatchesRecompute({5: 1, 4: 1, 2: 1})
+
+        reviews[0].delete()
+        self.assertMatchesRecompute({4: 1, 2: 1})
+
+        reviews[0].restore()
+        self.assertMatchesRecompute({5: 1, 4: 1, 2: 1})
+
+        reviews[2].delete(hard=True)
+        self.assertMatchesRecompute({5: 1, 2: 1})
+
+        # Supprimer définitivement un avis déjà retiré ne le décompte pas deux fois
+        reviews[0].delete()
+        reviews[0].delete(hard=True)
+        self.assertMatchesRecompute({2: 1})
+
+    def test_apply_review_does_not_touch_updated_at(self):
+        updated_at = MentorProfile.objects.get(pk=self.profile.pk).updated_at
+        MentorReview.objects.create(mentor_profile=self.profile, student=self.students[0], rating=5)
+        self.assertEqual(MentorProfile.objects.get(pk=self.profile.pk).updated_at, updated_at)
+
+
+@override_settings(AI_PROVIDER='fake')
+class MentorAIReviewClaimTests(TestCase):
+    """Une analyse n'est prise que depuis un état en attente, en échec ou bloqué"""
+
+    def setUp(self):
+        from apps.ai_tools.providers import FakeBackend, reset_providers
+
+        reset_providers()
+        self.addCleanup(reset_providers)
+        self.calls = []
+
+        def handler(prompt, model):
+            self.calls.append(prompt)
+            return '{"score": 80, "recommendation": "Profil solide", "validated": true}'
+
+        patcher = mock.patch.object(FakeBackend, 'handler', staticmethod(handler))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user(email='candidat@test.io', password='x')
+
+    def application(self, ai_status, started_minutes_ago=None):
+        started_at = None
+        if started_minutes_ago is not None:
+            started_at = timezone.now() - datetime.timedelta(minutes=started_minutes_ago)
+        application = MentorApplication.objects.create(user=self.user, cv_file='', bio='Bio')
+        MentorApplication.objects.filter(pk=application.pk).update(ai_status=ai_status, ai_started_at=started_at)
+        return application.pk
+
+    def test_claims_only_pending_failed_or_stuck_reviews(self):
+        stuck_minutes = settings.MENTOR_REVIEW['STUCK_AFTER'] // 60 + 1
+        cases = [
+            ('PENDING', None, True), ('QUEUED', None, True), ('FAILED', None, True),
+            ('PROCESSING', stuck_minutes, True), ('PROCESSING', 1, False), ('COMPLETED', None, False),
+        ]
+        for ai_status, started_minutes_ago, claimed in cases:
+            with self.subTest(ai_status=ai_status, started_minutes_ago=started_minutes_ago):
+                application_id = self.application(ai_status, started_minutes_ago)
+                calls = len(self.calls)
+
+                self.assertEqual(MentorAIRewiewService.review_application(application_id), claimed)
+
+                application = MentorApplication.objects.get(pk=application_id)
+                self.assertEqual(len(self.calls) - calls, int(claimed))
+                self.assertEqual(application.ai_status, 'COMPLETED' if claimed else ai_status)
+                self.assertEqual(application.ai_attempts, int(claimed))
+
+
+class AvailabilityBitmapTests(TestCase):
+    """Disponibilités compilées : bitmaps, créneaux libres et invalidation"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='slots@edulab.test', password='x', role='MENTOR')
+        self.profile = MentorProfile.objects.create(user=self.user, is_verified=True)
+        self.student = User.objects.create_user(email='booker@edulab.test', password='x')
+        today = timezone.localdate()
+        # Lundi dans deux semaines au moins : plage entièrement future
+        self.monday = today + datetime.timedelta(days=14 - today.weekday())
+
+    def weekly(self, day, start, end):
+        with self.captureOnCommitCallbacks(execute=True):
+            return MentorAvailability.objects.create(
+                mentor_profile=self.profile, day_of_week=day, start_time=start, end_time=end
+            )
+
+    def specific(self, day, start, end):
+        with self.captureOnCommitCallbacks(execute=True):
+            return MentorSpecificDateAvailability.objects.create(
+                mentor_profile=self.profile, specific_date=day, start_time=start, end_time=end
+            )
+
+    def book(self, day, time, status='PENDING'):
+        return Booking.objects.create(student=self.student, mentor=self.user, date=day, time=time, status=status)
+
+    def slots(self, start_date, days=1):
+        self.profile = MentorProfile.objects.get(pk=self.profile.pk)
+        end_date = start_date + datetime.timedelta(days=days - 1)
+        return AvailabilityBitmapService.available_slots(self.profile, start_date, end_date)
+
+    def grid(self, start_date, days):
+        compiled = MentorCompiledAvailability.objects.get(mentor_profile=self.profile)
+        return CompiledAvailability.from_model(compiled).for_range(start_date, days)
+
+    def test_pack_unpack_and_weekdays(self):
+        bits = np.random.default_rng(1).random((7, SLOTS_PER_DAY)) < 0.5
+        self.assertTrue((_unpack(_pack(bits), bits.shape) == bits).all())
+
+        self.assertEqual(
+            weekday_indexes(self.monday - datetime.timedelta(days=3), 10).tolist(),
+            [(self.monday + datetime.timedelta(days=offset)).weekday() for offset in range(-3, 7)]
+        )
+
+    def test_compile_weekly_rules_and_specific_dates(self):
+        # Plage partielle : seuls les quarts d'heure entièrement couverts comptent
+        self.weekly('MONDAY', datetime.time(9, 10), datetime.time(11, 0))
+        self.specific(self.monday + datetime.timedelta(days=1), datetime.time(14), datetime.time(15, 30))
+        # Date spécifique un lundi : s'ajoute à la règle hebdomadaire sans la remplacer
+        self.specific(self.monday + datetime.timedelta(days=7), datetime.time(18), datetime.time(19))
+        # Date passée : ignorée
+        self.specific(timezone.localdate() - datetime.timedelta(days=1), datetime.time(8), datetime.time(9))
+
+        grid = self.grid(self.monday, 8)
+
+        def open_slots(day):
+            return [slot_label(i) for i in np.flatnonzero(grid[day])]
+
+        monday_slots = [slot_label(i) for i in range(37, 44)]
+        self.assertEqual(open_slots(0), monday_slots)
+        self.assertEqual(open_slots(1), [slot_label(i) for i in range(56, 62)])
+        self.assertEqual([open_slots(day) for day in range(2, 7)], [[]] * 5)
+        self.assertEqual(open_slots(7), monday_slots + ['18:00', '18:15', '18:30', '18:45'])
+        compiled = MentorCompiledAvailability.objects.get(mentor_profile=self.profile)
+        self.assertEqual(len(compiled.date_bitmaps), 2)
+
+    def test_free_session_starts_follow_the_hourly_grid(self):
+        available = np.zeros((1, SLOTS_PER_DAY), dtype=bool)
+        available[0, 37:48] = True  # 09:15 - 12:00
+        busy = np.zeros_like(available)
+
+        starts = AvailabilityBitmapService.free_session_starts(available, busy)
+        self.assertEqual([slot_label(i) for i in np.flatnonzero(starts[0])], ['09:15', '10:15'])
+
+        busy[0, 44] = True  # 11:00 - 11:15 occupé
+        starts = AvailabilityBitmapService.free_session_starts(available, busy)
+        self.assertEqual([slot_label(i) for i in np.flatnonzero(starts[0])], ['09:15'])
+
+    def test_busy_grid(self):
+        self.book(self.monday, datetime.time(10, 30))
+        self.book(self.monday + datetime.timedelta(days=1), datetime.time(23, 30))
+        self.book(self.monday, datetime.time(14), status='CANCELLED')
+        self.book(self.monday + datetime.timedelta(days=2), datetime.time(8))  # hors plage
+
+        busy = AvailabilityBitmapService.busy_grid(self.user.id, self.monday, 2)
+
+        self.assertEqual(busy.shape, (2, SLOTS_PER_DAY))
+        self.assertEqual(np.flatnonzero(busy[0]).tolist(), [42, 43, 44, 45])
+        # Session tronquée à minuit
+        self.assertEqual(np.flatnonzero(busy[1]).tolist(), [94, 95])
+
+    def test_booking_blocks_its_full_hour(self):
+        self.weekly('MONDAY', datetime.time(9), datetime.time(12))
+        self.assertEqual(self.slots(self.monday), {self.monday.isoformat(): ['09:00', '10:00', '11:00']})
+
+        self.book(self.monday, datetime.time(10, 30))
+        self.book(self.monday, datetime.time(9), status='REJECTED')
+
+        # 10:00 et 11:00 chevauchent la session 10:30 - 11:30
+        self.assertEqual(self.slots(self.monday), {self.monday.isoformat(): ['09:00']})
+
+    def test_today_excludes_started_slots(self):
+        today = timezone.localdate()
+        self.weekly(WEEKDAYS[today.weekday()], datetime.time(9), datetime.time(12))
+        AvailabilityBitmapService.compile(self.profile.id)
+        now = timezone.localtime().replace(hour=10, minute=5)
+
+        with mock.patch('django.utils.timezone.localtime', return_value=now):
+            self.assertEqual(self.slots(today), {today.isoformat(): ['11:00']})
+
+    def test_signals_recompile_after_edits(self):
+        rule = self.weekly('MONDAY', datetime.time(9), datetime.time(10))
+        self.assertEqual(self.slots(self.monday), {self.monday.isoformat(): ['09:00']})
+
+        rule.end_time = datetime.time(11)
+        with self.captureOnCommitCallbacks(execute=True):
+            rule.save()
+        self.assertEqual(self.slots(self.monday), {self.monday.isoformat(): ['09:00', '10:00']})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            rule.delete()
+        self.assertEqual(self.slots(self.monday), {})
+        self.assertTrue(MentorCompiledAvailability.objects.filter(mentor_profile=self.profile).exists())
+
+    def test_sync_availabilities_recompiles_only_on_change(self):
+        recurring = [('MONDAY', datetime.time(9), datetime.time(10))]
+        specific = [(self.monday + datetime.timedelta(days=2), datetime.time(15), datetime.time(16))]
+        with self.captureOnCommitCallbacks(execute=True):
+            MentorProfileUpdateService.sync_availabilities(self.profile, recurring, specific, timezone.now())
+        self.assertEqual(self.slots(self.monday, 3), {
+            self.monday.isoformat(): ['09:00'],
+            (self.monday + datetime.timedelta(days=2)).isoformat(): ['15:00'],
+        })
+
+        compiled_at = MentorCompiledAvailability.objects.get(mentor_profile=self.profile).compiled_at
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            changed, *_ = MentorProfileUpdateService.sync_availabilities(
+                self.profile, recurring, specific, timezone.now()
+            )
+        self.assertFalse(changed)
+        self.assertEqual(callbacks, [])
+        self.assertEqual(MentorCompiledAvailability.objects.get(mentor_profile=self.profile).compiled_at, compiled_at)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            MentorProfileUpdateService.sync_availabilities(
+                self.profile, [('MONDAY', datetime.time(14), datetime.time(15))], [], timezone.now()
+            )
+        self.assertEqual(self.slots(self.monday, 3), {self.monday.isoformat(): ['14:00']})
+
+
+class MentorAvailableEndpointTests(TestCase):
+    """GET /api/mentors/available/ : bitmaps précompilés, requêtes en nombre constant"""
+
+    def setUp(self):
+        today = timezone.localdate()
+        self.monday = today + datetime.timedelta(days=14 - today.weekday())
+        self.student = User.objects.create_user(email='seeker@edulab.test', password='x')
+        self.mentors = {}
+        for name, day in (('free', 'MONDAY'), ('booked', 'MONDAY'), ('stale', 'MONDAY'), ('tuesday', 'TUESDAY')):
+            self.add_mentor(name, day)
+        Booking.objects.create(student=self.student, mentor=self.mentors['booked'].user, date=self.monday,
+                               time=datetime.time(10))
+        # Bitmap invalidé et pas encore reconstruit
+        MentorCompiledAvailability.objects.filter(mentor_profile=self.mentors['stale']).delete()
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def add_mentor(self, name, day):
+        user = User.objects.create_user(email=f'{name}@edulab.test', password='x', role='MENTOR')
+        profile = MentorProfile.objects.create(user=user, is_verified=True)
+        MentorBio.objects.create(mentor_profile=profile, bio=f'Mentor {name}', is_current=True)
+        MentorSpecialty.objects.create(mentor_profile=profile, specialty='Maths')
+        with self.captureOnCommitCallbacks(execute=True):
+            MentorAvailability.objects.create(
+                mentor_profile=profile, day_of_week=day, start_time=datetime.time(9), end_time=datetime.time(12)
+            )
+        self.mentors[name] = profile
+
+    def get(self):
+        day = self.monday.isoformat()
+        return self.client.get(
+            f'/api/mentors/available/?start={day}T09:00&end={day}T12:00', secure=True, SERVER_NAME='localhost'
+        )
+
+    def test_free_mentors_without_compiling_in_the_request(self):
+        # Candidats, réservations ; puis bios, spécialités, profils, avatars, pays, universités, candidatures
+        with mock.patch('apps.mentors.tasks.compile_availabilities.delay') as delay:
+            with self.assertNumQueries(9):
+                response = self.get()
+
+        self.assertEqual(response.status_code, 200)
+        slots = {item['user']['email']: item['slots'] for item in response.data['results']}
+        self.assertEqual(slots, {
+            'free@edulab.test': ['09:00', '10:00', '11:00'],
+            'booked@edulab.test': ['09:00', '11:00'],
+        })
+        self.assertEqual(response.data['results'][0]['bio'][:6], 'Mentor')
+        self.assertEqual(response.data['results'][0]['specialties'], ['Maths'])
+        delay.assert_called_once_with([self.mentors['stale'].id])
+        self.assertFalse(MentorCompiledAvailability.objects.filter(mentor_profile=self.mentors['stale']).exists())
+
+        # Compilé hors requête : le mentor apparaît, sans requête de plus
+        AvailabilityBitmapService.compile_missing()
+        self.add_mentor('late', 'MONDAY')
+        with mock.patch('apps.mentors.tasks.compile_availabilities.delay') as delay:
+            with self.assertNumQueries(9):
+                response = self.get()
+        self.assertEqual(len(response.data['results']), 4)
+        delay.assert_not_called()
+
+
+class MentorProfilePurgeTests(TestCase):
+    """purge_superseded : lignes remplacées avant la limite supprimées par lots, le reste conservé"""
+
+    def setUp(self):
+        user = User.objects.create_user(email='history@edulab.test', password='x', role='MENTOR')
+        self.profile = MentorProfile.objects.create(user=user, is_verified=True)
+        now = timezone.now()
+        self.old = now - datetime.timedelta(days=settings.MENTOR_PROFILE_HISTORY_DAYS + 1)
+        self.recent = now - datetime.timedelta(days=settings.MENTOR_PROFILE_HISTORY_DAYS - 1)
+
+        self.kept = []
+        for i in range(5):
+            self.row(MentorSpecialty, self.old, specialty=f'Ancienne {i}', is_active=False)
+        self.kept.append(self.row(MentorSpecialty, self.recent, specialty='Récente', is_active=False))
+        self.kept.append(self.row(MentorSpecialty, self.old, specialty='Active'))
+        self.row(MentorBio, self.old, bio='Ancienne bio', is_current=False)
+        self.kept.append(self.row(MentorBio, self.old, bio='Bio courante', is_current=True))
+        self.row(MentorAvailability, self.old, day_of_week='MONDAY', start_time=datetime.time(9),
+                 end_time=datetime.time(10), is_active=False)
+
+    def row(self, model, updated_at, **fields):
+        obj = model.objects.create(mentor_profile=self.profile, **fields)
+        # updated_at est en auto_now : date forcée après création
+        model.objects.filter(pk=obj.pk).update(updated_at=updated_at)
+        return obj
+
+    def remaining(self):
+        return sorted(
+            (model.__name__, obj.pk)
+            for model in (MentorSpecialty, MentorBio, MentorAvailability)
+            for obj in model.objects.filter(mentor_profile=self.profile)
+        )
+
+    def test_purge_respects_cutoff_in_batches(self):
+        with CaptureQueriesContext(connection) as queries:
+            deleted = MentorProfileUpdateService.purge_superseded(batch_size=2)
+
+        self.assertEqual(deleted, 7)
+        self.assertEqual(self.remaining(), sorted((type(obj).__name__, obj.pk) for obj in self.kept))
+        # 5 spécialités remplacées : 3 lots de 2 au plus
+        specialty_deletes = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('DELETE') and 'mentor_specialties' in query['sql']
+        ]
+        self.assertEqual(len(specialty_deletes), 3)
+
+        self.assertEqual(MentorProfileUpdateService.purge_superseded(batch_size=2), 0)
+        # Limite plus courte : les lignes récentes partent aussi
+        self.assertEqual(
+            MentorProfileUpdateService.purge_superseded(older_than_days=settings.MENTOR_PROFILE_HISTORY_DAYS - 2), 1
+        )
@@ -18,6 +18,8 @@ Endpoints disponibles:
 - GET /api/mentors/{id}/ (détail)
 - GET /api/mentors/my_profile/
 - PATCH /api/mentors/my_profile/
+- GET /api/mentors/recommended/
+- GET /api/mentors/available/?start=&end=&specialty=&country=
 - GET /api/mentors/{id}/reviews/
 """
 
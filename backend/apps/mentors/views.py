@@ -21,8 +21,8 @@ class MentorViewSet(HashIdMixin, viewsets.ReadOnlyModelViewSet):
     queryset = MentorProfile.objects.filter(is_active=True, is_verified=True)
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['user__email', 'bios__bio']
-    ordering_fields = ['rating', 'reviews_count', 'created_at']
-    ordering = ['-rating']
+    ordering_fields = ['ranking_score', 'rating', 'reviews_count', 'created_at']
+    ordering = ['-ranking_score']
     
     def get_serializer_class(self):
         if self.action == 'retrieve':
@@ -65,13 +65,12 @@ class MentorViewSet(HashIdMixin, viewsets.ReadOnlyModelViewSet):
             )
         
         if request.method == 'GET':
-            logger.info(f'📖 [VIEW] GET my_profile for user: {request.user.email}')
+            logger.debug(f'📖 [VIEW] GET my_profile for user: {request.user.email}')
             serializer = MentorProfileDetailSerializer(mentor_profile)
             return Response(serializer.data)
         
         elif request.method == 'PATCH':
-            logger.info(f'✏️ [VIEW] PATCH my_profile for user: {request.user.email}')
-            logger.info(f'📥 [VIEW] Request data: {request.data}')
+            logger.debug(f'✏️ [VIEW] PATCH my_profile for user: {request.user.email} ({", ".join(request.data)})')
             
             serializer = MentorProfileUpdateSerializer(
                 mentor_profile,
@@ -81,9 +80,92 @@ class MentorViewSet(HashIdMixin, viewsets.ReadOnlyModelViewSet):
             serializer.is_valid(raise_exception=True)
             serializer.save()
             
-            logger.info(f'✅ [VIEW] Profile updated successfully')
             return Response(MentorProfileDetailSerializer(mentor_profile).data)
     
+    @action(detail=False, methods=['get'])
+    def recommended(self, request):
+        """GET /api/mentors/recommended/ - Mentors recommandés pour l'utilisateur"""
+        from django.conf import settings
+        from apps.mentors.models import MentorRecommendation
+
+        recommendations = MentorRecommendation.objects.filter(
+            student=request.user,
+            mentor_profile__is_active=True,
+            mentor_profile__is_verified=True
+        ).select_related('mentor_profile__user').order_by('rank')
+
+        mentors = []
+        for recommendation in recommendations:
+            recommendation.mentor_profile.recommendation_score = recommendation.score
+            mentors.append(recommendation.mentor_profile)
+
+        if not mentors:
+            # Pas encore de signaux d'intérêt : repli sur les mieux notés
+            mentors = list(
+                MentorProfile.objects.filter(is_active=True, is_verified=True)
+                .exclude(user=request.user)
+                .select_related('user')
+                .order_by('-ranking_score')[:settings.MENTOR_RECOMMENDATIONS_TOP_K]
+            )
+
+        data = MentorProfileListSerializer(mentors, many=True).data
+        for item, mentor in zip(data, mentors):
+            item['score'] = getattr(mentor, 'recommendation_score', None)
+        return Response(data)
+
+    @action(detail=False, methods=['get'])
+    def available(self, request):
+        """
+        GET /api/mentors/available/?start=YYYY-MM-DDTHH:MM&end=YYYY-MM-DDTHH:MM&specialty=&country=
+        Mentors ayant une session libre dans la fenêtre (1h par défaut)
+        """
+        from datetime import timedelta
+        from django.utils import timezone
+        from django.utils.dateparse import parse_datetime
+        from django.db.models import prefetch_related_objects
+        from apps.mentors.availability import find_free_mentors
+
+        start = parse_datetime(request.query_params.get('start') or '')
+        if start is None:
+            return Response(
+                {'error': 'Paramètre start requis (YYYY-MM-DDTHH:MM)'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        end_param = request.query_params.get('end')
+        end = parse_datetime(end_param) if end_param else start + timedelta(hours=1)
+        if end is None:
+            return Response(
+                {'error': 'Paramètre end invalide (YYYY-MM-DDTHH:MM)'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Les réservations sont stockées en heure locale
+        if timezone.is_aware(start):
+            start = timezone.localtime(start)
+        if timezone.is_aware(end):
+            end = timezone.localtime(end)
+        if end <= start or end.date() != start.date():
+            return Response(
+                {'error': 'La fenêtre doit être sur une seule journée et end > start'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if start.date() < timezone.localdate():
+            return Response([])
+
+        queryset = self.get_queryset().exclude(user=request.user)
+        matches = find_free_mentors(queryset, start.date(), start.time(), end.time())
+
+        page = self.paginate_queryset(matches)
+        matches = page if page is not None else matches
+        mentors = [mentor for mentor, _ in matches]
+        prefetch_related_objects(mentors, *MentorProfileListSerializer.prefetch_lookups())
+        data = MentorProfileListSerializer(mentors, many=True).data
+        for item, (_, slots) in zip(data, matches):
+            item['slots'] = slots
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
     @action(detail=True, methods=['get'])
     def reviews(self, request, pk=None):
         """GET /api/mentors/{id}/reviews/"""
@@ -129,8 +211,10 @@ class MentorViewSet(HashIdMixin, viewsets.ReadOnlyModelViewSet):
     @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated])
     def apply(self, request):
         """POST /api/mentors/apply/"""
+        from django.db import transaction
         from apps.mentors.models import MentorApplication
         from apps.mentors.serializers import MentorApplicationSerializer
+        from apps.mentors.services import MentorOnboardingService
         
         # Vérifier si l'utilisateur a déjà une demande en cours
         if MentorApplication.objects.filter(user=request.user, status='PENDING').exists():
@@ -141,94 +225,30 @@ class MentorViewSet(HashIdMixin, viewsets.ReadOnlyModelViewSet):
             
         serializer = MentorApplicationSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        application = serializer.save(user=request.user)
-        
-        # =========================================================
-        # Création automatique du profil Mentor (Non vérifié)
-        # =========================================================
-        from apps.mentors.models import (
-            MentorProfile, MentorBio, MentorSpecialty, 
-            MentorAvailability, MentorSocial
-        )
-        from apps.users.models import UserUniversity
         
-        # Créer ou récupérer le profil mentor
-        mentor_profile, created = MentorProfile.objects.get_or_create(user=request.user)
-        
-        # S'assurer qu'il est non vérifié par défaut (en attente de validation admin)
-        if not mentor_profile.is_verified:
-            mentor_profile.is_verified = False
-            mentor_profile.save()
-            
-        # 1. Bio
-        if application.bio:
-            # Désactiver les anciennes bios
-            mentor_profile.bios.filter(is_current=True).update(is_current=False)
-            MentorBio.objects.create(
-                mentor_profile=mentor_profile,
-                bio=application.bio,
-                is_current=True
-            )
-            
-        # 2. Spécialités
-        if application.specialties:
-            mentor_profile.specialties.filter(is_active=True).update(is_active=False)
-            for spec in application.specialties:
-                MentorSpecialty.objects.create(
-                    mentor_profile=mentor_profile,
-                    specialty=spec
-                )
-                
-        # 3. Disponibilités
-        if application.availability:
-            mentor_profile.availabilities.filter(is_active=True).update(is_active=False)
-            for slot in application.availability:
-                # Mapping 'day' -> 'day_of_week' si nécessaire
-                day = slot.get('day') or slot.get('day_of_week')
-                if day:
-                    MentorAvailability.objects.create(
-                        mentor_profile=mentor_profile,
-                        day_of_week=day,
-                        start_time=slot.get('startTime') or slot.get('start_time'),
-                        end_time=slot.get('endTime') or slot.get('end_time')
-                    )
-                    
-        # 4. Réseaux sociaux
-        mentor_profile.socials.filter(is_active=True).update(is_active=False)
-        if application.linkedin:
-            MentorSocial.objects.create(mentor_profile=mentor_profile, platform='LINKEDIN', url=application.linkedin)
-        if application.twitter:
-            MentorSocial.objects.create(mentor_profile=mentor_profile, platform='TWITTER', url=application.twitter)
-        if application.website:
-            MentorSocial.objects.create(mentor_profile=mentor_profile, platform='WEBSITE', url=application.website)
-            
-        # 5. Université (Mise à jour du profil utilisateur)
-        if application.university:
-            user_profile = request.user.profiles.filter(is_current=True).first()
-            if user_profile:
-                user_profile.universities.filter(is_current=True).update(is_current=False)
-                UserUniversity.objects.create(
-                    profile=user_profile, 
-                    university=application.university,
-                    is_current=True
-                )
+        # Candidature et profil mentor (non vérifié) : tout ou rien
+        with transaction.atomic():
+            application = serializer.save(user=request.user)
+            mentor_profile = MentorOnboardingService.onboard(request.user, application)
         
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(
+            {**serializer.data, 'mentor_profile': MentorProfileDetailSerializer(mentor_profile).data},
+            status=status.HTTP_201_CREATED
+        )
 
     @action(detail=True, methods=['get'])
     def available_slots(self, request, pk=None):
         """GET /api/mentors/{id}/available_slots/?start_date=YYYY-MM-DD&end_date=YYYY-MM-DD"""
-        from datetime import datetime, timedelta, date, time
-        from apps.bookings.models import Booking
+        from datetime import datetime, timedelta
+        from django.utils import timezone
         
         mentor_profile = self.get_object()
-        mentor_user = mentor_profile.user
         
         # Paramètres de date
         start_date_str = request.query_params.get('start_date')
         end_date_str = request.query_params.get('end_date')
         
-        today = date.today()
+        today = timezone.localdate()
         
         if start_date_str:
             try:
@@ -250,77 +270,9 @@ class MentorViewSet(HashIdMixin, viewsets.ReadOnlyModelViewSet):
         if start_date < today:
             start_date = today
             
-        # Récupérer les disponibilités théoriques (Jours de la semaine)
-        # Structure: {'MONDAY': [{'start': time, 'end': time}, ...], ...}
-        availabilities = mentor_profile.availabilities.filter(is_active=True)
-        weekly_slots = {}
-        for avail in availabilities:
-            if avail.day_of_week not in weekly_slots:
-                weekly_slots[avail.day_of_week] = []
-            weekly_slots[avail.day_of_week].append({
-                'start': avail.start_time,
-                'end': avail.end_time
-            })
-            
-        # Récupérer les réservations existantes (conflits)
-        existing_bookings = Booking.objects.filter(
-            mentor=mentor_user,
-            date__range=[start_date, end_date],
-            is_active=True
-        ).exclude(status__in=['CANCELLED', 'REJECTED'])
-        
-        # Organiser les bookings par date et heure pour recherche rapide
-        busy_slots = {}
-        for booking in existing_bookings:
-            d_str = booking.date.isoformat()
-            if d_str not in busy_slots:
-                busy_slots[d_str] = []
-            # On suppose que le booking bloque l'heure exacte de début
-            busy_slots[d_str].append(booking.time)
-            
-        # Générer les créneaux disponibles
-        results = {}
+        # Disponibilités compilées (hebdomadaires + dates spécifiques) moins les réservations
+        from apps.mentors.availability import AvailabilityBitmapService
+        results = AvailabilityBitmapService.available_slots(mentor_profile, start_date, end_date)
         
-        # Mapping jour int -> code
-        WEEKDAYS = ['MONDAY', 'TUESDAY', 'WEDNESDAY', 'THURSDAY', 'FRIDAY', 'SATURDAY', 'SUNDAY']
-        
-        current_date = start_date
-        while current_date <= end_date:
-            day_code = WEEKDAYS[current_date.weekday()]
-            date_str = current_date.isoformat()
-            day_slots = []
-            
-            if day_code in weekly_slots:
-                for rule in weekly_slots[day_code]:
-                    # Générer des créneaux de 1h entre start et end
-                    # Convertir en datetime pour itération facile
-                    slot_start = datetime.combine(current_date, rule['start'])
-                    slot_end = datetime.combine(current_date, rule['end'])
-                    
-                    while slot_start + timedelta(hours=1) <= slot_end:
-                        slot_time = slot_start.time()
-                        
-                        # Vérifier si ce créneau est déjà pris
-                        is_taken = False
-                        if date_str in busy_slots:
-                            if slot_time in busy_slots[date_str]:
-                                is_taken = True
-                                
-                        # Vérifier si le créneau est dans le passé (pour aujourd'hui)
-                        is_past = False
-                        if current_date == today:
-                            if slot_time <= datetime.now().time():
-                                is_past = True
-                                
-                        if not is_taken and not is_past:
-                            day_slots.append(slot_time.strftime('%H:%M'))
-                            
-                        slot_start += timedelta(hours=1)
-            
-            if day_slots:
-                results[date_str] = sorted(list(set(day_slots))) # Dedup et tri
-                
-            current_date += timedelta(days=1)
-            
         return Response(results)
 
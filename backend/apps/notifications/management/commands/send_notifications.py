@@ -2,8 +2,8 @@ from django.core.management.base import BaseCommand
 from django.utils import timezone
 from datetime import timedelta
 from apps.bookings.models import Booking
-from apps.mentors.models import MentorProfile
-from apps.users.models import User
+from apps.mentors.models import MentorRecommendation
+from apps.users.models import User, UserProfile
 from apps.notifications.services import NotificationService
 import random
 
@@ -53,19 +53,36 @@ class Command(BaseCommand):
         self.stdout.write("Sending mentor recommendations...")
         
         users = User.objects.filter(email=target_email) if target_email else User.objects.filter(role='STUDENT')
-        mentors = list(MentorProfile.objects.filter(is_active=True))
         
-        if not mentors:
-            self.stdout.write("No mentors available for recommendation.")
+        # Meilleure recommandation pré-calculée par étudiant (voir apps.mentors.recommendations)
+        top_recommendations = MentorRecommendation.objects.filter(
+            rank=1,
+            student__in=users,
+            mentor_profile__is_active=True,
+            mentor_profile__is_verified=True
+        ).select_related('student', 'mentor_profile__user')
+        
+        recommendations = list(top_recommendations)
+        if not recommendations:
+            self.stdout.write("No mentor recommendations available.")
             return
+        
+        # Noms des mentors chargés en une seule requête
+        mentor_user_ids = {r.mentor_profile.user_id for r in recommendations}
+        mentor_names = dict(
+            UserProfile.objects.filter(user_id__in=mentor_user_ids, is_current=True)
+            .values_list('user_id', 'name')
+        )
 
         count = 0
-        for user in users:
-            # Pick a random mentor
-            mentor = random.choice(mentors)
-            if mentor.user != user: # Don't recommend self
-                NotificationService.create_mentor_recommendation(user, mentor)
-                count += 1
+        for recommendation in recommendations:
+            mentor = recommendation.mentor_profile
+            NotificationService.create_mentor_recommendation(
+                recommendation.student,
+                mentor,
+                mentor_name=mentor_names.get(mentor.user_id, mentor.user.email)
+            )
+            count += 1
                 
         self.stdout.write(f"Sent {count} recommendations.")
 
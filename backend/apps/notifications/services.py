@@ -252,7 +252,7 @@ class NotificationService:
         return [notif_student, notif_mentor]
 
     @staticmethod
-    def create_mentor_recommendation(user, mentor_profile):
+    def create_mentor_recommendation(user, mentor_profile, mentor_name=None):
         """Un nouveau profil de mentor pourrait vous intéresser"""
         notif = Notification.objects.create(
             user=user,
@@ -265,7 +265,9 @@ class NotificationService:
             title='Suggestion de mentor'
         )
         
-        mentor_name = mentor_profile.user.profiles.filter(is_current=True).first().name
+        if mentor_name is None:
+            profile = mentor_profile.user.profiles.filter(is_current=True).first()
+            mentor_name = profile.name if profile else mentor_profile.user.email
         NotificationMessage.objects.create(
             notification=notif,
             message=f'Un nouveau profil de mentor pourrait vous intéresser : {mentor_name}. Jetez un œil !'
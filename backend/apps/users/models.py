@@ -54,22 +54,10 @@ class User(AbstractBaseUser, PermissionsMixin, TimestampMixin, SoftDeleteMixin):
         return self.email
     
     def add_points(self, points, reason=''):
-        """Ajouter des points avec traçabilité"""
-        from apps.gamification.models import UserPointsHistory
+        """Ajouter des points avec traçabilité (voir PointsLedger)"""
+        from apps.gamification.services import PointsLedger
         
-        previous_total = self.points
-        self.points += points
-        self.save()
-        
-        UserPointsHistory.objects.create(
-            user=self,
-            points_change=points,
-            previous_total=previous_total,
-            new_total=self.points,
-            reason=reason
-        )
-        
-        return self.points
+        return PointsLedger.award(self, points, reason)
 
 class UserProfile(TimestampMixin, VersionedFieldMixin):
     """Profil utilisateur versionné"""
@@ -15,6 +15,42 @@ from apps.users.models import (
 )
 from apps.core.serializers import HashIdField
 
+
+def user_prefetch_lookups(prefix='', applications=True):
+    """
+    Prefetch utilisés par UserSerializer, pour une relation vers User
+    (ex: prefix='student__'). Le nombre de requêtes ne dépend plus du nombre d'utilisateurs.
+    applications=False si le statut de candidature mentor n'est pas affiché.
+    """
+    from django.db.models import Prefetch
+    from apps.mentors.models import MentorApplication
+
+    profiles = UserProfile.objects.filter(is_current=True).order_by('pk').prefetch_related(
+        Prefetch('avatars', queryset=UserAvatar.objects.filter(is_current=True).order_by('pk'),
+                 to_attr='current_avatars'),
+        Prefetch('countries', queryset=UserCountry.objects.filter(is_current=True).order_by('pk'),
+                 to_attr='current_countries'),
+        Prefetch('universities', queryset=UserUniversity.objects.filter(is_current=True).order_by('pk'),
+                 to_attr='current_universities'),
+    )
+    lookups = [Prefetch(f'{prefix}profiles', queryset=profiles, to_attr='current_profiles')]
+    if applications:
+        lookups.append(Prefetch(
+            f'{prefix}mentor_applications',
+            queryset=MentorApplication.objects.order_by('-created_at').only('id', 'user_id', 'status', 'created_at'),
+            to_attr='latest_mentor_applications'
+        ))
+    return lookups
+
+
+def first_current(obj, prefetched, related):
+    """Premier élément courant, depuis le prefetch s'il existe"""
+    if hasattr(obj, prefetched):
+        items = getattr(obj, prefetched)
+        return items[0] if items else None
+    return getattr(obj, related).filter(is_current=True).first()
+
+
 class UserProfileDetailSerializer(serializers.ModelSerializer):
     """Détails complets du profil"""
     name = serializers.CharField()
@@ -27,15 +63,15 @@ class UserProfileDetailSerializer(serializers.ModelSerializer):
         fields = ['name', 'avatar', 'country', 'university', 'public_key', 'encrypted_private_key']
     
     def get_avatar(self, obj):
-        avatar = obj.avatars.filter(is_current=True).first()
+        avatar = first_current(obj, 'current_avatars', 'avatars')
         return avatar.avatar_url if avatar else None
     
     def get_country(self, obj):
-        country = obj.countries.filter(is_current=True).first()
+        country = first_current(obj, 'current_countries', 'countries')
         return country.country if country else None
     
     def get_university(self, obj):
-        uni = obj.universities.filter(is_current=True).first()
+        uni = first_current(obj, 'current_universities', 'universities')
         return uni.university if uni else None
 
 class UserSerializer(serializers.ModelSerializer):
@@ -53,13 +89,17 @@ class UserSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'points', 'created_at', 'updated_at']
     
     def get_profile(self, obj):
-        current_profile = obj.profiles.filter(is_current=True).first()
+        current_profile = first_current(obj, 'current_profiles', 'profiles')
         if current_profile:
             return UserProfileDetailSerializer(current_profile).data
         return None
 
     def get_mentor_application_status(self, obj):
-        last_app = obj.mentor_applications.order_by('-created_at').first()
+        if hasattr(obj, 'latest_mentor_applications'):
+            apps = obj.latest_mentor_applications
+            last_app = apps[0] if apps else None
+        else:
+            last_app = obj.mentor_applications.order_by('-created_at').first()
         return last_app.status if last_app else None
 
 class UserRegistrationSerializer(serializers.Serializer):
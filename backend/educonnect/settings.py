@@ -48,7 +48,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',  # Static files
+    'apps.core.middleware.AsyncWhiteNoiseMiddleware',  # Static files (WhiteNoise compatible async)
     'corsheaders.middleware.CorsMiddleware',  # CORS
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -233,6 +233,44 @@ SPECTACULAR_SETTINGS = {
 # AI Configuration
 GEMINI_API_KEY = config('GEMINI_API_KEY', default='')
 OPENAI_API_KEY = config('OPENAI_API_KEY', default='')
+# Fournisseur LLM (apps.ai_tools.providers) : gemini | fake
+AI_PROVIDER = config('AI_PROVIDER', default='gemini')
+AI_PROVIDER_OPTIONS = {
+    'TIMEOUT': config('AI_PROVIDER_TIMEOUT', default=30.0, cast=float),  # par appel (s)
+    'DEADLINE': config('AI_PROVIDER_DEADLINE', default=60.0, cast=float),  # reprises comprises (s)
+    'RETRIES': config('AI_PROVIDER_RETRIES', default=2, cast=int),
+    'BACKOFF_BASE': 0.5,
+    'BACKOFF_MAX': 8.0,
+    'MAX_CONCURRENCY': config('AI_PROVIDER_MAX_CONCURRENCY', default=8, cast=int),  # par processus
+    'ASYNC_MAX_CONCURRENCY': config('AI_PROVIDER_ASYNC_MAX_CONCURRENCY', default=64, cast=int),  # vues asynchrones
+    'ACQUIRE_TIMEOUT': 2.0,  # attente max d'une place libre avant refus
+    'POOL_SIZE': config('AI_PROVIDER_POOL_SIZE', default=16, cast=int),
+    'BREAKER_THRESHOLD': 5,  # échecs consécutifs avant ouverture du disjoncteur
+    'BREAKER_RESET': 30.0,  # durée d'ouverture (s)
+}
+# Cache des réponses du tuteur IA (apps.ai_tools.services.TutorAnswerCache)
+AI_TUTOR_CACHE = {
+    'ENABLED': config('AI_TUTOR_CACHE_ENABLED', default=True, cast=bool),
+    'TTL': config('AI_TUTOR_CACHE_TTL', default=7 * 24 * 3600, cast=int),  # secondes
+    'MAX_ENTRIES': config('AI_TUTOR_CACHE_MAX_ENTRIES', default=10000, cast=int),
+}
+
+# Fenêtre de contexte des sessions du tuteur IA (apps.ai_tools.services.TutorContext)
+AI_TUTOR_CONTEXT = {
+    'MAX_TOKENS': config('AI_TUTOR_CONTEXT_MAX_TOKENS', default=2000, cast=int),  # échanges récents repris tels quels
+    'MAX_TURNS': config('AI_TUTOR_CONTEXT_MAX_TURNS', default=10, cast=int),
+    'SUMMARY_MIN_TURNS': config('AI_TUTOR_SUMMARY_MIN_TURNS', default=4, cast=int),  # échanges sortis avant résumé
+}
+
+# Quotas de tokens IA, seaux à jetons (apps.ai_tools.quotas)
+AI_QUOTA = {
+    'ENABLED': config('AI_QUOTA_ENABLED', default=True, cast=bool),
+    'STORE': config('AI_QUOTA_STORE', default='redis'),  # 'redis' (partagé) ou 'memory' (par processus)
+    'USER_TOKENS': config('AI_QUOTA_USER_TOKENS', default=50000, cast=int),  # capacité du seau d'un utilisateur
+    'USER_PERIOD': config('AI_QUOTA_USER_PERIOD', default=3600, cast=int),  # secondes pour le remplir
+    'GLOBAL_TOKENS': config('AI_QUOTA_GLOBAL_TOKENS', default=500000, cast=int),
+    'GLOBAL_PERIOD': config('AI_QUOTA_GLOBAL_PERIOD', default=60, cast=int),
+}
 
 # Logging
 LOGGING = {
@@ -290,6 +328,41 @@ GAMIFICATION_POINTS = {
     'BOOKING_COMPLETED': 25,
 }
 
+# Registre des points : en mode asynchrone, les gains sont mis en file (Redis)
+# puis appliqués par lots par utilisateur (tâche gamification.apply_points_events)
+POINTS_LEDGER_ASYNC = config('POINTS_LEDGER_ASYNC', default=False, cast=bool)
+
+# Résolution automatique du forum : évaluation IA des réponses par lots
+# (tâche forum.evaluate_pending_answers, déclenchée dès BATCH_SIZE réponses
+# en attente ou au plus tard toutes les MAX_WAIT secondes par Celery Beat)
+FORUM_AUTO_RESOLVE = {
+    'BATCH_SIZE': config('FORUM_AUTO_RESOLVE_BATCH_SIZE', default=10, cast=int),
+    'MAX_WAIT': config('FORUM_AUTO_RESOLVE_MAX_WAIT', default=30, cast=int),
+    'MAX_ATTEMPTS': 3,
+}
+
+# Recommandations de mentors
+MENTOR_RECOMMENDATIONS_TOP_K = config('MENTOR_RECOMMENDATIONS_TOP_K', default=10, cast=int)
+
+# Classement de l'annuaire des mentors (moyenne bayésienne des notes) :
+# chaque mentor est compté comme s'il avait déjà PRIOR_WEIGHT notes à PRIOR_MEAN
+MENTOR_RANKING = {
+    'PRIOR_WEIGHT': config('MENTOR_RANKING_PRIOR_WEIGHT', default=10, cast=int),
+    'PRIOR_MEAN': config('MENTOR_RANKING_PRIOR_MEAN', default=3.5, cast=float),
+}
+
+# Extraction du texte des CV (apps.mentors.extraction.CVTextExtractor)
+MENTOR_CV_EXTRACTION = {
+    'MAX_CHARS': config('MENTOR_CV_MAX_CHARS', default=4000, cast=int),  # texte transmis à l'analyse IA
+    'MAX_PAGES': config('MENTOR_CV_MAX_PAGES', default=10, cast=int),
+    'TIMEOUT': config('MENTOR_CV_TIMEOUT', default=20, cast=int),  # secondes par fichier
+    'SUBPROCESS': config('MENTOR_CV_SUBPROCESS', default=True, cast=bool),  # False : dans le processus courant, sans délai
+}
+
+# Durée de conservation des lignes de profil mentor remplacées (bios, spécialités,
+# disponibilités, réseaux sociaux désactivés), purgées ensuite par Celery Beat
+MENTOR_PROFILE_HISTORY_DAYS = config('MENTOR_PROFILE_HISTORY_DAYS', default=90, cast=int)
+
 BADGE_THRESHOLDS = {
     'FIRST_STEP': {'points': 0, 'action': 'first_question'},
     'CURIOUS': {'points': 100},
@@ -299,6 +372,9 @@ BADGE_THRESHOLDS = {
     'LEGEND': {'points': 5000},
 }
 
+# Redis (files d'attente applicatives, classements)
+REDIS_URL = config('REDIS_URL', default='redis://localhost:6379/1')
+
 # Celery Configuration
 CELERY_BROKER_URL = config('CELERY_BROKER_URL', default='redis://localhost:6379/0')
 CELERY_RESULT_BACKEND = config('CELERY_RESULT_BACKEND', default='redis://localhost:6379/0')
@@ -309,6 +385,19 @@ CELERY_TIMEZONE = TIME_ZONE
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60  # 30 minutes max
 
+# Analyse IA des candidatures mentor (tâche mentors.review_application)
+MENTOR_REVIEW = {
+    'QUEUE': 'mentor_reviews',  # worker dédié, concurrence limitée (voir docker-compose)
+    'MAX_RETRIES': config('MENTOR_REVIEW_MAX_RETRIES', default=3, cast=int),
+    'RETRY_BACKOFF': config('MENTOR_REVIEW_RETRY_BACKOFF', default=30, cast=int),  # secondes, doublées à chaque essai
+    'SOFT_TIME_LIMIT': config('MENTOR_REVIEW_SOFT_TIME_LIMIT', default=120, cast=int),
+    'TIME_LIMIT': config('MENTOR_REVIEW_TIME_LIMIT', default=150, cast=int),
+    'STUCK_AFTER': config('MENTOR_REVIEW_STUCK_AFTER', default=15 * 60, cast=int),  # requeue_stuck_reviews
+}
+CELERY_TASK_ROUTES = {
+    'mentors.review_application': {'queue': MENTOR_REVIEW['QUEUE']},
+}
+
 # Celery Beat - Tâches périodiques
 CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
 CELERY_BEAT_SCHEDULE = {
@@ -320,5 +409,41 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'messaging.schedule_unlock_for_upcoming_bookings',
         'schedule': 600.0,  # 10 minutes
     },
+    'refresh-mentor-recommendations': {
+        'task': 'mentors.refresh_mentor_recommendations',
+        'schedule': 3600.0,  # 1 heure (incrémental)
+    },
+    'rebuild-mentor-recommendations': {
+        'task': 'mentors.refresh_mentor_recommendations',
+        'schedule': 86400.0,  # 24 heures (complet)
+        'kwargs': {'full': True},
+    },
+    'compile-missing-availabilities': {
+        'task': 'mentors.compile_availabilities',
+        'schedule': 300.0,  # 5 minutes (bitmaps ignorés par /api/mentors/available/)
+    },
+    'purge-superseded-mentor-profile-rows': {
+        'task': 'mentors.purge_superseded_profile_rows',
+        'schedule': 86400.0,  # 24 heures
+    },
+    'reconcile-vote-counts': {
+        'task': 'forum.reconcile_vote_counts',
+        'schedule': 3600.0,  # 1 heure
+    },
+    'evaluate-pending-answers': {
+        'task': 'forum.evaluate_pending_answers',
+        'schedule': float(FORUM_AUTO_RESOLVE['MAX_WAIT']),
+    },
+    'evict-tutor-cache': {
+        'task': 'ai_tools.evict_tutor_cache',
+        'schedule': 3600.0,  # 1 heure
+    },
 }
 
+if POINTS_LEDGER_ASYNC:
+    # Gains mis en file : appliqués toutes les 10 secondes
+    CELERY_BEAT_SCHEDULE['apply-points-events'] = {
+        'task': 'gamification.apply_points_events',
+        'schedule': 10.0,
+    }
+
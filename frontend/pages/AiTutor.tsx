@@ -26,6 +26,7 @@ const AiTutor: React.FC = () => {
   const [isLoading, setIsLoading] = useState(false);
   const [showHistory, setShowHistory] = useState(false);
   const [history, setHistory] = useState<any[]>([]);
+  const [sessionId, setSessionId] = useState<number | null>(null);
 
   // Settings
   const [subject, setSubject] = useState('Général');
@@ -72,7 +73,8 @@ const AiTutor: React.FC = () => {
 
     try {
       // 2. Appel API avec tous les paramètres incluant le style
-      const responseText = await geminiService.askTutor(textToSend, subject, level, style);
+      const { answer: responseText, sessionId: newSessionId } = await geminiService.askTutor(textToSend, subject, level, style, sessionId);
+      if (newSessionId) setSessionId(newSessionId);
 
       // 3. Add AI Response
       const aiMsg: ChatMessage = {
@@ -98,6 +100,7 @@ const AiTutor: React.FC = () => {
   const clearChat = () => {
     setMessages([]);
     setInput('');
+    setSessionId(null);
   };
 
   return (
@@ -206,10 +209,11 @@ const AiTutor: React.FC = () => {
               history.map((session) => (
                 <div
                   key={session.id}
-                  onClick={() => {
-                    // Charger la session dans le chat actuel
+                  onClick={async () => {
+                    // Charger la session dans le chat actuel (les questions suivantes la poursuivent)
+                    const turns = await geminiService.getSessionTurns(session.id);
                     const sessionMessages: ChatMessage[] = [];
-                    session.questions.forEach((q: any) => {
+                    turns.forEach((q: any) => {
                       sessionMessages.push({
                         id: `${session.id}-q-${sessionMessages.length}`,
                         role: 'user',
@@ -224,6 +228,7 @@ const AiTutor: React.FC = () => {
                       });
                     });
                     setMessages(sessionMessages);
+                    setSessionId(session.id);
                     setShowHistory(false);
                   }}
                   className="p-3 bg-gray-50 dark:bg-gray-700/50 rounded-lg cursor-pointer hover:bg-gray-100 dark:hover:bg-gray-700 transition-colors border border-gray-200 dark:border-gray-600"
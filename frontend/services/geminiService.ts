@@ -7,18 +7,20 @@ class GeminiService {
     return true;
   }
 
-  async askTutor(question: string, subject: string, level: string, style?: string): Promise<string> {
+  // sessionId : poursuivre une conversation (le tuteur reprend les échanges précédents)
+  async askTutor(question: string, subject: string, level: string, style?: string, sessionId?: number | null): Promise<{ answer: string; sessionId?: number }> {
     try {
       const response = await api.post('ai/tutor/', {
         question,
         subject,
         level,
-        style
+        style,
+        ...(sessionId ? { session_id: sessionId } : {})
       });
-      return response.data.answer;
+      return { answer: response.data.answer, sessionId: response.data.session_id };
     } catch (error) {
       console.error("Erreur Gemini:", error);
-      return "Une erreur est survenue lors de la consultation du tuteur virtuel. Vérifiez votre connexion ou réessayez plus tard.";
+      return { answer: "Une erreur est survenue lors de la consultation du tuteur virtuel. Vérifiez votre connexion ou réessayez plus tard." };
     }
   }
 
@@ -31,6 +33,22 @@ class GeminiService {
       return [];
     }
   }
+
+  // Échanges d'une session, page par page (pagination par curseur)
+  async getSessionTurns(sessionId: number): Promise<any[]> {
+    const turns: any[] = [];
+    try {
+      let url: string | null = `ai/history/${sessionId}/`;
+      while (url) {
+        const response: any = await api.get(url);
+        turns.push(...response.data.results);
+        url = response.data.next;
+      }
+    } catch (error) {
+      console.error("Erreur lors de la récupération de la session:", error);
+    }
+    return turns;
+  }
 }
 
 export const geminiService = new GeminiService();
\ No newline at end of file